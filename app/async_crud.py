@@ -0,0 +1,68 @@
+"""AsyncSession equivalents of the hot-path functions in crud.
+
+Queries are built by the shared statement builders in crud so both modes
+issue exactly the same SQL.
+"""
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from . import models, schemas
+from .cache import post_cache, post_key
+from .trending import trending_tracker
+from .crud import (
+    POST_VERSION_COLUMNS, like_change_statements, like_insert_query, post_likes_query, post_query, posts_by_ids_query,
+    posts_count_statement, posts_page_query, split_page, unlike_query,
+)
+
+async def get_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
+    return await db.get(models.User, user_id)
+
+async def create_post(db: AsyncSession, post: schemas.PostCreate, user_id: int):
+    db_post = models.Post(**post.model_dump(), owner_id=user_id)
+    db.add(db_post)
+    await db.execute(posts_count_statement(user_id, 1))
+    await db.commit()
+    await db.refresh(db_post)
+    return db_post
+
+async def get_post(db: AsyncSession, post_id: int, defer_content: bool = False) -> Optional[models.Post]:
+    return (await db.scalars(post_query(post_id, defer_content))).first()
+
+async def get_posts(db: AsyncSession, skip: int = 0, limit: int = 100, viewer_id: Optional[int] = None, after: Optional[int] = None, fields=None):
+    return (await db.scalars(posts_page_query(skip, limit, viewer_id, after, fields=fields))).all()
+
+async def get_posts_by_ids(db: AsyncSession, post_ids, viewer_id: int):
+    return (await db.scalars(posts_by_ids_query(post_ids, viewer_id))).all()
+
+async def get_posts_versions(db: AsyncSession, skip: int = 0, limit: int = 100, viewer_id: Optional[int] = None, after: Optional[int] = None):
+    return (await db.execute(posts_page_query(skip, limit, viewer_id, after, columns=POST_VERSION_COLUMNS))).all()
+
+async def get_post_likes(db: AsyncSession, post_id: int, after: Optional[int] = None, limit: int = 20):
+    return split_page((await db.scalars(post_likes_query(post_id, after, limit))).all(), limit)
+
+async def create_like(db: AsyncSession, user_id: int, post_id: int) -> Optional[models.Like]:
+    db_like = (await db.scalars(like_insert_query(db.get_bind().dialect.name, user_id, post_id))).first()
+    if db_like is None:
+        await db.rollback()
+        return None
+    for stmt in like_change_statements(user_id, post_id, 1):
+        await db.execute(stmt)
+    await db.commit()
+    post_cache.invalidate(post_key(post_id))
+    trending_tracker.record_like(post_id, db_like.created_at)
+    return db_like
+
+async def get_like(db: AsyncSession, user_id: int, post_id: int) -> Optional[models.Like]:
+    return (await db.scalars(select(models.Like).where(models.Like.user_id == user_id, models.Like.post_id == post_id))).first()
+
+async def delete_like(db: AsyncSession, user_id: int, post_id: int) -> bool:
+    liked_at = (await db.execute(unlike_query(user_id, post_id))).scalar()
+    if liked_at is None:
+        await db.rollback()
+        return False
+    for stmt in like_change_statements(user_id, post_id, -1):
+        await db.execute(stmt)
+    await db.commit()
+    post_cache.invalidate(post_key(post_id))
+    trending_tracker.record_unlike(post_id, liked_at)
+    return True
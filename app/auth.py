@@ -1,17 +1,29 @@
+import hashlib
 import os
+import time
+import uuid
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import JWTError, jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from . import schemas, models, crud, database
-from app.dependencies import get_db
+from . import schemas, models, crud, async_crud, database
+from .cache import token_cache, user_cache
+from .hashing import password_hasher
+from .revocation import REFRESH_TOKEN_EXPIRE_DAYS, revocations
+from app.dependencies import get_db, get_async_db
 
 load_dotenv()
 SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key_here")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
-ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+# Kept short: clients renew access tokens with the refresh token from /accounts/login
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 15))
+# Embed name, email and created_at in access tokens so get_current_user_from_claims needs no user lookup
+TOKEN_PROFILE_CLAIMS = os.getenv("TOKEN_PROFILE_CLAIMS", "false").lower() in ("1", "true", "yes")
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/accounts/login")
 
@@ -21,34 +33,131 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    # Every token gets an id so it can be revoked on its own
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def token_claims(user: models.User) -> dict:
+    """Claims for a new access token for `user`"""
+    claims = {"sub": str(user.id), "ver": user.token_version or 0}
+    if TOKEN_PROFILE_CLAIMS:
+        claims.update(name=user.name, email=user.email, created_at=user.created_at.isoformat())
+    return claims
+
+def create_refresh_token(user: models.User) -> str:
+    """Long-lived token accepted only by /accounts/refresh, which swaps it for a new pair"""
+    claims = {"sub": str(user.id), "ver": user.token_version or 0, "typ": "refresh"}
+    return create_access_token(claims, timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+
+def issue_tokens(user: models.User) -> dict:
+    """Body of a schemas.Token response: a fresh access and refresh token for `user`"""
+    return {"access_token": create_access_token(data=token_claims(user)), "refresh_token": create_refresh_token(user), "token_type": "bearer"}
+
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _decode_token(token: str) -> tuple:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
-        user_id = int(user_id)
-        token_data = schemas.TokenData(user_id=user_id)
-    except (JWTError, ValueError):
-        raise credentials_exception
-    user = crud.get_user(db, user_id=token_data.user_id)
-    if user is None:
-        raise credentials_exception
+            raise _credentials_exception()
+        token_data = schemas.TokenData(
+            user_id=int(user_id), version=payload.get("ver", 0), jti=payload.get("jti"),
+            type=payload.get("typ", "access"), expires_at=payload.get("exp"),
+        )
+        profile = None
+        if "email" in payload:
+            profile = schemas.UserResponse(
+                id=token_data.user_id, name=payload["name"], email=payload["email"], is_active=True, created_at=payload["created_at"]
+            )
+    except (JWTError, ValueError, KeyError):
+        raise _credentials_exception()
+    return token_data, profile
+
+def verify_token(token: str) -> tuple:
+    """(TokenData, profile UserResponse or None) for a valid access token, from the token cache when possible.
+
+    Revocation is not checked here; see _check_user.
+    """
+    # Keyed by digest so the cache never holds usable bearer tokens
+    key = hashlib.sha256(token.encode()).digest()
+    verified = token_cache.get(key)
+    if verified is None:
+        token_data, profile = _decode_token(token)
+        verified = (token_data, profile)
+        expires_at = token_data.expires_at
+        remaining = token_cache.ttl if expires_at is None else min(token_cache.ttl, expires_at - time.time())
+        if remaining > 0:
+            token_cache.set(key, verified, ttl=remaining)
+    if verified[0].type != "access":
+        raise _credentials_exception()
+    return verified
+
+def verify_refresh_token(token: str) -> schemas.TokenData:
+    """Claims of a valid refresh token that has not been revoked or already used"""
+    token_data, _ = _decode_token(token)
+    if token_data.type != "refresh" or revocations.is_revoked(token_data.jti, token_data.user_id, token_data.version):
+        raise _credentials_exception()
+    return token_data
+
+def _cache_user(db_user: Optional[models.User], token_data: schemas.TokenData, generation: int) -> schemas.UserResponse:
+    # The row is authoritative too: it catches revocations other workers have not synced yet
+    if db_user is None or db_user.token_version != token_data.version:
+        raise _credentials_exception()
+    # Cache a detached snapshot so it can be shared safely across sessions; `generation`
+    # was taken before the read, so a copy that an update invalidated meanwhile is not stored
+    user = schemas.UserResponse.model_validate(db_user)
+    user_cache.set(user.id, user, generation=generation)
+    return user
+
+def _check_user(user: schemas.UserResponse, token_data: schemas.TokenData) -> schemas.UserResponse:
+    if not user.is_active or revocations.is_revoked(token_data.jti, token_data.user_id, token_data.version):
+        raise _credentials_exception()
     return user
 
-def authenticate_user(db: Session, email: str, password: str):
-    user = crud.get_user_by_email(db, email)
-    if not user:
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    token_data, _ = verify_token(token)
+    user = user_cache.get(token_data.user_id)
+    if user is None:
+        generation = user_cache.generation(token_data.user_id)
+        user = _cache_user(crud.get_user(db, user_id=token_data.user_id), token_data, generation)
+    return _check_user(user, token_data)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    token_data, _ = verify_token(token)
+    user = user_cache.get(token_data.user_id)
+    if user is None:
+        generation = user_cache.generation(token_data.user_id)
+        user = _cache_user(await async_crud.get_user(db, token_data.user_id), token_data, generation)
+    return _check_user(user, token_data)
+
+def get_current_user_from_claims(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> schemas.UserResponse:
+    """get_current_user for routes that only need the profile: with TOKEN_PROFILE_CLAIMS tokens
+    the user comes from the token and only the in-memory revocations are checked"""
+    token_data, profile = verify_token(token)
+    if profile is None:
+        return get_current_user(token, db)
+    return _check_user(profile, token_data)
+
+async def authenticate_user(db: Session, email: str, password: str):
+    user = await run_in_threadpool(crud.get_user_by_email, db, email)
+    if not user or not user.is_active:
         return False
-    if not crud.verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return False
+    if crud.password_needs_update(user.hashed_password):
+        # The hashing policy changed since this hash was made; only a login sees the plain password
+        try:
+            hashed_password = await password_hasher.hash(password)
+        except HTTPException:
+            # Hash pool is saturated; upgrade on a later login instead of failing this one
+            return user
+        await run_in_threadpool(crud.update_password_hash, db, user, hashed_password)
     return user 
\ No newline at end of file
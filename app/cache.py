@@ -0,0 +1,246 @@
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from typing import Optional
+
+try:
+    from redis.exceptions import WatchError
+except ImportError:  # only RESPONSE_CACHE_BACKEND=redis needs the package
+    class WatchError(Exception):
+        pass
+
+load_dotenv()
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+# Verified access tokens by digest; entries never outlive the token's exp
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 4096))
+TOKEN_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_CACHE_TTL_SECONDS", 300))
+# Serialized public post responses: "memory" (in-process LRU), "redis" or "none".
+# A memory cache is only invalidated by writes in its own process, so it is off by
+# default when the server runs several workers (WEB_CONCURRENCY); use redis there.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", 1))
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory" if WEB_CONCURRENCY <= 1 else "none").lower()
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 4096))
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 30))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries also expire after `ttl` seconds.
+
+    A `maxsize` of 0 disables the cache: every lookup is a miss and nothing is stored.
+
+    A value read from the database can be stored with the generation() taken
+    before the read, so it is dropped if the key was invalidated meanwhile.
+    Generations of the `maxsize` most recently invalidated keys are kept; older
+    ones fall back to a floor that only moves up, which errs towards not storing.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._generations = OrderedDict()
+        self._generation_floor = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, key) -> int:
+        """Token for set(): changes whenever `key` is invalidated or the cache is cleared"""
+        with self._lock:
+            return self._generations.get(key, self._generation_floor)
+
+    def set(self, key, value, ttl: Optional[float] = None, generation: Optional[int] = None):
+        """Store `value`; `ttl` overrides the cache's lifetime for this entry.
+
+        With `generation`, nothing is stored if `key` was invalidated since it was taken.
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and self._generations.get(key, self._generation_floor) != generation:
+                return
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._generations[key] = next(self._counter)
+            self._generations.move_to_end(key)
+            while len(self._generations) > self.maxsize:
+                self._generation_floor = self._generations.popitem(last=False)[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._generations.clear()
+            self._generation_floor = next(self._counter)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Lifetime of a Redis per-key generation counter after its last invalidation
+GENERATION_TTL_SECONDS = 3600
+
+
+def _as_bytes(key) -> bytes:
+    return key if isinstance(key, bytes) else key.encode()
+
+
+class RedisCache:
+    """Same interface as TTLCache on top of a Redis-compatible client.
+
+    The client needs `get`, `mget`, `set(name, value, ex=)`, `incr`, `expire`,
+    `delete`, `scan_iter` and `pipeline`; values must be bytes. Keys are
+    namespaced with `prefix` so `clear` only touches this cache's entries. Size
+    and evictions are owned by the server.
+
+    Generations are counters kept next to the entries: one per invalidated key
+    and one bumped by `clear`. A set() with a generation WATCHes both, so it
+    fails if another worker invalidates the key before it lands.
+    """
+
+    def __init__(self, client, ttl: float, prefix: str = "upforce:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        value = self.client.get(f"{self.prefix}{key}")
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return value
+
+    def _generation_keys(self, key) -> tuple:
+        # Bumped by clear() and by invalidate(key) respectively
+        return f"{self.prefix}gen:", f"{self.prefix}gen:{key}"
+
+    def generation(self, key) -> tuple:
+        """Token for set(): changes whenever `key` is invalidated or the cache is cleared"""
+        return tuple(self.client.mget(*self._generation_keys(key)))
+
+    def set(self, key, value, generation: Optional[tuple] = None):
+        """Store `value`; with `generation`, nothing is stored if `key` was invalidated since it was taken"""
+        name, ex = f"{self.prefix}{key}", max(1, int(self.ttl))
+        if generation is None:
+            self.client.set(name, value, ex=ex)
+            return
+        generation_keys = self._generation_keys(key)
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(*generation_keys)
+                if tuple(pipe.mget(*generation_keys)) != generation:
+                    return
+                pipe.multi()
+                pipe.set(name, value, ex=ex)
+                pipe.execute()
+            except WatchError:
+                pass
+
+    def invalidate(self, key):
+        # Bump first: a concurrent set() that already passed its check then fails on WATCH
+        generation_key = self._generation_keys(key)[1]
+        self.client.incr(generation_key)
+        # Outlives any request that could still hold the previous generation
+        self.client.expire(generation_key, GENERATION_TTL_SECONDS)
+        self.client.delete(f"{self.prefix}{key}")
+
+    def clear(self):
+        generations = f"{self.prefix}gen:"
+        self.client.incr(generations)
+        generations = generations.encode()
+        keys = [key for key in self.client.scan_iter(match=f"{self.prefix}*") if not _as_bytes(key).startswith(generations)]
+        if keys:
+            self.client.delete(*keys)
+
+    def stats(self) -> dict:
+        evictions = None
+        if hasattr(self.client, "info"):
+            evictions = self.client.info("stats").get("evicted_keys")
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": None,
+                "maxsize": None,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
+
+
+def make_response_cache(backend: str = RESPONSE_CACHE_BACKEND):
+    if backend == "memory":
+        return TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS)
+    if backend == "none":
+        return TTLCache(maxsize=0, ttl=RESPONSE_CACHE_TTL_SECONDS)
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as exc:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from exc
+        return RedisCache(redis.Redis.from_url(RESPONSE_CACHE_REDIS_URL), ttl=RESPONSE_CACHE_TTL_SECONDS)
+    raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend!r}")
+
+
+def post_key(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+def pack_response(body: bytes, etag: str, last_modified: str) -> bytes:
+    """Envelope of a cached response: its validators and the serialized JSON body"""
+    return b"\n".join((etag.encode(), last_modified.encode(), body))
+
+
+def unpack_response(envelope: bytes) -> tuple:
+    etag, last_modified, body = envelope.split(b"\n", 2)
+    return body, etag.decode(), last_modified.decode()
+
+
+# Authenticated users by id, as schemas.UserResponse snapshots
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL_SECONDS)
+# sha256 of an access token -> its verified claims; see auth.verify_token
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL_SECONDS)
+# GET /blog/{post_id} bodies of public posts, keyed by post_key(); see crud for invalidation
+post_cache = make_response_cache()
@@ -0,0 +1,70 @@
+"""HTTP validators (ETag / Last-Modified) and conditional GET evaluation for posts."""
+import hashlib
+from datetime import datetime, UTC
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+from typing import Iterable, Optional
+
+
+def has_conditional_headers(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands DateTime columns back naive; they are always written in UTC
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value.astimezone(UTC)
+
+
+def _version(post) -> datetime:
+    return _as_utc(post.updated_at or post.created_at)
+
+
+def post_validators(post) -> tuple:
+    """ETag and last-modified time of a single post"""
+    version = _version(post)
+    return f'W/"p{post.id}-{int(version.timestamp() * 1_000_000)}"', version
+
+
+def list_validators(posts: Iterable, variant: str = "") -> tuple:
+    """ETag and last-modified time of a page of posts, from their ids and versions only.
+
+    `variant` distinguishes representations of the same page, such as sparse fieldsets.
+    """
+    digest = hashlib.sha1(variant.encode())
+    latest = None
+    for post in posts:
+        version = _version(post)
+        digest.update(f"{post.id}:{version.timestamp()};".encode())
+        latest = version if latest is None or version > latest else latest
+    return f'W/"l{digest.hexdigest()}"', latest
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime]) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(microsecond=0), usegmt=True)
+    return headers
+
+
+def parse_http_date(value: str) -> Optional[datetime]:
+    try:
+        return _as_utc(parsedate_to_datetime(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match (which takes precedence) or If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    since = parse_http_date(if_modified_since) if if_modified_since else None
+    if since is None or last_modified is None:
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+def not_modified_response(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
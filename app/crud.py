@@ -1,9 +1,56 @@
-from sqlalchemy.orm import Session
-from . import models, schemas
+from sqlalchemy import and_, or_, select, union_all, insert, update, delete, func, literal
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased, load_only, with_expression
+from . import models, schemas, revocation
+from .cache import post_cache, post_key, user_cache
+from .revocation import revocations
+from .trending import trending_tracker
+from dotenv import load_dotenv
 from passlib.context import CryptContext
-from typing import Optional
+from typing import List, Optional
+from datetime import datetime, timedelta, UTC
+import os
+import uuid
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+load_dotenv()
+# Password hashing policy. New hashes use the first scheme; the others are only
+# verified, and such hashes (or ones with other cost settings) are upgraded at login
+PASSWORD_SCHEMES = [scheme.strip() for scheme in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if scheme.strip()]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+
+def make_pwd_context(schemes: List[str] = PASSWORD_SCHEMES, bcrypt_rounds: int = BCRYPT_ROUNDS,
+                     argon2_time_cost: int = ARGON2_TIME_COST, argon2_memory_cost: int = ARGON2_MEMORY_COST,
+                     argon2_parallelism: int = ARGON2_PARALLELISM) -> CryptContext:
+    if "argon2" in schemes:
+        try:
+            import argon2  # noqa: F401
+        except ImportError as exc:
+            raise RuntimeError("PASSWORD_SCHEMES=argon2 requires the 'argon2-cffi' package") from exc
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+pwd_context = make_pwd_context()
+
+# Rows removed per transaction by the background account purge
+PURGE_BATCH_SIZE = 500
+# An unfinished purge with no committed batch for this long is taken to have died with its process
+PURGE_STALE_SECONDS = float(os.getenv("PURGE_STALE_SECONDS", 60))
+# Writes stamp updated_at before they commit, so an incremental export also re-reads
+# posts changed this long before `since`; must exceed the longest write transaction
+EXPORT_SINCE_OVERLAP_SECONDS = float(os.getenv("EXPORT_SINCE_OVERLAP_SECONDS", 300))
+
+# Dialect-specific INSERT constructs that support ON CONFLICT
+_UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
@@ -11,9 +58,19 @@ def get_password_hash(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
-def create_user(db: Session, user: schemas.UserCreate):
-    hashed_password = get_password_hash(user.password)
-    db_user = models.User(name=user.name, email=user.email, hashed_password=hashed_password)
+def password_needs_update(hashed_password: str) -> bool:
+    """Whether a stored hash predates the current policy; only parses the hash, so it is cheap"""
+    return pwd_context.needs_update(hashed_password)
+
+def update_password_hash(db: Session, user: models.User, hashed_password: str):
+    """Store a rehash of the same password; unlike a password change, sessions stay valid"""
+    user.hashed_password = hashed_password
+    db.commit()
+
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
+    db_user = models.User(name=user.name, email=user.email, hashed_password=hashed_password, stats=models.UserStats())
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
@@ -25,23 +82,113 @@ def get_user_by_email(db: Session, email: str) -> Optional[models.User]:
 def get_user(db: Session, user_id: int) -> Optional[models.User]:
     return db.query(models.User).filter(models.User.id == user_id).first()
 
-def update_user(db: Session, user: models.User, user_update: schemas.UserUpdate):
+def revoke_tokens(db: Session, user: models.User) -> dict:
+    """Invalidate every token issued to `user` so far.
+
+    Adds the revocation row to the current transaction; pass the result to
+    revocations.add once it is committed.
+    """
+    user.token_version = (user.token_version or 0) + 1
+    row = revocation.user_revocation(user.id, user.token_version)
+    db.add(row)
+    return {"user_id": row.user_id, "expires_at": row.expires_at, "min_version": row.min_version}
+
+def revoke_token(db: Session, user_id: int, jti: str, expires_at: datetime) -> bool:
+    """Invalidate the single token `jti` (logout, refresh token rotation).
+
+    False if it was already revoked, possibly by a concurrent request.
+    """
+    row = revocation.token_revocation(jti, user_id, expires_at)
+    db.add(row)
+    expires_at = row.expires_at
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return False
+    revocations.add(user_id, expires_at, jti=jti)
+    return True
+
+def update_user(db: Session, user: models.User, user_update: schemas.UserUpdate, hashed_password: Optional[str] = None, revoke: bool = False):
     if user_update.name:
         user.name = user_update.name
     if user_update.password:
-        user.hashed_password = get_password_hash(user_update.password)
+        user.hashed_password = hashed_password or get_password_hash(user_update.password)
+    # A new password always logs out other sessions
+    revoked = revoke_tokens(db, user) if revoke or user_update.password else None
     db.commit()
+    if revoked:
+        revocations.add(**revoked)
+    user_cache.invalidate(user.id)
     db.refresh(user)
     return user
 
+def likes_removed_statements(criteria):
+    """Counter updates to run just before deleting the likes selected by `criteria(like, post)`.
+
+    Keeps posts.like_count and user_stats.likes_given/likes_received in step for
+    bulk removals (deleted posts and accounts) without loading any rows.
+    Each counter is decremented by one grouped count joined in with UPDATE ... FROM
+    (SQLite 3.33+), so the likes are read once rather than once per updated row.
+    """
+    like, post = aliased(models.Like), aliased(models.Post)
+
+    def removed(column):
+        return (
+            select(column.label("target"), func.count().label("removed"))
+            .select_from(like).join(post, post.id == like.post_id)
+            .where(criteria(like, post)).group_by(column).subquery()
+        )
+
+    by_post, by_liker, by_owner = removed(like.post_id), removed(like.user_id), removed(post.owner_id)
+    return [
+        update(models.Post)
+        .where(models.Post.id == by_post.c.target)
+        .values(like_count=models.Post.like_count - by_post.c.removed)
+        .execution_options(synchronize_session=False),
+        update(models.UserStats)
+        .where(models.UserStats.user_id == by_liker.c.target)
+        .values(likes_given=models.UserStats.likes_given - by_liker.c.removed)
+        .execution_options(synchronize_session=False),
+        update(models.UserStats)
+        .where(models.UserStats.user_id == by_owner.c.target)
+        .values(likes_received=models.UserStats.likes_received - by_owner.c.removed)
+        .execution_options(synchronize_session=False),
+    ]
+
+def posts_count_statement(user_id: int, delta: int):
+    return (
+        update(models.UserStats)
+        .where(models.UserStats.user_id == user_id)
+        .values(posts_count=models.UserStats.posts_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
 def delete_user(db: Session, user: models.User):
-    # Get count of likes before deletion for logging/debugging
-    likes_count = len(user.likes)
-    posts_count = len(user.posts)
-    
-    # Delete user (cascade will handle posts and likes automatically)
+    user_id = user.id
+    own_posts = select(models.Post.id).where(models.Post.owner_id == user_id)
+    # Ids rather than a count: they also leave the trending ranking
+    post_ids = db.scalars(own_posts).all()
+    posts_count = len(post_ids)
+    likes_count = get_user_likes_count(db, user_id)
+    # The user row goes, so only the revocation row still rejects its tokens
+    revoked = revoke_tokens(db, user)
+    # Two index-friendly passes rather than one OR across the join, which scans every like;
+    # the second skips the user's likes on their own posts, already counted by the first
+    for criteria in (
+        lambda like, post: like.user_id == user_id,
+        lambda like, post: and_(like.post_id.in_(own_posts), like.user_id != user_id),
+    ):
+        for stmt in likes_removed_statements(criteria):
+            db.execute(stmt)
+    # ON DELETE CASCADE removes the user's posts, likes and stats (and likes on those posts)
     db.delete(user)
     db.commit()
+    revocations.add(**revoked)
+    user_cache.invalidate(user_id)
+    trending_tracker.forget(*post_ids)
+    # Likes vanished from posts all over the site; cheaper to drop cached posts than to list them
+    post_cache.clear()
     
     return {
         "message": f"User deleted successfully. Removed {posts_count} posts and {likes_count} likes.",
@@ -49,6 +196,99 @@ def delete_user(db: Session, user: models.User):
         "likes_deleted": likes_count
     }
 
+def deactivate_user(db: Session, user: models.User) -> models.AccountPurge:
+    """Lock the account out immediately and record a purge job for purge_user to run"""
+    user.is_active = False
+    revoked = revoke_tokens(db, user)
+    job = models.AccountPurge(
+        id=uuid.uuid4().hex,
+        user_id=user.id,
+        posts_total=get_user_posts_count(db, user.id),
+        likes_total=get_user_likes_count(db, user.id),
+    )
+    db.add(job)
+    db.commit()
+    revocations.add(**revoked)
+    user_cache.invalidate(revoked["user_id"])
+    db.refresh(job)
+    return job
+
+def get_account_purge(db: Session, job_id: str) -> Optional[models.AccountPurge]:
+    return db.get(models.AccountPurge, job_id)
+
+def claim_stale_purges(db: Session) -> List[str]:
+    """Ids of pending or running purges idle for PURGE_STALE_SECONDS, claimed for this process.
+
+    Claiming bumps updated_at only if no one else has since reading it, so when
+    several workers start at once each purge is resumed by exactly one of them.
+    """
+    last_progress = func.coalesce(models.AccountPurge.updated_at, models.AccountPurge.created_at)
+    stale = db.execute(
+        select(models.AccountPurge.id, models.AccountPurge.updated_at).where(
+            models.AccountPurge.status.in_(("pending", "running")),
+            last_progress < datetime.now(UTC) - timedelta(seconds=PURGE_STALE_SECONDS),
+        )
+    ).all()
+    claimed = []
+    for job in stale:
+        seen = models.AccountPurge.updated_at.is_(None) if job.updated_at is None else models.AccountPurge.updated_at == job.updated_at
+        result = db.execute(
+            update(models.AccountPurge).where(models.AccountPurge.id == job.id, seen).values(updated_at=datetime.now(UTC))
+        )
+        if result.rowcount:
+            claimed.append(job.id)
+    db.commit()
+    return claimed
+
+def purge_user(db: Session, job_id: str, batch_size: int = PURGE_BATCH_SIZE):
+    """Delete a deactivated user's likes, then posts, then the user, in short batched transactions.
+
+    Safe to run again on an interrupted job: every batch picks up whatever rows are left.
+    """
+    job = db.get(models.AccountPurge, job_id)
+    job.status = "running"
+    db.commit()
+    try:
+        while True:
+            rows = db.execute(
+                select(models.Like.id, models.Like.post_id).where(models.Like.user_id == job.user_id).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            like_ids = [row.id for row in rows]
+            for stmt in likes_removed_statements(lambda like, post: like.id.in_(like_ids)):
+                db.execute(stmt)
+            db.execute(delete(models.Like).where(models.Like.id.in_(like_ids)))
+            job.likes_deleted += len(like_ids)
+            db.commit()
+            for row in rows:
+                post_cache.invalidate(post_key(row.post_id))
+        while True:
+            post_ids = db.scalars(
+                select(models.Post.id).where(models.Post.owner_id == job.user_id).limit(batch_size)
+            ).all()
+            if not post_ids:
+                break
+            for stmt in likes_removed_statements(lambda like, post: like.post_id.in_(post_ids)):
+                db.execute(stmt)
+            db.execute(posts_count_statement(job.user_id, -len(post_ids)))
+            db.execute(delete(models.Post).where(models.Post.id.in_(post_ids)))
+            job.posts_deleted += len(post_ids)
+            db.commit()
+            for post_id in post_ids:
+                post_cache.invalidate(post_key(post_id))
+            trending_tracker.forget(*post_ids)
+        db.execute(delete(models.User).where(models.User.id == job.user_id))
+        job.status = "completed"
+    except Exception as exc:
+        db.rollback()
+        job.status = "failed"
+        job.error = str(exc)
+    finally:
+        job.finished_at = datetime.now(UTC)
+        db.commit()
+    return job
+
 def get_user_likes_count(db: Session, user_id: int) -> int:
     """Get the number of likes given by a user"""
     return db.query(models.Like).filter(models.Like.user_id == user_id).count()
@@ -57,40 +297,285 @@ def get_user_posts_count(db: Session, user_id: int) -> int:
     """Get the number of posts created by a user"""
     return db.query(models.Post).filter(models.Post.owner_id == user_id).count()
 
+def _user_stats_values(user_id_column):
+    """Correlated COUNT subqueries recomputing every user_stats counter from source tables"""
+    return {
+        "posts_count": select(func.count(models.Post.id)).where(models.Post.owner_id == user_id_column).scalar_subquery(),
+        "likes_given": select(func.count(models.Like.id)).where(models.Like.user_id == user_id_column).scalar_subquery(),
+        "likes_received": (
+            select(func.count(models.Like.id)).join(models.Post, models.Post.id == models.Like.post_id)
+            .where(models.Post.owner_id == user_id_column).scalar_subquery()
+        ),
+    }
+
+def get_user_stats(db: Session, user_id: int) -> models.UserStats:
+    """Primary-key read of a user's counters.
+
+    Rows are created with the user and backfilled by migrations.upgrade(); should one
+    still be missing, the counters are computed without writing during a read.
+    """
+    stats = db.get(models.UserStats, user_id)
+    if stats is None:
+        values = _user_stats_values(user_id)
+        stats = models.UserStats(user_id=user_id, **{name: db.scalar(select(query)) for name, query in values.items()})
+    return stats
+
+def rebuild_user_stats(db: Session) -> int:
+    """Recreate missing user_stats rows and recompute all counters; returns the number of users"""
+    db.execute(
+        insert(models.UserStats).from_select(
+            ["user_id"],
+            select(models.User.id).where(~select(models.UserStats.user_id).where(models.UserStats.user_id == models.User.id).exists()),
+        )
+    )
+    result = db.execute(
+        update(models.UserStats)
+        .values(**_user_stats_values(models.UserStats.user_id))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
 def create_post(db: Session, post: schemas.PostCreate, user_id: int):
     db_post = models.Post(**post.model_dump(), owner_id=user_id)
     db.add(db_post)
+    db.execute(posts_count_statement(user_id, 1))
     db.commit()
     db.refresh(db_post)
     return db_post
 
-def get_post(db: Session, post_id: int) -> Optional[models.Post]:
-    return db.query(models.Post).filter(models.Post.id == post_id).first()
+def create_posts_bulk(db: Session, posts: List[schemas.PostCreate], user_id: int) -> List[int]:
+    """Insert many posts in one transaction using batched multi-row INSERT ... RETURNING"""
+    rows = [dict(post.model_dump(), owner_id=user_id) for post in posts]
+    # Asking RETURNING for parameter order makes SQLite fall back to one INSERT
+    # per row; ids are allocated in insertion order, so sorting restores it.
+    ids = db.scalars(insert(models.Post).returning(models.Post.id), rows).all()
+    db.execute(posts_count_statement(user_id, len(ids)))
+    db.commit()
+    return sorted(ids)
+
+# Enough of a post for visibility and conditional GET checks
+POST_VALIDATOR_COLUMNS = (models.Post.id, models.Post.owner_id, models.Post.is_public, models.Post.created_at, models.Post.updated_at)
+
+def post_query(post_id: int, defer_content: bool = False):
+    query = select(models.Post).where(models.Post.id == post_id)
+    if defer_content:
+        query = query.options(load_only(*POST_VALIDATOR_COLUMNS))
+    return query
+
+def get_post(db: Session, post_id: int, defer_content: bool = False) -> Optional[models.Post]:
+    return db.scalars(post_query(post_id, defer_content)).first()
+
+def visible_to(user_id: int):
+    """SQL predicate for posts the given user is allowed to see"""
+    return or_(models.Post.is_public == True, models.Post.owner_id == user_id)
+
+# Characters of content returned as content_preview
+CONTENT_PREVIEW_CHARS = 200
+
+def post_load_options(fields):
+    """Loader options fetching only the Post columns behind `fields` (see schemas.POST_FIELDS).
+
+    id, created_at and updated_at are always loaded since list validators need them;
+    content_preview is a substring computed by the database.
+    """
+    columns = [getattr(models.Post, field) for field in fields if field not in ("content_preview", "id", "created_at", "updated_at")]
+    options = [load_only(models.Post.id, models.Post.created_at, models.Post.updated_at, *columns)]
+    if "content_preview" in fields:
+        options.append(with_expression(models.Post.content_preview, func.substr(models.Post.content, 1, CONTENT_PREVIEW_CHARS)))
+    return options
+
+def posts_page_query(skip: int = 0, limit: int = 100, viewer_id: Optional[int] = None, after: Optional[int] = None, columns=None, fields=None):
+    """SELECT for one page of posts ordered by id; `after` switches from offset to keyset paging.
+
+    `columns` narrows the select list to the given Post columns instead of whole posts;
+    `fields` keeps whole posts but loads only what post_load_options(fields) needs.
+    """
+    query = select(*columns) if columns else select(models.Post)
+    if fields:
+        query = query.options(*post_load_options(fields))
+    if viewer_id is not None:
+        # Each branch of the visibility OR is an index range scan capped at the
+        # page window, so a page never sorts more than 2 * (skip + limit) ids.
+        window = skip + limit if after is None else limit
+        branches = []
+        for predicate in (models.Post.is_public == True, models.Post.owner_id == viewer_id):
+            branch = select(models.Post.id).where(predicate)
+            if after is not None:
+                branch = branch.where(models.Post.id > after)
+            branches.append(select(branch.order_by(models.Post.id).limit(window).subquery().c.id))
+        query = query.where(models.Post.id.in_(union_all(*branches)))
+    elif after is not None:
+        query = query.where(models.Post.id > after)
+    query = query.order_by(models.Post.id)
+    if after is None:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def get_posts(db: Session, skip: int = 0, limit: int = 100, viewer_id: Optional[int] = None, after: Optional[int] = None, fields=None):
+    """List posts ordered by id; pass `after` for keyset pagination instead of `skip`"""
+    return db.scalars(posts_page_query(skip, limit, viewer_id, after, fields=fields)).all()
+
+def posts_by_ids_query(post_ids, viewer_id: int):
+    return select(models.Post).where(models.Post.id.in_(post_ids), visible_to(viewer_id))
+
+def get_posts_by_ids(db: Session, post_ids, viewer_id: int):
+    """The posts among `post_ids` the viewer may see, in no particular order"""
+    return db.scalars(posts_by_ids_query(post_ids, viewer_id)).all()
 
-def get_posts(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Post).offset(skip).limit(limit).all()
+POST_VERSION_COLUMNS = (models.Post.id, models.Post.created_at, models.Post.updated_at)
+
+def get_posts_versions(db: Session, skip: int = 0, limit: int = 100, viewer_id: Optional[int] = None, after: Optional[int] = None):
+    """(id, created_at, updated_at) rows of the same page as get_posts, for list validators"""
+    return db.execute(posts_page_query(skip, limit, viewer_id, after, columns=POST_VERSION_COLUMNS)).all()
+
+# Export rows are plain column tuples: no ORM identity map, no relationship state
+EXPORT_COLUMNS = tuple(getattr(models.Post, field) for field in schemas.PostResponse.model_fields)
+EXPORT_BATCH_SIZE = 1000
+
+def export_posts_query(viewer_id: int, since: Optional[datetime] = None):
+    """Every post visible to the viewer, by id; with `since`, only those changed at or after it
+    (less EXPORT_SINCE_OVERLAP_SECONDS), by (updated_at, id)"""
+    query = select(*EXPORT_COLUMNS).where(visible_to(viewer_id))
+    if since is not None:
+        since -= timedelta(seconds=EXPORT_SINCE_OVERLAP_SECONDS)
+        query = query.where(models.Post.updated_at >= since).order_by(models.Post.updated_at, models.Post.id)
+    else:
+        query = query.order_by(models.Post.id)
+    return query.execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+def export_posts(db: Session, viewer_id: int, since: Optional[datetime] = None):
+    """Yield batches of export rows from a streaming cursor, holding one batch in memory at a time"""
+    yield from db.execute(export_posts_query(viewer_id, since)).partitions()
 
 def update_post(db: Session, post: models.Post, post_update: schemas.PostUpdate):
     for field, value in post_update.model_dump(exclude_unset=True).items():
         setattr(post, field, value)
     db.commit()
+    post_cache.invalidate(post_key(post.id))
     db.refresh(post)
     return post
 
 def delete_post(db: Session, post: models.Post):
+    post_id = post.id
+    for stmt in likes_removed_statements(lambda like, _: like.post_id == post_id):
+        db.execute(stmt)
+    db.execute(posts_count_statement(post.owner_id, -1))
+    # Likes on the post go with it via ON DELETE CASCADE
     db.delete(post)
     db.commit()
+    post_cache.invalidate(post_key(post_id))
+    trending_tracker.forget(post_id)
+
+def like_change_statements(user_id: int, post_id: int, delta: int):
+    """Statements that keep denormalized data in step with a like (+1) or unlike (-1)"""
+    return [
+        update(models.Post)
+        .where(models.Post.id == post_id)
+        .values(like_count=models.Post.like_count + delta),
+        update(models.UserStats)
+        .where(models.UserStats.user_id == user_id)
+        .values(likes_given=models.UserStats.likes_given + delta)
+        .execution_options(synchronize_session=False),
+        update(models.UserStats)
+        .where(models.UserStats.user_id == select(models.Post.owner_id).where(models.Post.id == post_id).scalar_subquery())
+        .values(likes_received=models.UserStats.likes_received + delta)
+        .execution_options(synchronize_session=False),
+    ]
+
+def like_insert_query(dialect_name: str, user_id: int, post_id: int):
+    """INSERT ... SELECT ... ON CONFLICT DO NOTHING RETURNING for an idempotent like.
+
+    The row is only inserted when the post exists, is visible to the user and
+    is not already liked by them.
+    """
+    insert = _UPSERT_INSERTS[dialect_name]
+    source = select(literal(user_id), models.Post.id, literal(datetime.now(UTC))).where(
+        models.Post.id == post_id, visible_to(user_id)
+    )
+    return (
+        insert(models.Like)
+        .from_select(["user_id", "post_id", "created_at"], source)
+        .on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+        .returning(models.Like)
+    )
+
+def unlike_query(user_id: int, post_id: int):
+    """DELETE of a user's like, RETURNING when it was made (for the trending scores)"""
+    return (
+        delete(models.Like)
+        .where(models.Like.user_id == user_id, models.Like.post_id == post_id)
+        .returning(models.Like.created_at)
+        .execution_options(synchronize_session=False)
+    )
 
-def create_like(db: Session, user_id: int, post_id: int):
-    db_like = models.Like(user_id=user_id, post_id=post_id)
-    db.add(db_like)
+def create_like(db: Session, user_id: int, post_id: int) -> Optional[models.Like]:
+    """Like a post in a single statement; returns None if nothing was inserted"""
+    db_like = db.scalars(like_insert_query(db.get_bind().dialect.name, user_id, post_id)).first()
+    if db_like is None:
+        db.rollback()
+        return None
+    for stmt in like_change_statements(user_id, post_id, 1):
+        db.execute(stmt)
+    # Keep the RETURNING values instead of re-selecting the row after commit
+    db.expunge(db_like)
     db.commit()
-    db.refresh(db_like)
+    post_cache.invalidate(post_key(post_id))
+    trending_tracker.record_like(post_id, db_like.created_at)
     return db_like
 
 def get_like(db: Session, user_id: int, post_id: int):
     return db.query(models.Like).filter(models.Like.user_id == user_id, models.Like.post_id == post_id).first()
 
-def delete_like(db: Session, like: models.Like):
-    db.delete(like)
-    db.commit() 
\ No newline at end of file
+def post_likes_query(post_id: int, after: Optional[int] = None, limit: int = 20):
+    """SELECT for a keyset page of a post's likes, plus one row to detect a next page"""
+    query = select(models.Like).where(models.Like.post_id == post_id)
+    if after is not None:
+        query = query.where(models.Like.id > after)
+    return query.order_by(models.Like.id).limit(limit + 1)
+
+def split_page(rows, limit: int):
+    """Split a `limit + 1` row fetch into the page and the cursor for the next one"""
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
+
+def get_liked_post_ids(db: Session, user_id: int, post_ids: List[int]) -> set:
+    """Which of `post_ids` the user has liked, in one IN query on the (user_id, post_id) index"""
+    return set(db.scalars(
+        select(models.Like.post_id).where(models.Like.user_id == user_id, models.Like.post_id.in_(post_ids))
+    ))
+
+def get_post_likes(db: Session, post_id: int, after: Optional[int] = None, limit: int = 20):
+    """Return one keyset page of a post's likes and the cursor for the next page, if any"""
+    return split_page(db.scalars(post_likes_query(post_id, after, limit)).all(), limit)
+
+def delete_like(db: Session, user_id: int, post_id: int) -> bool:
+    """Remove a user's like with a single DELETE; returns False if there was none"""
+    liked_at = db.execute(unlike_query(user_id, post_id)).scalar()
+    if liked_at is None:
+        db.rollback()
+        return False
+    for stmt in like_change_statements(user_id, post_id, -1):
+        db.execute(stmt)
+    db.commit()
+    post_cache.invalidate(post_key(post_id))
+    trending_tracker.record_unlike(post_id, liked_at)
+    return True
+
+def rebuild_like_counts(db: Session) -> int:
+    """Recompute every post's like_count from the likes table; returns the number of posts updated"""
+    actual = (
+        select(func.count(models.Like.id))
+        .where(models.Like.post_id == models.Post.id)
+        .scalar_subquery()
+    )
+    result = db.execute(
+        update(models.Post)
+        .where(models.Post.like_count != actual)
+        .values(like_count=actual)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    post_cache.clear()
+    return result.rowcount 
\ No newline at end of file
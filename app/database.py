@@ -1,14 +1,99 @@
 import os
+import sqlite3
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker
+from . import instrumentation
 
 load_dotenv()
 SQLALCHEMY_DATABASE_URL = os.getenv("SQLALCHEMY_DATABASE_URL", "sqlite:///./app.db")
+# Opt-in AsyncSession mode for the hot read/like routes (needs aiosqlite or asyncpg)
+DATABASE_ASYNC = os.getenv("DATABASE_ASYNC", "false").lower() in ("1", "true", "yes")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto its asyncio driver"""
+    for sync_prefix, async_prefix in (("sqlite://", "sqlite+aiosqlite://"), ("postgresql://", "postgresql+asyncpg://")):
+        if url.startswith(sync_prefix):
+            return async_prefix + url[len(sync_prefix):]
+    return url
+
+SQLALCHEMY_ASYNC_DATABASE_URL = os.getenv("SQLALCHEMY_ASYNC_DATABASE_URL", to_async_url(SQLALCHEMY_DATABASE_URL))
+
+def _env_bool(name: str, default: str) -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+# Connection pool tuning; ignored for in-memory SQLite, which uses a single connection
+POOL_OPTIONS = {
+    "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+    "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+    "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+    "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", "true"),
+}
+
+# Applied to every new SQLite connection: WAL lets readers proceed while a
+# writer commits, and NORMAL sync only fsyncs at checkpoints under WAL.
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+    "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),
+    "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 268435456)),
+    "foreign_keys": "ON",
+}
+
+# INSERT/DELETE ... RETURNING (like and unlike) needs 3.35; UPDATE ... FROM (bulk counter updates) 3.33
+SQLITE_MIN_VERSION = (3, 35, 0)
+
+def _is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+def check_sqlite_version(version: str = sqlite3.sqlite_version):
+    """Fail at startup rather than on the first like when the linked SQLite library is too old"""
+    if tuple(int(part) for part in version.split(".")[:3]) < SQLITE_MIN_VERSION:
+        required = ".".join(map(str, SQLITE_MIN_VERSION))
+        raise RuntimeError(
+            f"SQLite {version} is too old: {required} or newer is required for RETURNING and UPDATE ... FROM. "
+            "Upgrade the SQLite library Python is linked against, or use PostgreSQL."
+        )
+
+def _engine_options(url: str) -> dict:
+    options = {}
+    if _is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if make_url(url).database in (None, "", ":memory:"):
+            return options
+    options.update(POOL_OPTIONS)
+    return options
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+if _is_sqlite(SQLALCHEMY_DATABASE_URL) or _is_sqlite(SQLALCHEMY_ASYNC_DATABASE_URL):
+    check_sqlite_version()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+if _is_sqlite(SQLALCHEMY_DATABASE_URL):
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+if instrumentation.INSTRUMENTATION_ENABLED:
+    instrumentation.instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base() 
\ No newline at end of file
+Base = declarative_base()
+
+async_engine = None
+AsyncSessionLocal = None
+if DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, **_engine_options(SQLALCHEMY_ASYNC_DATABASE_URL))
+    if _is_sqlite(SQLALCHEMY_ASYNC_DATABASE_URL):
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    if instrumentation.INSTRUMENTATION_ENABLED:
+        instrumentation.instrument_engine(async_engine.sync_engine)
+    # Objects stay readable after commit without an implicit (blocking) refresh
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -1,5 +1,6 @@
 from fastapi import Depends
 from sqlalchemy.orm import Session
+from . import database
 from .database import SessionLocal
 
 def get_db():
@@ -7,4 +8,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from . import crud, instrumentation
+
+load_dotenv()
+# Worker processes for bcrypt; 0 runs hashing on the default thread pool instead
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", os.cpu_count() or 1))
+# Hashing jobs allowed to queue or run at once before requests are shed with 503
+HASH_POOL_MAX_PENDING = int(os.getenv("HASH_POOL_MAX_PENDING", 64))
+
+logger = logging.getLogger(__name__)
+
+def _busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+class PasswordHasher:
+    """Runs password hashing and verification in a bounded process pool.
+
+    bcrypt holds the GIL for the whole computation, so running it on the
+    request threadpool serializes every other endpoint behind logins. Work is
+    shipped to separate processes instead, and callers get a 503 once
+    `max_pending` jobs are already queued. A pool broken by a dead worker
+    is replaced rather than failing every later request.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None and self.workers > 0:
+            # spawn avoids forking a process that already runs server threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _replace_broken(self, executor):
+        # A worker died (OOM kill, segfault); the pool refuses all further work, so start a new one
+        if self._executor is executor:
+            self._executor = None
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise _busy()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            with instrumentation.timed("hash"):
+                # Hashing is pure, so a job lost with a broken pool is retried once on a fresh one
+                for attempt in range(2):
+                    executor = self._get_executor()
+                    try:
+                        return await loop.run_in_executor(executor, func, *args)
+                    except BrokenProcessPool:
+                        logger.warning("Password hashing pool broke; replacing it")
+                        self._replace_broken(executor)
+                raise _busy()
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(crud.get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(crud.verify_password, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(workers=HASH_POOL_WORKERS, max_pending=HASH_POOL_MAX_PENDING)
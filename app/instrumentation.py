@@ -0,0 +1,220 @@
+"""Opt-in per-request timing: SQL statements, DB time, password hashing and serialization.
+
+With INSTRUMENTATION_ENABLED set, `InstrumentationMiddleware` gives every HTTP
+request a `RequestTimings` in a context variable. Cursor events on the engines
+(see `instrument_engine`, called from database.py) and the `timed()` blocks in
+hashing and serialization add to it; sync routes see the same object because
+the threadpool runs them in a copy of the request's context. Each response
+carries a Server-Timing header, and per-route histograms are served at
+/metrics in the Prometheus text format. When disabled nothing is registered
+and `timed()` is a shared no-op context manager.
+"""
+import os
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from contextvars import ContextVar
+from dotenv import load_dotenv
+from sqlalchemy import event
+from typing import Optional
+
+load_dotenv()
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "false").lower() in ("1", "true", "yes")
+
+_NO_TIMING = nullcontext()
+
+
+class RequestTimings:
+    __slots__ = ("statements", "db", "hash", "serialize")
+
+    def __init__(self):
+        self.statements = 0
+        self.db = 0.0
+        self.hash = 0.0
+        self.serialize = 0.0
+
+    def server_timing(self, total: float) -> str:
+        parts = [f'db;dur={self.db * 1000:.3f};desc="{self.statements} statements"']
+        if self.hash:
+            parts.append(f"hash;dur={self.hash * 1000:.3f}")
+        if self.serialize:
+            parts.append(f"serialize;dur={self.serialize * 1000:.3f}")
+        parts.append(f"app;dur={total * 1000:.3f}")
+        return ", ".join(parts)
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+class _Timer:
+    __slots__ = ("timings", "kind", "started")
+
+    def __init__(self, timings: RequestTimings, kind: str):
+        self.timings = timings
+        self.kind = kind
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        setattr(self.timings, self.kind, getattr(self.timings, self.kind) + time.perf_counter() - self.started)
+
+
+def timed(kind: str):
+    """Context manager adding its duration to the current request's `kind` ("hash" or "serialize")"""
+    timings = _current.get()
+    if timings is None:
+        return _NO_TIMING
+    return _Timer(timings, kind)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _current.get() is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timings = _current.get()
+    started = getattr(context, "_instrumentation_started", None)
+    if timings is not None and started is not None:
+        timings.statements += 1
+        timings.db += time.perf_counter() - started
+
+
+def instrument_engine(engine):
+    """Attribute statement counts and cursor time on `engine` (a sync Engine) to the current request"""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class Histogram:
+    """Prometheus histogram keyed by label values; only touched from the event loop"""
+
+    def __init__(self, name: str, documentation: str, buckets: tuple):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, labels: tuple, value: float):
+        series = self._series.get(labels)
+        if series is None:
+            # Per-bucket counts (the last one is +Inf), sum, count
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self, label_names: tuple) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            label_text = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(label_names, labels))
+            cumulative = 0
+            for bound, bucket_count in zip((*map(_format_bound, self.buckets), "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_bound(bound: float) -> str:
+    return repr(float(bound))
+
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+ROUTE_LABELS = ("method", "route")
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.duration = Histogram("http_request_duration_seconds", "Time from receiving the request to the end of the response body", SECONDS_BUCKETS)
+        self.db = Histogram("http_request_db_seconds", "Time spent executing SQL statements per request", SECONDS_BUCKETS)
+        self.statements = Histogram("http_request_sql_statements", "SQL statements executed per request", STATEMENT_BUCKETS)
+        # Observed only for requests that did this work
+        self.hash = Histogram("http_request_password_hash_seconds", "Time waiting for password hashing per request", SECONDS_BUCKETS)
+        self.serialize = Histogram("http_request_serialize_seconds", "Time encoding JSON response bodies per request", SECONDS_BUCKETS)
+        self.responses = {}
+
+    def observe(self, method: str, route: str, status: int, duration: float, timings: RequestTimings):
+        labels = (method, route)
+        self.duration.observe(labels, duration)
+        self.db.observe(labels, timings.db)
+        self.statements.observe(labels, timings.statements)
+        if timings.hash:
+            self.hash.observe(labels, timings.hash)
+        if timings.serialize:
+            self.serialize.observe(labels, timings.serialize)
+        key = (method, route, str(status))
+        self.responses[key] = self.responses.get(key, 0) + 1
+
+    def render(self, caches: dict, hasher=None) -> str:
+        lines = []
+        for histogram in (self.duration, self.db, self.statements, self.hash, self.serialize):
+            lines.extend(histogram.render(ROUTE_LABELS))
+        lines += ["# HELP http_responses_total Responses sent by route and status", "# TYPE http_responses_total counter"]
+        for (method, route, status), count in sorted(self.responses.items()):
+            lines.append(f'http_responses_total{{method="{method}",route="{_escape(route)}",status="{status}"}} {count}')
+        stats = {name: cache.stats() for name, cache in caches.items()}
+        for metric, key, kind, documentation in (
+            ("cache_hits_total", "hits", "counter", "Cache lookups that found an entry"),
+            ("cache_misses_total", "misses", "counter", "Cache lookups that found nothing"),
+            ("cache_evictions_total", "evictions", "counter", "Entries dropped to make room"),
+            ("cache_entries", "size", "gauge", "Entries currently held"),
+        ):
+            lines += [f"# HELP {metric} {documentation}", f"# TYPE {metric} {kind}"]
+            lines += [f'{metric}{{cache="{name}"}} {values[key]}' for name, values in stats.items() if values.get(key) is not None]
+        if hasher is not None:
+            lines += [
+                "# HELP password_hash_pending Hashing jobs queued or running", "# TYPE password_hash_pending gauge",
+                f"password_hash_pending {hasher.pending}",
+                "# HELP password_hash_rejected_total Hashing jobs shed with 503", "# TYPE password_hash_rejected_total counter",
+                f"password_hash_rejected_total {hasher.rejected}",
+            ]
+        return "\n".join(lines) + "\n"
+
+
+metrics = RequestMetrics()
+
+
+class InstrumentationMiddleware:
+    """Pure ASGI middleware: times each HTTP request, adds Server-Timing and records `metrics`"""
+
+    def __init__(self, app, request_metrics: RequestMetrics = metrics):
+        self.app = app
+        self.metrics = request_metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        started = time.perf_counter()
+        status = 500
+        finished = None
+
+        async def timed_send(message):
+            nonlocal status, finished
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = timings.server_timing(time.perf_counter() - started).encode()
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body"):
+                # Background tasks run after this and are not part of the request's duration
+                finished = time.perf_counter()
+
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            _current.reset(token)
+            # Route templates keep the label set bounded; anything unrouted shares one label
+            route = scope.get("route")
+            duration = (finished or time.perf_counter()) - started
+            self.metrics.observe(scope["method"], getattr(route, "path", "unmatched"), status, duration, timings)
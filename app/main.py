@@ -1,11 +1,70 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Response
+from . import database, instrumentation, migrations, revocation, search, trending
 from .database import Base, engine
+from .cache import post_cache, token_cache, user_cache
+from .hashing import password_hasher
 from .routers import accounts, blog, like
 
 Base.metadata.create_all(bind=engine)
+migrations.upgrade(engine)
+search.install(engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with database.SessionLocal() as db:
+        revocation.prune(db)
+        revocation.revocations.sync(db)
+    sync_task = None
+    if revocation.REVOCATION_SYNC_SECONDS > 0:
+        sync_task = asyncio.create_task(revocation.run_periodic_sync(database.SessionLocal))
+    # Purges interrupted by a restart would leave accounts deactivated with half their data
+    purge_task = asyncio.create_task(accounts.run_periodic_purge_resume())
+    snapshot = trending.TRENDING_SNAPSHOT_PATH
+    loaded = bool(snapshot) and trending.trending_tracker.load(snapshot)
+    recompute_task = None
+    if trending.TRENDING_RECOMPUTE_SECONDS > 0:
+        # A loaded snapshot is good enough to serve until the first scheduled recompute
+        delay = trending.TRENDING_RECOMPUTE_SECONDS if loaded else 0
+        recompute_task = asyncio.create_task(trending.run_periodic_recompute(database.SessionLocal, delay=delay))
+    yield
+    for task in (recompute_task, sync_task, purge_task):
+        if task is not None:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    if snapshot:
+        trending.trending_tracker.save(snapshot)
+    password_hasher.shutdown()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+app = FastAPI(lifespan=lifespan)
+
+if database.DATABASE_ASYNC:
+    from .routers import async_blog, async_like
+
+    # Registered first so they take precedence over the sync routes they mirror
+    app.include_router(async_blog.router)
+    app.include_router(async_like.router)
 
 app.include_router(accounts.router)
 app.include_router(blog.router)
-app.include_router(like.router) 
\ No newline at end of file
+app.include_router(like.router)
+
+CACHES = {"users": user_cache, "tokens": token_cache, "posts": post_cache}
+
+@app.get("/cache/stats", tags=["cache"])
+def cache_stats():
+    """Hit ratio, size and eviction counters of the in-process and response caches"""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+if instrumentation.INSTRUMENTATION_ENABLED:
+    app.add_middleware(instrumentation.InstrumentationMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Per-route request histograms and cache counters in the Prometheus text format"""
+        body = instrumentation.metrics.render(CACHES, password_hasher)
+        return Response(content=body, media_type="text/plain; version=0.0.4")
@@ -0,0 +1,53 @@
+"""Maintenance commands, run with `python -m app.manage <command>`."""
+import argparse
+from .database import Base, SessionLocal, engine
+from . import crud, migrations, search
+
+
+def upgrade_schema(args):
+    # main() has already run the upgrade; report what it changed
+    print("\n".join(args.upgraded) or "Schema is up to date")
+
+
+def rebuild_like_counts(args):
+    with SessionLocal() as db:
+        updated = crud.rebuild_like_counts(db)
+    print(f"Repaired like_count on {updated} posts")
+
+
+def rebuild_user_stats(args):
+    with SessionLocal() as db:
+        updated = crud.rebuild_user_stats(db)
+    print(f"Rebuilt user_stats for {updated} users")
+
+
+def rebuild_search_index(args):
+    with SessionLocal() as db:
+        indexed = search.rebuild(db)
+    print(f"Re-indexed {indexed} posts for search")
+
+
+COMMANDS = {
+    "upgrade-schema": (upgrade_schema, "Add columns, constraints and indexes introduced since the database was created"),
+    "rebuild-like-counts": (rebuild_like_counts, "Recompute posts.like_count from the likes table"),
+    "rebuild-user-stats": (rebuild_user_stats, "Recompute user_stats counters from posts and likes"),
+    "rebuild-search-index": (rebuild_search_index, "Rebuild the posts_fts full-text index from posts"),
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.manage")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (func, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        subparser.set_defaults(func=func)
+    args = parser.parse_args(argv)
+    Base.metadata.create_all(bind=engine)
+    # Every command needs the current schema, e.g. rebuild-like-counts needs posts.like_count
+    args.upgraded = migrations.upgrade(engine)
+    search.install(engine)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""Idempotent upgrades for databases created by earlier versions of the app.
+
+create_all only creates missing tables, so columns, constraints and indexes
+added to existing tables since the first release are applied here:
+
+- posts.like_count, posts.updated_at, users.token_version,
+  token_revocations.created_at and account_purges.updated_at columns
+- the one-like-per-user-per-post unique constraint (duplicates are dropped)
+- ON DELETE CASCADE on every foreign key
+- AUTOINCREMENT on users, so ids of deleted users are never reused
+- the composite indexes behind keyset pagination, exports and like pages
+
+SQLite cannot alter constraints in place, so affected tables are rebuilt
+with the usual create-copy-drop-rename sequence. Other databases get the
+equivalent ALTER TABLE statements. Denormalized data that an upgrade adds is
+backfilled afterwards. Running upgrade() on an up-to-date database only
+inspects it.
+"""
+import logging
+from sqlalchemy import Table, UniqueConstraint, exists, inspect, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import AddConstraint, CreateColumn, CreateTable
+from typing import List
+from . import crud, models
+from .database import Base
+
+logger = logging.getLogger(__name__)
+
+
+def _missing_columns(inspector, table: Table) -> list:
+    existing = {column["name"] for column in inspector.get_columns(table.name)}
+    return [column for column in table.columns if column.name not in existing]
+
+
+def _mismatched_foreign_keys(inspector, table: Table) -> list:
+    existing = {
+        tuple(fk["constrained_columns"]): (fk["options"] or {}).get("ondelete", "").upper()
+        for fk in inspector.get_foreign_keys(table.name)
+    }
+    return [
+        fk for fk in table.foreign_key_constraints
+        if existing.get(tuple(fk.column_keys)) != (fk.ondelete or "").upper()
+    ]
+
+
+def _missing_unique_constraints(inspector, table: Table) -> list:
+    existing = {frozenset(uc["column_names"]) for uc in inspector.get_unique_constraints(table.name)}
+    existing.update(frozenset(index["column_names"]) for index in inspector.get_indexes(table.name) if index["unique"])
+    return [
+        uc for uc in table.constraints
+        if isinstance(uc, UniqueConstraint) and frozenset(uc.columns.keys()) not in existing
+    ]
+
+
+def _missing_autoincrement(conn: Connection, table: Table) -> bool:
+    if conn.dialect.name != "sqlite" or not table.dialect_options["sqlite"]["autoincrement"]:
+        return False
+    sql = conn.scalar(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name})
+    return "AUTOINCREMENT" not in sql.upper()
+
+
+def _rebuild_sqlite_table(conn: Connection, table: Table, copied_columns: List[str]):
+    """Recreate `table` from the model, keeping its rows; duplicate and orphaned rows are dropped"""
+    staging = f"_upgrade_{table.name}"
+    create = str(CreateTable(table).compile(dialect=conn.dialect)).replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {staging} ", 1)
+    columns = ", ".join(copied_columns)
+    # Foreign keys were not always enforced; rows pointing at missing parents cannot be kept
+    referenced = [
+        f"({fk.parent.name} IS NULL OR {fk.parent.name} IN (SELECT {fk.column.name} FROM {fk.column.table.name}))"
+        for fk in table.foreign_keys
+    ]
+    where = f" WHERE {' AND '.join(referenced)}" if referenced else ""
+    order = ", ".join(column.name for column in table.primary_key)
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {staging}")
+    conn.exec_driver_sql(create)
+    # OR IGNORE keeps the oldest row of any group that violates a new unique constraint
+    conn.exec_driver_sql(f"INSERT OR IGNORE INTO {staging} ({columns}) SELECT {columns} FROM {table.name}{where} ORDER BY {order}")
+    conn.exec_driver_sql(f"DROP TABLE {table.name}")
+    conn.exec_driver_sql(f"ALTER TABLE {staging} RENAME TO {table.name}")
+
+
+def _alter_table(conn: Connection, inspector, table: Table, columns: list, foreign_keys: list, unique_constraints: list):
+    for column in columns:
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(dialect=conn.dialect)}"))
+    existing = {tuple(fk["constrained_columns"]): fk["name"] for fk in inspector.get_foreign_keys(table.name)}
+    for fk in foreign_keys:
+        name = existing.get(tuple(fk.column_keys))
+        if name:
+            conn.execute(text(f"ALTER TABLE {table.name} DROP CONSTRAINT {name}"))
+        conn.execute(AddConstraint(fk))
+    for uc in unique_constraints:
+        keys = ", ".join(uc.columns.keys())
+        conn.execute(text(f"DELETE FROM {table.name} WHERE id NOT IN (SELECT min(id) FROM {table.name} GROUP BY {keys})"))
+        conn.execute(AddConstraint(uc))
+
+
+def upgrade(engine: Engine) -> List[str]:
+    """Bring an existing database up to the current models; returns what was changed"""
+    changes = []
+    sqlite = engine.dialect.name == "sqlite"
+    with engine.connect() as conn:
+        if sqlite:
+            # Rebuilding a parent table must not cascade into its children; this pragma is a no-op inside a transaction
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            conn.commit()
+            conn.exec_driver_sql("BEGIN")
+        try:
+            for table in Base.metadata.sorted_tables:
+                inspector = inspect(conn)
+                if not inspector.has_table(table.name):
+                    continue
+                columns = _missing_columns(inspector, table)
+                foreign_keys = _mismatched_foreign_keys(inspector, table)
+                unique_constraints = _missing_unique_constraints(inspector, table)
+                autoincrement = _missing_autoincrement(conn, table)
+                if not (columns or foreign_keys or unique_constraints or autoincrement):
+                    continue
+                changes += [f"{table.name}.{column.name}" for column in columns]
+                changes += [f"{table.name} foreign key ({', '.join(fk.column_keys)}) ON DELETE {fk.ondelete}" for fk in foreign_keys]
+                changes += [f"{table.name} unique ({', '.join(uc.columns.keys())})" for uc in unique_constraints]
+                if autoincrement:
+                    changes.append(f"{table.name} AUTOINCREMENT")
+                if sqlite:
+                    missing = {column.name for column in columns}
+                    _rebuild_sqlite_table(conn, table, [column.name for column in table.columns if column.name not in missing])
+                else:
+                    _alter_table(conn, inspector, table, columns, foreign_keys, unique_constraints)
+            # Rebuilt tables lose their indexes, and create_all never adds indexes to existing tables
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(conn, checkfirst=True)
+            conn.commit()
+        finally:
+            if sqlite:
+                conn.rollback()
+                conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+
+    with Session(engine) as db:
+        if "posts.updated_at" in changes:
+            db.execute(update(models.Post).where(models.Post.updated_at.is_(None)).values(updated_at=models.Post.created_at))
+            db.commit()
+        if "posts.like_count" in changes or any(change.startswith("likes unique") for change in changes):
+            crud.rebuild_like_counts(db)
+        # user_stats arrived as a new table, so existing users have no row yet
+        without_stats = select(models.User.id).where(~exists().where(models.UserStats.user_id == models.User.id)).limit(1)
+        if db.scalar(without_stats) is not None:
+            crud.rebuild_user_stats(db)
+            changes.append("user_stats backfill")
+    for change in changes:
+        logger.info("Schema upgrade: %s", change)
+    return changes
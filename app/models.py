@@ -1,18 +1,32 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Boolean, Text, Index, UniqueConstraint
+from sqlalchemy.orm import relationship, declarative_base, query_expression
 from datetime import datetime, UTC
 from .database import Base
 
 class User(Base):
     __tablename__ = "users"
+    # Never reuse ids: revocations of a deleted user's tokens outlive its row
+    __table_args__ = {"sqlite_autoincrement": True}
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
-    posts = relationship("Post", back_populates="owner", cascade="all, delete-orphan")
-    likes = relationship("Like", back_populates="user", cascade="all, delete-orphan")
+    # Carried in access tokens as "ver"; bumping it revokes every token issued before
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Children are removed by ON DELETE CASCADE rather than loaded and deleted one by one
+    posts = relationship("Post", back_populates="owner", cascade="all, delete-orphan", passive_deletes=True)
+    likes = relationship("Like", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    stats = relationship("UserStats", uselist=False, cascade="all, delete-orphan", passive_deletes=True)
+
+class UserStats(Base):
+    """Per-user counters maintained by the crud write paths"""
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    posts_count = Column(Integer, nullable=False, default=0, server_default="0")
+    likes_given = Column(Integer, nullable=False, default=0, server_default="0")
+    likes_received = Column(Integer, nullable=False, default=0, server_default="0")
 
 class Post(Base):
     __tablename__ = "posts"
@@ -22,15 +36,62 @@ class Post(Base):
     content = Column(Text, nullable=False)
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     is_public = Column(Boolean, default=True)
-    owner_id = Column(Integer, ForeignKey("users.id"))
+    like_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Bumped by every UPDATE of the row, including like counter changes; drives ETag/Last-Modified
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     owner = relationship("User", back_populates="posts")
-    likes = relationship("Like", back_populates="post", cascade="all, delete-orphan")
+    likes = relationship("Like", back_populates="post", cascade="all, delete-orphan", passive_deletes=True)
+    # Populated only by queries that ask for it (crud.post_load_options); None otherwise
+    content_preview = query_expression()
+    __table_args__ = (
+        # Back the `is_public OR owner_id = :me` list filter with keyset order on id
+        Index("ix_posts_is_public_id", "is_public", "id"),
+        Index("ix_posts_owner_id_id", "owner_id", "id"),
+        # Incremental exports (?since=) walk posts in (updated_at, id) order
+        Index("ix_posts_updated_at_id", "updated_at", "id"),
+    )
 
 class Like(Base):
     __tablename__ = "likes"
     id = Column(Integer, primary_key=True, index=True)
-    post_id = Column(Integer, ForeignKey("posts.id"))
-    user_id = Column(Integer, ForeignKey("users.id"))
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     created_at = Column(DateTime, default=lambda: datetime.now(UTC))
     post = relationship("Post", back_populates="likes")
-    user = relationship("User", back_populates="likes") 
\ No newline at end of file
+    user = relationship("User", back_populates="likes")
+    __table_args__ = (
+        # One like per user per post; also the conflict target for idempotent likes
+        UniqueConstraint("user_id", "post_id", name="uq_likes_user_id_post_id"),
+        # Keyset pagination over a post's likes
+        Index("ix_likes_post_id_id", "post_id", "id"),
+    )
+
+class TokenRevocation(Base):
+    """One revoked token (jti), or every token of a user below min_version; kept until expires_at"""
+    __tablename__ = "token_revocations"
+    id = Column(Integer, primary_key=True)
+    # Unique so a refresh token can only be rotated once
+    jti = Column(String, unique=True)
+    user_id = Column(Integer, nullable=False)
+    min_version = Column(Integer)
+    # Once the covered tokens have expired the row is no longer needed
+    expires_at = Column(DateTime, nullable=False, index=True)
+    # Set before the INSERT, so before commit; TokenRevocations.sync re-reads recent rows by it
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC), index=True)
+
+class AccountPurge(Base):
+    """Progress of a background account deletion"""
+    __tablename__ = "account_purges"
+    id = Column(String, primary_key=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending")
+    posts_total = Column(Integer, nullable=False, default=0)
+    likes_total = Column(Integer, nullable=False, default=0)
+    posts_deleted = Column(Integer, nullable=False, default=0)
+    likes_deleted = Column(Integer, nullable=False, default=0)
+    error = Column(String)
+    created_at = Column(DateTime, default=lambda: datetime.now(UTC))
+    # Moves with every committed batch, so a purge whose process died can be told from a running one
+    updated_at = Column(DateTime, default=lambda: datetime.now(UTC), onupdate=lambda: datetime.now(UTC))
+    finished_at = Column(DateTime)
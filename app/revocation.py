@@ -0,0 +1,143 @@
+"""Token revocation checked in memory on every request.
+
+Two kinds of revocation are kept, both as rows of token_revocations so that
+every worker can rebuild them at startup and pick up the others' changes:
+
+- a jti: one access or refresh token (logout, refresh token rotation)
+- a user id with a minimum token version: every token issued to the user
+  before a password change, deactivation or deletion
+
+A row is only needed until the tokens it covers have expired, so rows past
+expires_at are pruned. Checking a token is two dict lookups.
+
+Ids are allocated at INSERT but become visible at COMMIT, so a row can appear
+after rows with higher ids have been synced. Each sync therefore also re-reads
+rows created in the last REVOCATION_SYNC_OVERLAP_SECONDS, skipping ids it has
+already applied.
+"""
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime, timedelta, UTC
+from dotenv import load_dotenv
+from sqlalchemy import delete, or_, select
+from typing import Optional
+from . import models
+
+load_dotenv()
+# Lifetime of refresh tokens, the longest-lived tokens; user revocations are kept this long
+REFRESH_TOKEN_EXPIRE_DAYS = float(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 14))
+# How often each worker loads revocations written by other workers (0 disables)
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", 30))
+# Must exceed the longest INSERT-to-COMMIT delay of a revocation plus clock skew between workers
+REVOCATION_SYNC_OVERLAP_SECONDS = float(os.getenv("REVOCATION_SYNC_OVERLAP_SECONDS", max(300, 3 * REVOCATION_SYNC_SECONDS)))
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> datetime:
+    # Stored naive, like every other timestamp column
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def user_revocation(user_id: int, min_version: int) -> models.TokenRevocation:
+    """Row revoking every token of `user_id` with a version below `min_version`"""
+    now = _utcnow()
+    return models.TokenRevocation(
+        user_id=user_id, min_version=min_version, expires_at=now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS), created_at=now
+    )
+
+
+def token_revocation(jti: str, user_id: int, expires_at: datetime) -> models.TokenRevocation:
+    """Row revoking the single token `jti` until it expires"""
+    return models.TokenRevocation(
+        jti=jti, user_id=user_id, expires_at=expires_at.astimezone(UTC).replace(tzinfo=None), created_at=_utcnow()
+    )
+
+
+class TokenRevocations:
+    """Thread-safe in-memory copy of token_revocations"""
+
+    def __init__(self, overlap: float = REVOCATION_SYNC_OVERLAP_SECONDS):
+        self.overlap = overlap
+        self._jtis = {}
+        self._min_versions = {}
+        self._last_id = 0
+        # id -> created_at of rows inside the overlap window that were already applied
+        self._recent_ids = {}
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti: Optional[str], user_id: int, version: int) -> bool:
+        if jti is not None and jti in self._jtis:
+            return True
+        entry = self._min_versions.get(user_id)
+        return entry is not None and version < entry[0]
+
+    def add(self, user_id: int, expires_at: datetime, jti: Optional[str] = None, min_version: Optional[int] = None):
+        """Apply a revocation in this process; call after the matching row is committed"""
+        with self._lock:
+            if jti is not None:
+                self._jtis[jti] = expires_at
+            if min_version is not None:
+                current = self._min_versions.get(user_id)
+                if current is None or min_version >= current[0]:
+                    self._min_versions[user_id] = (min_version, expires_at)
+
+    def add_row(self, row: models.TokenRevocation):
+        self.add(row.user_id, row.expires_at, jti=row.jti, min_version=row.min_version)
+
+    def sync(self, db):
+        """Load rows committed since the last sync and forget entries that have expired; returns the number loaded"""
+        now = _utcnow()
+        recent = now - timedelta(seconds=self.overlap)
+        rows = db.scalars(
+            select(models.TokenRevocation)
+            .where(
+                or_(models.TokenRevocation.id > self._last_id, models.TokenRevocation.created_at > recent),
+                models.TokenRevocation.expires_at > now,
+            )
+            .order_by(models.TokenRevocation.id)
+        ).all()
+        rows = [row for row in rows if row.id not in self._recent_ids]
+        for row in rows:
+            self.add_row(row)
+        with self._lock:
+            if rows:
+                self._last_id = max(self._last_id, rows[-1].id)
+            self._recent_ids.update((row.id, row.created_at) for row in rows if row.created_at is not None and row.created_at > recent)
+            self._recent_ids = {row_id: created for row_id, created in self._recent_ids.items() if created > recent}
+            self._jtis = {jti: expires for jti, expires in self._jtis.items() if expires > now}
+            self._min_versions = {user_id: entry for user_id, entry in self._min_versions.items() if entry[1] > now}
+        return len(rows)
+
+    def clear(self):
+        with self._lock:
+            self._jtis.clear()
+            self._min_versions.clear()
+            self._recent_ids.clear()
+            self._last_id = 0
+
+
+def prune(db) -> int:
+    """Delete rows whose tokens have all expired; returns the number removed"""
+    result = db.execute(delete(models.TokenRevocation).where(models.TokenRevocation.expires_at <= _utcnow()))
+    db.commit()
+    return result.rowcount
+
+
+revocations = TokenRevocations()
+
+
+async def run_periodic_sync(session_factory, store: TokenRevocations = revocations, interval: float = REVOCATION_SYNC_SECONDS):
+    """Pull other workers' revocations every `interval` seconds on a worker thread until cancelled"""
+    def sync():
+        with session_factory() as db:
+            store.sync(db)
+
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(sync)
+        except Exception:
+            logger.exception("Token revocation sync failed")
@@ -1,11 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Body, Query, Response
 from sqlalchemy.orm import Session
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from .. import schemas, crud, auth, dependencies
 from ..database import SessionLocal
+from ..hashing import password_hasher
+from ..serialization import json_response
+from datetime import datetime, UTC
+import asyncio
+import logging
+import os
 import re
 
+# How often each worker looks for purges left unfinished by a restart (0 = only at startup)
+PURGE_RESUME_SECONDS = float(os.getenv("PURGE_RESUME_SECONDS", 300))
+
 router = APIRouter(prefix="/accounts", tags=["accounts"])
+logger = logging.getLogger(__name__)
 
 def validate_password(password: str):
     if (len(password) < 8 or
@@ -16,49 +27,138 @@ def validate_password(password: str):
         raise HTTPException(status_code=400, detail="Password must be at least 8 characters long and include an uppercase letter, a lowercase letter, a digit, and a special character.")
 
 @router.post("/", response_model=schemas.UserResponse)
-def create_account(user: schemas.UserCreate, db: Session = Depends(dependencies.get_db)):
+async def create_account(user: schemas.UserCreate, db: Session = Depends(dependencies.get_db)):
     validate_password(user.password)
-    db_user = crud.get_user_by_email(db, user.email)
+    db_user = await run_in_threadpool(crud.get_user_by_email, db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db, user)
+    hashed_password = await password_hasher.hash(user.password)
+    return json_response(schemas.UserResponse, await run_in_threadpool(crud.create_user, db, user, hashed_password))
 
 @router.post("/login", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(dependencies.get_db)):
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(dependencies.get_db)):
+    user = await auth.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
-    access_token = auth.create_access_token(data={"sub": str(user.id)})
-    return {"access_token": access_token, "token_type": "bearer"}
+    return auth.issue_tokens(user)
+
+@router.post("/refresh", response_model=schemas.Token)
+def refresh_tokens(request: schemas.RefreshRequest, db: Session = Depends(dependencies.get_db)):
+    """Swap a refresh token for a new access and refresh token; each refresh token works once"""
+    token_data = auth.verify_refresh_token(request.refresh_token)
+    user = crud.get_user(db, token_data.user_id)
+    if user is None or not user.is_active or user.token_version != token_data.version:
+        raise HTTPException(status_code=401, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+    tokens = auth.issue_tokens(user)
+    expires_at = datetime.fromtimestamp(token_data.expires_at, UTC)
+    if not crud.revoke_token(db, token_data.user_id, token_data.jti, expires_at):
+        # Another request rotated it first
+        raise HTTPException(status_code=401, detail="Could not validate credentials", headers={"WWW-Authenticate": "Bearer"})
+    return tokens
+
+@router.post("/logout", status_code=204)
+def logout(
+    request: schemas.LogoutRequest = Body(default=schemas.LogoutRequest()),
+    token: str = Depends(auth.oauth2_scheme),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user_from_claims),
+    db: Session = Depends(dependencies.get_db)
+):
+    """Revoke the access token used for this request and, if given, the session's refresh token"""
+    revoked = [auth.verify_token(token)[0]]
+    if request.refresh_token:
+        refresh = auth.verify_refresh_token(request.refresh_token)
+        if refresh.user_id != current_user.id:
+            raise HTTPException(status_code=400, detail="Refresh token belongs to another user")
+        revoked.append(refresh)
+    for token_data in revoked:
+        # Tokens issued before jti claims can only be revoked along with all of the user's tokens
+        if token_data.jti:
+            crud.revoke_token(db, current_user.id, token_data.jti, datetime.fromtimestamp(token_data.expires_at, UTC))
+    return Response(status_code=204)
 
 @router.put("/", response_model=schemas.UserResponse)
-def update_account(user_update: schemas.UserUpdate = Body(...), current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
+async def update_account(user_update: schemas.UserUpdate = Body(...), current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
+    hashed_password = None
     if user_update.password:
         validate_password(user_update.password)
-    user = crud.get_user(db, current_user.id)
-    return crud.update_user(db, user, user_update)
+        hashed_password = await password_hasher.hash(user_update.password)
+    user = await run_in_threadpool(crud.get_user, db, current_user.id)
+    # Tokens carrying profile claims would keep showing the old profile
+    updated = await run_in_threadpool(crud.update_user, db, user, user_update, hashed_password, auth.TOKEN_PROFILE_CLAIMS)
+    return json_response(schemas.UserResponse, updated)
+
+def run_account_purge(job_id: str):
+    with SessionLocal() as db:
+        crud.purge_user(db, job_id)
+
+def resume_account_purges() -> list:
+    """Finish purges whose background task was lost, e.g. to a restart; returns the job ids"""
+    with SessionLocal() as db:
+        job_ids = crud.claim_stale_purges(db)
+    for job_id in job_ids:
+        logger.info("Resuming account purge %s", job_id)
+        run_account_purge(job_id)
+    return job_ids
+
+async def run_periodic_purge_resume(interval: float = PURGE_RESUME_SECONDS):
+    """Resume lost purges on a worker thread at startup, then every `interval` seconds until cancelled"""
+    while True:
+        try:
+            await asyncio.to_thread(resume_account_purges)
+        except Exception:
+            logger.exception("Resuming account purges failed")
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
 
 @router.delete("/", status_code=200)
-def delete_account(current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
+def delete_account(
+    response: Response,
+    background_tasks: BackgroundTasks,
+    background: bool = Query(False, description="Deactivate now and purge posts and likes in background batches"),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user),
+    db: Session = Depends(dependencies.get_db)
+):
     user = crud.get_user(db, current_user.id)
+    if background:
+        job = crud.deactivate_user(db, user)
+        background_tasks.add_task(run_account_purge, job.id)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return {
+            "message": "Account deactivated. Posts and likes are being removed in the background.",
+            "job_id": job.id,
+            "status_url": f"/accounts/purges/{job.id}",
+        }
     result = crud.delete_user(db, user)
     return result
 
+@router.get("/purges/{job_id}", response_model=schemas.AccountPurgeResponse)
+def get_account_purge(job_id: str, db: Session = Depends(dependencies.get_db)):
+    """Progress of a background account deletion.
+
+    Unauthenticated, because the account's tokens are revoked when the purge starts:
+    the random job id is the only secret, so it should be shared like a token.
+    """
+    job = crud.get_account_purge(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return json_response(schemas.AccountPurgeResponse, job)
+
 @router.get("/me", response_model=schemas.UserResponse)
-def get_me(current_user: schemas.UserResponse = Depends(auth.get_current_user)):
-    return current_user
+def get_me(current_user: schemas.UserResponse = Depends(auth.get_current_user_from_claims)):
+    return json_response(schemas.UserResponse, current_user)
 
-@router.get("/me/stats")
-def get_my_stats(current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
+@router.get("/me/stats", response_model=schemas.UserStatsResponse)
+def get_my_stats(current_user: schemas.UserResponse = Depends(auth.get_current_user_from_claims), db: Session = Depends(dependencies.get_db)):
     """Get current user's statistics including posts and likes count"""
-    posts_count = crud.get_user_posts_count(db, current_user.id)
-    likes_count = crud.get_user_likes_count(db, current_user.id)
+    stats = crud.get_user_stats(db, current_user.id)
     
-    return {
+    return json_response(schemas.UserStatsResponse, {
         "user_id": current_user.id,
         "user_name": current_user.name,
         "user_email": current_user.email,
-        "posts_count": posts_count,
-        "likes_count": likes_count,
-        "total_impact": posts_count + likes_count
-    } 
\ No newline at end of file
+        "posts_count": stats.posts_count,
+        "likes_count": stats.likes_given,
+        "likes_received": stats.likes_received,
+        "total_impact": stats.posts_count + stats.likes_given
+    })
\ No newline at end of file
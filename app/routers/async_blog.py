@@ -0,0 +1,113 @@
+"""AsyncSession versions of the hot /blog routes, mounted ahead of routers.blog
+when DATABASE_ASYNC is enabled. Routes not defined here fall through to the
+sync router."""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional
+from .. import schemas, async_crud, auth, dependencies, conditional, search, trending
+from ..cache import post_cache, post_key
+from ..serialization import json_response
+from . import blog
+
+router = APIRouter(prefix="/blog", tags=["blog"])
+
+async def get_visible_post(db: AsyncSession, post_id: int, user_id: int, defer_content: bool = False):
+    post = await async_crud.get_post(db, post_id, defer_content=defer_content)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if not post.is_public and post.owner_id != user_id:
+        raise HTTPException(status_code=403, detail="Not authorized to view this post")
+    return post
+
+@router.post("/", response_model=schemas.PostResponse)
+async def create_blog(post: schemas.PostCreate, current_user: schemas.UserResponse = Depends(auth.get_current_user_async), db: AsyncSession = Depends(dependencies.get_async_db)):
+    return json_response(schemas.PostResponse, await async_crud.create_post(db, post, current_user.id))
+
+@router.get("/", response_model=List[schemas.PostResponse])
+async def get_blogs(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, gt=0),
+    after: Optional[int] = Query(None, ge=0, description="Return posts with an id greater than this cursor; overrides skip"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of post fields to return, e.g. id,title,description,created_at"),
+    view: Literal["full", "summary"] = Query("full", description="summary returns content_preview instead of content"),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(dependencies.get_async_db)
+):
+    selected = blog.parse_fields(fields, view)
+    variant = ",".join(selected) if selected else ""
+    if conditional.has_conditional_headers(request):
+        versions = await async_crud.get_posts_versions(db, skip=skip, limit=limit, viewer_id=current_user.id, after=after)
+        etag, last_modified = conditional.list_validators(versions, variant)
+        if conditional.is_not_modified(request, etag, last_modified):
+            headers = conditional.validator_headers(etag, last_modified)
+            if len(versions) == limit:
+                headers["X-Next-Cursor"] = str(versions[-1].id)
+            return conditional.not_modified_response(headers)
+    posts = await async_crud.get_posts(db, skip=skip, limit=limit, viewer_id=current_user.id, after=after, fields=selected)
+    response.headers.update(conditional.validator_headers(*conditional.list_validators(posts, variant)))
+    if len(posts) == limit:
+        response.headers["X-Next-Cursor"] = str(posts[-1].id)
+    if selected:
+        return json_response(List[schemas.post_fields_model(selected)], posts, response, force=True)
+    return json_response(List[schemas.PostResponse], posts, response)
+
+# Streams from its own sync session on a worker thread; registered here so /{post_id} doesn't shadow it
+router.add_api_route("/export", blog.export_blogs, methods=["GET"], response_class=StreamingResponse, responses=blog.export_blogs_responses)
+
+@router.get("/search", response_model=schemas.PostSearchPage)
+async def search_blogs(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for in titles and content"),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, gt=0, le=100),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(dependencies.get_async_db)
+):
+    match, cursor = blog.parse_search(db.get_bind().dialect.name, q, after)
+    rows = (await db.execute(search.search_query(match, current_user.id, cursor, limit))).all()
+    posts, next_cursor = search.split_results(rows, limit)
+    return json_response(schemas.PostSearchPage, {"items": posts, "next_cursor": next_cursor})
+
+@router.get("/trending", response_model=List[schemas.TrendingPost])
+async def get_trending(
+    limit: int = Query(20, gt=0, le=trending.TRENDING_TOP_K),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(dependencies.get_async_db)
+):
+    ranking = trending.trending_tracker.top()
+    if not ranking:
+        return []
+    posts = await async_crud.get_posts_by_ids(db, [post_id for post_id, _ in ranking], current_user.id)
+    return json_response(List[schemas.TrendingPost], blog.ranked_posts(ranking, posts, limit))
+
+@router.get("/{post_id}", response_model=schemas.PostWithLikes)
+async def get_blog(post_id: int, request: Request, response: Response, current_user: schemas.UserResponse = Depends(auth.get_current_user_async), db: AsyncSession = Depends(dependencies.get_async_db)):
+    envelope = post_cache.get(post_key(post_id))
+    if envelope is not None:
+        return blog.cached_post_response(request, envelope)
+    generation = post_cache.generation(post_key(post_id))
+    conditional_get = conditional.has_conditional_headers(request)
+    post = await get_visible_post(db, post_id, current_user.id, defer_content=conditional_get)
+    etag, last_modified = conditional.post_validators(post)
+    headers = conditional.validator_headers(etag, last_modified)
+    if conditional_get:
+        if conditional.is_not_modified(request, etag, last_modified):
+            return conditional.not_modified_response(headers)
+        post = await async_crud.get_post(db, post_id)
+    response.headers.update(headers)
+    likes, next_cursor = await async_crud.get_post_likes(db, post_id, limit=blog.DETAIL_LIKES_LIMIT)
+    return blog.post_detail_response(post, likes, next_cursor, response, headers, generation)
+
+@router.get("/{post_id}/likes", response_model=schemas.LikePage)
+async def get_blog_likes(
+    post_id: int,
+    after: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, gt=0, le=500),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(dependencies.get_async_db)
+):
+    await get_visible_post(db, post_id, current_user.id)
+    likes, next_cursor = await async_crud.get_post_likes(db, post_id, after=after, limit=limit)
+    return json_response(schemas.LikePage, {"items": likes, "next_cursor": next_cursor})
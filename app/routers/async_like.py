@@ -0,0 +1,31 @@
+"""AsyncSession versions of the /like routes, mounted ahead of routers.like
+when DATABASE_ASYNC is enabled."""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import schemas, async_crud, auth, dependencies
+from ..serialization import json_response
+
+router = APIRouter(prefix="/like", tags=["like"])
+
+@router.post("/{post_id}", response_model=schemas.LikeResponse)
+async def like_blog(post_id: int, current_user: schemas.UserResponse = Depends(auth.get_current_user_async), db: AsyncSession = Depends(dependencies.get_async_db)):
+    like = await async_crud.create_like(db, current_user.id, post_id)
+    if like:
+        return json_response(schemas.LikeResponse, like)
+    # Nothing was inserted; liking again is a no-op that returns the existing like
+    like = await async_crud.get_like(db, current_user.id, post_id)
+    if like:
+        return json_response(schemas.LikeResponse, like)
+    post = await async_crud.get_post(db, post_id)
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
+    if not post.is_public and post.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to like this post")
+    # The like was removed between the INSERT and the lookup
+    raise HTTPException(status_code=409, detail="Like changed concurrently, please retry")
+
+@router.delete("/{post_id}", status_code=204)
+async def unlike_blog(post_id: int, current_user: schemas.UserResponse = Depends(auth.get_current_user_async), db: AsyncSession = Depends(dependencies.get_async_db)):
+    if not await async_crud.delete_like(db, current_user.id, post_id):
+        raise HTTPException(status_code=404, detail="Like not found")
+    return
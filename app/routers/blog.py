@@ -1,38 +1,198 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from datetime import datetime, UTC
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List
-from .. import schemas, crud, auth, dependencies
+from typing import List, Literal, Optional
+from .. import schemas, crud, auth, dependencies, conditional, search, trending
+from ..serialization import encode, encode_lines, json_response
+from ..cache import pack_response, post_cache, post_key, unpack_response
+from ..database import SessionLocal
 
 router = APIRouter(prefix="/blog", tags=["blog"])
 
+# Likes embedded in the post detail; the rest are paged via /blog/{post_id}/likes
+DETAIL_LIKES_LIMIT = 20
+
 @router.post("/", response_model=schemas.PostResponse)
 def create_blog(post: schemas.PostCreate, current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
-    return crud.create_post(db, post, current_user.id)
+    return json_response(schemas.PostResponse, crud.create_post(db, post, current_user.id))
+
+@router.post("/bulk", response_model=schemas.PostBulkResponse)
+def create_blogs_bulk(posts: schemas.PostBulkCreate, current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
+    """Create up to schemas.MAX_BULK_POSTS posts in a single transaction"""
+    return json_response(schemas.PostBulkResponse, {"ids": crud.create_posts_bulk(db, posts, current_user.id)})
+
+def parse_fields(fields: Optional[str], view: str) -> Optional[tuple]:
+    """Post fields to load and return for ?fields= / ?view=summary; None means full posts"""
+    if fields:
+        requested = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = requested - set(schemas.POST_FIELDS)
+        if unknown:
+            raise HTTPException(
+                status_code=422,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}. Choose from: {', '.join(schemas.POST_FIELDS)}",
+            )
+        return tuple(field for field in schemas.POST_FIELDS if field in requested)
+    if view == "summary":
+        return schemas.POST_SUMMARY_FIELDS
+    return None
 
 @router.get("/", response_model=List[schemas.PostResponse])
 def get_blogs(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0), 
     limit: int = Query(100, gt=0), 
+    after: Optional[int] = Query(None, ge=0, description="Return posts with an id greater than this cursor; overrides skip"),
+    fields: Optional[str] = Query(None, description="Comma-separated subset of post fields to return, e.g. id,title,description,created_at"),
+    view: Literal["full", "summary"] = Query("full", description="summary returns content_preview instead of content"),
     current_user: schemas.UserResponse = Depends(auth.get_current_user), 
     db: Session = Depends(dependencies.get_db)
 ):
-    all_posts = crud.get_posts(db, skip=skip, limit=limit)
-    visible_posts = [
-        post for post in all_posts
-        if post.is_public or post.owner_id == current_user.id
-    ]
-    return visible_posts
+    selected = parse_fields(fields, view)
+    variant = ",".join(selected) if selected else ""
+    if conditional.has_conditional_headers(request):
+        # Validate against ids and versions only; whole posts are fetched just when changed
+        versions = crud.get_posts_versions(db, skip=skip, limit=limit, viewer_id=current_user.id, after=after)
+        etag, last_modified = conditional.list_validators(versions, variant)
+        if conditional.is_not_modified(request, etag, last_modified):
+            headers = conditional.validator_headers(etag, last_modified)
+            if len(versions) == limit:
+                headers["X-Next-Cursor"] = str(versions[-1].id)
+            return conditional.not_modified_response(headers)
+    posts = crud.get_posts(db, skip=skip, limit=limit, viewer_id=current_user.id, after=after, fields=selected)
+    response.headers.update(conditional.validator_headers(*conditional.list_validators(posts, variant)))
+    if len(posts) == limit:
+        response.headers["X-Next-Cursor"] = str(posts[-1].id)
+    if selected:
+        return json_response(List[schemas.post_fields_model(selected)], posts, response, force=True)
+    return json_response(List[schemas.PostResponse], posts, response)
 
-@router.get("/{post_id}", response_model=schemas.PostWithLikes)
-def get_blog(post_id: int, current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
-    post = crud.get_post(db, post_id)
+def export_lines(viewer_id: int, since: Optional[datetime]):
+    # FastAPI closes the request's session before the body streams, so the export holds its own
+    with SessionLocal() as db:
+        for rows in crud.export_posts(db, viewer_id, since):
+            yield encode_lines(schemas.PostResponse, rows)
+
+export_blogs_responses = {200: {"content": {"application/x-ndjson": {}}, "description": "One PostResponse JSON object per line"}}
+
+@router.get("/export", response_class=StreamingResponse, responses=export_blogs_responses)
+def export_blogs(
+    since: Optional[datetime] = Query(None, description="Only posts created or changed at or after this time, e.g. a previous X-Export-Started-At"),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user)
+):
+    """Stream every post visible to the caller as NDJSON, in constant memory"""
+    started_at = datetime.now(UTC)
+    if since is not None and since.tzinfo is not None:
+        since = since.astimezone(UTC).replace(tzinfo=None)
+    return StreamingResponse(
+        export_lines(current_user.id, since),
+        media_type="application/x-ndjson",
+        headers={"X-Export-Started-At": started_at.strftime("%Y-%m-%dT%H:%M:%S.%fZ")},
+    )
+
+@router.get("/search", response_model=schemas.PostSearchPage)
+def search_blogs(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to look for in titles and content"),
+    after: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(20, gt=0, le=100),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user),
+    db: Session = Depends(dependencies.get_db)
+):
+    match, cursor = parse_search(db.get_bind().dialect.name, q, after)
+    posts, next_cursor = search.search_posts(db, match, current_user.id, after=cursor, limit=limit)
+    return json_response(schemas.PostSearchPage, {"items": posts, "next_cursor": next_cursor})
+
+def parse_search(dialect_name: str, q: str, after: Optional[str]):
+    """Validate search input; returns (match expression, decoded cursor)"""
+    if dialect_name != "sqlite":
+        raise HTTPException(status_code=501, detail="Search requires an SQLite database with FTS5")
+    match = search.match_expression(q)
+    if match is None:
+        raise HTTPException(status_code=422, detail="q must contain at least one word")
+    try:
+        return match, search.decode_cursor(after) if after else None
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Invalid cursor")
+
+def ranked_posts(ranking, posts, limit: int):
+    """TrendingPost data in ranking order, skipping posts the viewer could not load"""
+    by_id = {post.id: post for post in posts}
+    ranked = [{**by_id[post_id].__dict__, "score": score} for post_id, score in ranking if post_id in by_id]
+    return ranked[:limit]
+
+@router.get("/trending", response_model=List[schemas.TrendingPost])
+def get_trending(
+    limit: int = Query(20, gt=0, le=trending.TRENDING_TOP_K),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user),
+    db: Session = Depends(dependencies.get_db)
+):
+    """Posts with the most recent likes, from the in-memory ranking; score halves every TRENDING_HALF_LIFE_HOURS"""
+    ranking = trending.trending_tracker.top()
+    if not ranking:
+        return []
+    posts = crud.get_posts_by_ids(db, [post_id for post_id, _ in ranking], current_user.id)
+    return json_response(List[schemas.TrendingPost], ranked_posts(ranking, posts, limit))
+
+def get_visible_post(db: Session, post_id: int, user_id: int, defer_content: bool = False):
+    post = crud.get_post(db, post_id, defer_content=defer_content)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
-    if not post.is_public and post.owner_id != current_user.id:
+    if not post.is_public and post.owner_id != user_id:
         raise HTTPException(status_code=403, detail="Not authorized to view this post")
-    likes = post.likes
-    post_data = {k: v for k, v in post.__dict__.items() if k != "likes"}
-    return schemas.PostWithLikes(**post_data, likes=likes)
+    return post
+
+def cached_post_response(request: Request, envelope: bytes) -> Response:
+    body, etag, last_modified = unpack_response(envelope)
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "private, no-cache"}
+    if conditional.is_not_modified(request, etag, conditional.parse_http_date(last_modified)):
+        return conditional.not_modified_response(headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def post_detail_response(post, likes, next_cursor, response: Response, headers: dict, generation):
+    """Serialize a post detail, caching the JSON when the post is public.
+
+    `generation` is post_cache.generation() taken before the post was read: if a
+    write invalidated the post since, the body may already be stale and is not stored.
+    """
+    detail = {**{k: v for k, v in post.__dict__.items() if k != "likes"}, "likes": likes, "likes_next_cursor": next_cursor}
+    # Private posts are never cached: cache hits are served without a visibility check
+    if not post.is_public:
+        return json_response(schemas.PostWithLikes, detail, response)
+    body = encode(schemas.PostWithLikes, detail)
+    post_cache.set(post_key(post.id), pack_response(body, headers["ETag"], headers["Last-Modified"]), generation=generation)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@router.get("/{post_id}", response_model=schemas.PostWithLikes)
+def get_blog(post_id: int, request: Request, response: Response, current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
+    envelope = post_cache.get(post_key(post_id))
+    if envelope is not None:
+        return cached_post_response(request, envelope)
+    generation = post_cache.generation(post_key(post_id))
+    # With validators to check, leave `content` unloaded until we know the client needs it
+    conditional_get = conditional.has_conditional_headers(request)
+    post = get_visible_post(db, post_id, current_user.id, defer_content=conditional_get)
+    etag, last_modified = conditional.post_validators(post)
+    headers = conditional.validator_headers(etag, last_modified)
+    if conditional_get:
+        if conditional.is_not_modified(request, etag, last_modified):
+            return conditional.not_modified_response(headers)
+        post = crud.get_post(db, post_id)
+    response.headers.update(headers)
+    likes, next_cursor = crud.get_post_likes(db, post_id, limit=DETAIL_LIKES_LIMIT)
+    return post_detail_response(post, likes, next_cursor, response, headers, generation)
+
+@router.get("/{post_id}/likes", response_model=schemas.LikePage)
+def get_blog_likes(
+    post_id: int,
+    after: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, gt=0, le=500),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user),
+    db: Session = Depends(dependencies.get_db)
+):
+    get_visible_post(db, post_id, current_user.id)
+    likes, next_cursor = crud.get_post_likes(db, post_id, after=after, limit=limit)
+    return json_response(schemas.LikePage, {"items": likes, "next_cursor": next_cursor})
 
 @router.put("/{post_id}", response_model=schemas.PostResponse)
 def update_blog(post_id: int, post_update: schemas.PostUpdate, current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
@@ -41,7 +201,7 @@ def update_blog(post_id: int, post_update: schemas.PostUpdate, current_user: sch
         raise HTTPException(status_code=404, detail="Post not found")
     if post.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to update this post")
-    return crud.update_post(db, post, post_update)
+    return json_response(schemas.PostResponse, crud.update_post(db, post, post_update))
 
 @router.delete("/{post_id}", status_code=204)
 def delete_blog(post_id: int, current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
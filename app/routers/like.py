@@ -1,26 +1,47 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from .. import schemas, crud, auth, dependencies
+from ..serialization import json_response
 
 router = APIRouter(prefix="/like", tags=["like"])
 
+@router.get("/status", response_model=schemas.LikeStatusResponse)
+def like_status(
+    post_ids: str = Query(..., description="Comma-separated post ids, e.g. 1,2,3"),
+    current_user: schemas.UserResponse = Depends(auth.get_current_user),
+    db: Session = Depends(dependencies.get_db)
+):
+    try:
+        ids = list(dict.fromkeys(int(post_id) for post_id in post_ids.split(",") if post_id.strip()))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="post_ids must be a comma-separated list of integers")
+    if not ids:
+        raise HTTPException(status_code=422, detail="post_ids must not be empty")
+    if len(ids) > schemas.MAX_LIKE_STATUS_IDS:
+        raise HTTPException(status_code=422, detail=f"At most {schemas.MAX_LIKE_STATUS_IDS} post ids per request")
+    liked = crud.get_liked_post_ids(db, current_user.id, ids)
+    return json_response(schemas.LikeStatusResponse, {"liked": {post_id: post_id in liked for post_id in ids}})
+
 @router.post("/{post_id}", response_model=schemas.LikeResponse)
 def like_blog(post_id: int, current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
+    like = crud.create_like(db, current_user.id, post_id)
+    if like:
+        return json_response(schemas.LikeResponse, like)
+    # Nothing was inserted; liking again is a no-op that returns the existing like
+    like = crud.get_like(db, current_user.id, post_id)
+    if like:
+        return json_response(schemas.LikeResponse, like)
     post = crud.get_post(db, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
     # Only allow like if post is public or owned by current user
     if not post.is_public and post.owner_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to like this post")
-    like = crud.get_like(db, current_user.id, post_id)
-    if like:
-        raise HTTPException(status_code=400, detail="Already liked")
-    return crud.create_like(db, current_user.id, post_id)
+    # The like was removed between the INSERT and the lookup
+    raise HTTPException(status_code=409, detail="Like changed concurrently, please retry")
 
 @router.delete("/{post_id}", status_code=204)
 def unlike_blog(post_id: int, current_user: schemas.UserResponse = Depends(auth.get_current_user), db: Session = Depends(dependencies.get_db)):
-    like = crud.get_like(db, current_user.id, post_id)
-    if not like:
+    if not crud.delete_like(db, current_user.id, post_id):
         raise HTTPException(status_code=404, detail="Like not found")
-    crud.delete_like(db, like)
-    return 
\ No newline at end of file
+    return
@@ -1,5 +1,6 @@
-from pydantic import BaseModel, EmailStr, ConfigDict, Field
-from typing import Optional, List
+from functools import lru_cache
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, conlist, create_model
+from typing import Optional, List, Dict
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -19,6 +20,28 @@ class UserResponse(UserBase):
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+class UserStatsResponse(BaseModel):
+    user_id: int
+    user_name: str
+    user_email: EmailStr
+    posts_count: int
+    likes_count: int
+    likes_received: int
+    total_impact: int
+
+class AccountPurgeResponse(BaseModel):
+    id: str
+    user_id: int
+    status: str
+    posts_total: int
+    likes_total: int
+    posts_deleted: int
+    likes_deleted: int
+    error: Optional[str] = None
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
 class PostBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -29,6 +52,14 @@ class PostCreate(PostBase):
     title: str = Field(..., min_length=1)
     content: str = Field(..., min_length=1)
 
+# Upper bound on posts accepted by one POST /blog/bulk request
+MAX_BULK_POSTS = 1000
+
+PostBulkCreate = conlist(PostCreate, min_length=1, max_length=MAX_BULK_POSTS)
+
+class PostBulkResponse(BaseModel):
+    ids: List[int]
+
 class PostUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
@@ -39,8 +70,27 @@ class PostResponse(PostBase):
     id: int
     created_at: datetime
     owner_id: int
+    like_count: int = 0
+    updated_at: Optional[datetime] = None
     model_config = ConfigDict(from_attributes=True)
 
+# Fields a post list can be trimmed to with ?fields=; content_preview is computed in SQL
+POST_FIELDS = tuple(PostResponse.model_fields) + ("content_preview",)
+# What ?view=summary returns: everything but the full content
+POST_SUMMARY_FIELDS = tuple(field for field in POST_FIELDS if field != "content")
+
+@lru_cache(maxsize=256)
+def post_fields_model(fields: tuple) -> type:
+    """PostResponse trimmed to `fields` (in POST_FIELDS order), built once per combination"""
+    definitions = {
+        field: (Optional[str], None) if field == "content_preview" else (PostResponse.model_fields[field].annotation, ...)
+        for field in fields
+    }
+    return create_model(f"PostFields_{'_'.join(fields)}", __config__=ConfigDict(from_attributes=True), **definitions)
+
+class TrendingPost(PostResponse):
+    score: float
+
 class LikeBase(BaseModel):
     post_id: int
 
@@ -50,12 +100,41 @@ class LikeResponse(LikeBase):
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
 
+# Upper bound on post ids accepted by one GET /like/status request
+MAX_LIKE_STATUS_IDS = 500
+
+class LikeStatusResponse(BaseModel):
+    liked: Dict[int, bool]
+
 class Token(BaseModel):
     access_token: str
+    refresh_token: Optional[str] = None
     token_type: str
 
 class TokenData(BaseModel):
     user_id: Optional[int] = None
+    # Tokens issued before versioning carry no ver claim and count as version 0
+    version: int = 0
+    jti: Optional[str] = None
+    # "access" or "refresh"; tokens without a typ claim are access tokens
+    type: str = "access"
+    expires_at: Optional[int] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    # Also revoke this refresh token, so the session cannot be renewed
+    refresh_token: Optional[str] = None
+
+class LikePage(BaseModel):
+    items: List[LikeResponse]
+    next_cursor: Optional[int] = None
+
+class PostSearchPage(BaseModel):
+    items: List[PostResponse]
+    next_cursor: Optional[str] = None
 
 class PostWithLikes(PostResponse):
-    likes: List[LikeResponse] = [] 
\ No newline at end of file
+    likes: List[LikeResponse] = []
+    likes_next_cursor: Optional[int] = None 
\ No newline at end of file
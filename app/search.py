@@ -0,0 +1,127 @@
+"""Full-text search over post titles and content with an SQLite FTS5 index.
+
+`posts_fts` is an external-content FTS5 table: it stores only the index and
+reads title/content back from `posts` by rowid. Triggers keep it in step with
+every insert, delete (including ON DELETE CASCADE) and title/content update.
+"""
+import os
+import re
+from dotenv import load_dotenv
+from sqlalchemy import and_, column, func, literal_column, or_, select, table, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from typing import Optional
+from . import models
+from .crud import visible_to
+
+load_dotenv()
+# Title matches weigh more than body matches in the BM25 score
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+# Upper bound on search terms taken from one query string
+MAX_SEARCH_TERMS = 16
+# Only the newest matching posts are ranked, so a very common term costs the same as a rarer one
+MAX_SEARCH_CANDIDATES = int(os.getenv("MAX_SEARCH_CANDIDATES", 10000))
+
+_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+    END
+    """,
+    # Only text edits touch the index; like_count/updated_at updates do not
+    """
+    CREATE TRIGGER IF NOT EXISTS posts_fts_au AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    """,
+]
+
+posts_fts = table("posts_fts", column("rowid"))
+
+
+def install(engine: Engine) -> None:
+    """Create the FTS table and triggers if missing, indexing existing posts on first install"""
+    if engine.dialect.name != "sqlite":
+        return
+    with engine.begin() as conn:
+        exists = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'posts_fts'")).first()
+        for statement in _DDL:
+            conn.execute(text(statement))
+        if not exists:
+            conn.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+
+
+def rebuild(db: Session) -> int:
+    """Re-index every post from the posts table; returns the number of posts"""
+    db.execute(text("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')"))
+    db.commit()
+    return db.scalar(select(func.count()).select_from(models.Post))
+
+
+def match_expression(q: str) -> Optional[str]:
+    """FTS5 MATCH string for free text: every word quoted, so user input is never parsed as query syntax"""
+    terms = re.findall(r"\w+", q)[:MAX_SEARCH_TERMS]
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def encode_cursor(rank: float, post_id: int) -> str:
+    return f"{rank!r}:{post_id}"
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """(rank, post_id) from encode_cursor; raises ValueError on malformed input"""
+    rank, post_id = cursor.rsplit(":", 1)
+    return float(rank), int(post_id)
+
+
+def search_query(match: str, viewer_id: int, after: Optional[tuple] = None, limit: int = 20):
+    """Visible posts matching `match`, best BM25 score first, plus one row to detect a next page.
+
+    FTS5 walks matches newest first and stops after MAX_SEARCH_CANDIDATES visible
+    ones, so only those are scored; the ranking then sorts just (id, rank) pairs
+    and whole posts are loaded for the one page that is returned.
+    """
+    rank = func.bm25(literal_column("posts_fts"), TITLE_WEIGHT, CONTENT_WEIGHT).label("rank")
+    candidates = (
+        select(posts_fts.c.rowid.label("id"), rank)
+        .join(models.Post, models.Post.id == posts_fts.c.rowid)
+        .where(literal_column("posts_fts").op("MATCH")(match), visible_to(viewer_id))
+        .order_by(posts_fts.c.rowid.desc())
+        .limit(MAX_SEARCH_CANDIDATES)
+        .subquery()
+    )
+    page = select(candidates.c.id, candidates.c.rank)
+    if after is not None:
+        after_rank, after_id = after
+        page = page.where(or_(candidates.c.rank > after_rank, and_(candidates.c.rank == after_rank, candidates.c.id > after_id)))
+    page = page.order_by(candidates.c.rank, candidates.c.id).limit(limit + 1).subquery()
+    return (
+        select(models.Post, page.c.rank)
+        .join(page, page.c.id == models.Post.id)
+        .order_by(page.c.rank, models.Post.id)
+    )
+
+
+def split_results(rows, limit: int):
+    """(posts, next_cursor) from the limit + 1 rows of search_query"""
+    next_cursor = encode_cursor(rows[limit - 1].rank, rows[limit - 1].Post.id) if len(rows) > limit else None
+    return [row.Post for row in rows[:limit]], next_cursor
+
+
+def search_posts(db: Session, match: str, viewer_id: int, after: Optional[tuple] = None, limit: int = 20):
+    """Returns (posts, next_cursor) for one page of search results"""
+    return split_results(db.execute(search_query(match, viewer_id, after, limit)).all(), limit)
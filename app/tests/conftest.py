@@ -0,0 +1,53 @@
+import os
+import pytest
+from contextlib import contextmanager
+from sqlalchemy import event
+
+# Fast test profile: the cheapest bcrypt cost, set before the app reads its hashing policy.
+# Most of the suite's time otherwise goes to hashing passwords.
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+from app import database
+
+
+class QueryCounter:
+    """SQL statements executed on the app's engines while it is installed"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries():
+    """Count statements from every engine; TestClient requests run one at a time, so all of them are the request's"""
+    counter = QueryCounter()
+    engines = [database.engine]
+    if database.async_engine is not None:
+        engines.append(database.async_engine.sync_engine)
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        for engine in engines:
+            event.remove(engine, "before_cursor_execute", counter)
+
+
+@pytest.fixture
+def query_budget():
+    """`with query_budget(2): client.get(...)` fails the test if the block runs more than 2 statements"""
+    @contextmanager
+    def check(budget: int):
+        with count_queries() as counter:
+            yield counter
+        if counter.count > budget:
+            statements = "\n".join(f"  {statement}" for statement in counter.statements)
+            pytest.fail(f"{counter.count} SQL statements, budget is {budget}:\n{statements}", pytrace=False)
+    return check
@@ -1,18 +1,32 @@
+import asyncio
+import os
 import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import delete, func, select
+from app import async_crud, auth, crud, models, revocation, schemas
+from app.cache import user_cache
+from app.database import SessionLocal
+from app.hashing import PasswordHasher, password_hasher
 from app.main import app
+from app.routers import accounts
+from datetime import datetime, timedelta, UTC
 import uuid
 
 client = TestClient(app)
 
+
 @pytest.fixture(scope="module")
 def test_user():
     return {"name": "Test User", "email": "test@example.com", "password": "testpass"}
 
+
 def get_unique_email():
     """Generate a unique email for each test to avoid conflicts"""
     return f"test_{uuid.uuid4().hex[:8]}@example.com"
 
+
 def test_create_account_valid():
     user = {"name": "Test User", "email": get_unique_email(), "password": "Valid1!pass"}
     response = client.post("/accounts/", json=user)
@@ -22,12 +36,14 @@ def test_create_account_valid():
     assert data["email"] == user["email"]
     assert "id" in data
 
+
 def test_create_account_invalid_password():
     user = {"name": "Test User", "email": get_unique_email(), "password": "weak"}
     response = client.post("/accounts/", json=user)
     assert response.status_code == 400
     assert "Password must be at least 8 characters" in response.json()["detail"]
 
+
 def test_create_account_duplicate_email():
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
@@ -38,12 +54,13 @@ def test_create_account_duplicate_email():
     assert response.status_code == 400
     assert "Email already registered" in response.json()["detail"]
 
+
 def test_login_valid():
     # First create a user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     # Then login
     response = client.post("/accounts/login", data={
         "username": email,
@@ -54,6 +71,7 @@ def test_login_valid():
     assert "access_token" in data
     assert data["token_type"] == "bearer"
 
+
 def test_login_invalid_credentials():
     response = client.post("/accounts/login", data={
         "username": "nonexistent@example.com",
@@ -62,18 +80,19 @@ def test_login_invalid_credentials():
     assert response.status_code == 400
     assert "Incorrect email or password" in response.json()["detail"]
 
+
 def test_update_account_valid():
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Update account
     update_data = {"name": "Updated User"}
     response = client.put("/accounts/", 
@@ -84,18 +103,19 @@ def test_update_account_valid():
     data = response.json()
     assert data["name"] == update_data["name"]
 
+
 def test_update_account_invalid_password():
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Try to update with invalid password
     update_data = {"password": "weak"}
     response = client.put("/accounts/", 
@@ -105,18 +125,19 @@ def test_update_account_invalid_password():
     assert response.status_code == 400
     assert "Password must be at least 8 characters" in response.json()["detail"]
 
+
 def test_get_me():
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Get user info
     response = client.get("/accounts/me", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
@@ -124,18 +145,19 @@ def test_get_me():
     assert data["name"] == user["name"]
     assert data["email"] == user["email"]
 
+
 def test_delete_account():
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Delete account
     response = client.delete("/accounts/", headers={"Authorization": f"Bearer {token}"})
     assert response.status_code == 200
@@ -144,19 +166,20 @@ def test_delete_account():
     assert "posts_deleted" in data
     assert "likes_deleted" in data
 
+
 def test_delete_account_with_cascade():
     """Test that deleting a user also deletes their posts and likes"""
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Create a post
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token}"},
@@ -169,13 +192,13 @@ def test_delete_account_with_cascade():
     )
     assert post_response.status_code == 200
     post_id = post_response.json()["id"]
-    
+
     # Like the post
     like_response = client.post(f"/like/{post_id}", 
         headers={"Authorization": f"Bearer {token}"}
     )
     assert like_response.status_code == 200
-    
+
     # Get user stats before deletion
     stats_response = client.get("/accounts/me/stats", 
         headers={"Authorization": f"Bearer {token}"}
@@ -184,7 +207,7 @@ def test_delete_account_with_cascade():
     stats = stats_response.json()
     assert stats["posts_count"] == 1
     assert stats["likes_count"] == 1
-    
+
     # Delete account
     delete_response = client.delete("/accounts/", 
         headers={"Authorization": f"Bearer {token}"}
@@ -193,34 +216,35 @@ def test_delete_account_with_cascade():
     delete_data = delete_response.json()
     assert delete_data["posts_deleted"] == 1
     assert delete_data["likes_deleted"] == 1
-    
+
     # Create another user to verify the post is deleted
     email2 = get_unique_email()
     user2 = {"name": "Test User 2", "email": email2, "password": "Valid2!pass"}
     client.post("/accounts/", json=user2)
-    
+
     login_response2 = client.post("/accounts/login", data={
         "username": email2,
         "password": "Valid2!pass"
     })
     token2 = login_response2.json()["access_token"]
-    
+
     # Verify post is deleted by trying to access it with another user
     post_check = client.get(f"/blog/{post_id}", headers={"Authorization": f"Bearer {token2}"})
     assert post_check.status_code == 404
 
+
 def test_get_my_stats():
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Get stats
     response = client.get("/accounts/me/stats", 
         headers={"Authorization": f"Bearer {token}"}
@@ -235,4 +259,308 @@ def test_get_my_stats():
     assert "total_impact" in data
     assert data["posts_count"] == 0
     assert data["likes_count"] == 0
-    assert data["total_impact"] == 0 
\ No newline at end of file
+    assert data["total_impact"] == 0 
+
+
+def test_user_cache_invalidated_on_update_and_delete():
+    """Authenticated users are cached, but updates and deletion take effect immediately"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Cached", "email": email, "password": "Valid1!pass"})
+    token = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/accounts/me", headers=headers).json()["name"] == "Cached"
+    hits = user_cache.stats()["hits"]
+    assert client.get("/accounts/me", headers=headers).json()["name"] == "Cached"
+    assert user_cache.stats()["hits"] == hits + 1
+    client.put("/accounts/", headers=headers, json={"name": "Renamed"})
+    assert client.get("/accounts/me", headers=headers).json()["name"] == "Renamed"
+    client.delete("/accounts/", headers=headers)
+    assert client.get("/accounts/me", headers=headers).status_code == 401
+
+
+def test_user_cache_skips_fill_after_concurrent_update(monkeypatch):
+    """A user read before an update commits must not be cached over the invalidation"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Before", "email": email, "password": "Valid1!pass"})
+    token = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    user_id = client.get("/accounts/me", headers=headers).json()["id"]
+    user_cache.clear()
+
+    def rename_user():
+        # The rename commits and invalidates right after the request's SELECT
+        with SessionLocal() as db:
+            crud.update_user(db, db.get(models.User, user_id), schemas.UserUpdate(name="After"))
+
+    get_user, get_user_async = crud.get_user, async_crud.get_user
+
+    def racing_get_user(db, user_id):
+        user = get_user(db, user_id)
+        monkeypatch.setattr(crud, "get_user", get_user)
+        rename_user()
+        return user
+
+    async def racing_get_user_async(db, user_id):
+        user = await get_user_async(db, user_id)
+        monkeypatch.setattr(async_crud, "get_user", get_user_async)
+        rename_user()
+        return user
+
+    monkeypatch.setattr(crud, "get_user", racing_get_user)
+    monkeypatch.setattr(async_crud, "get_user", racing_get_user_async)
+
+    # Authenticated through get_current_user_async when DATABASE_ASYNC is set
+    assert client.get("/blog/?limit=1", headers=headers).status_code == 200
+    assert user_cache.get(user_id) is None
+    assert client.get("/accounts/me", headers=headers).json()["name"] == "After"
+    client.delete("/accounts/", headers=headers)
+
+
+def test_login_sheds_load_when_hash_queue_full(monkeypatch):
+    """Once the hashing queue is full, password endpoints answer 503 instead of queueing"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Busy", "email": email, "password": "Valid1!pass"})
+    monkeypatch.setattr(password_hasher, "max_pending", 0)
+    response = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    response = client.post("/accounts/", json={"name": "Busy", "email": get_unique_email(), "password": "Valid1!pass"})
+    assert response.status_code == 503
+
+
+def test_hash_pool_replaced_after_worker_dies():
+    """A crashed worker breaks only the jobs it was running; the pool is replaced for later ones"""
+    hasher = PasswordHasher(workers=1, max_pending=4)
+
+    async def run():
+        # The job kills its worker again after the retry, so it gives up with 503
+        with pytest.raises(HTTPException) as excinfo:
+            await hasher._run(os._exit, 1)
+        assert excinfo.value.status_code == 503
+        hashed = await hasher.hash("Valid1!pass")
+        assert await hasher.verify("Valid1!pass", hashed)
+
+    try:
+        asyncio.run(run())
+    finally:
+        hasher.shutdown()
+
+
+def test_delete_account_in_background():
+    """Background deletion locks the account at once and reports purge progress"""
+    email, other_email = get_unique_email(), get_unique_email()
+    client.post("/accounts/", json={"name": "Leaving", "email": email, "password": "Valid1!pass"})
+    client.post("/accounts/", json={"name": "Staying", "email": other_email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {client.post('/accounts/login', data={'username': email, 'password': 'Valid1!pass'}).json()['access_token']}"}
+    other_headers = {"Authorization": f"Bearer {client.post('/accounts/login', data={'username': other_email, 'password': 'Valid1!pass'}).json()['access_token']}"}
+    own_ids = client.post("/blog/bulk", headers=headers, json=[{"title": f"Leaving{i}", "content": "C"} for i in range(3)]).json()["ids"]
+    other_id = client.post("/blog/", headers=other_headers, json={"title": "Staying", "content": "C"}).json()["id"]
+    client.post(f"/like/{other_id}", headers=headers)
+    client.post(f"/like/{own_ids[0]}", headers=other_headers)
+
+    response = client.delete("/accounts/?background=true", headers=headers)
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+    assert client.get("/accounts/me", headers=headers).status_code == 401
+    assert client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).status_code == 400
+
+    job = client.get(f"/accounts/purges/{job_id}").json()
+    assert job["status"] == "completed"
+    assert job["posts_deleted"] == job["posts_total"] == 3
+    assert job["likes_deleted"] == job["likes_total"] == 1
+    assert client.get(f"/blog/{own_ids[0]}", headers=other_headers).status_code == 404
+    assert client.get(f"/blog/{other_id}", headers=other_headers).json()["like_count"] == 0
+    assert client.get("/accounts/purges/unknown").status_code == 404
+
+
+def test_interrupted_purge_resumed():
+    """A purge whose process died is picked up again once it has been idle for PURGE_STALE_SECONDS"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Interrupted", "email": email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {client.post('/accounts/login', data={'username': email, 'password': 'Valid1!pass'}).json()['access_token']}"}
+    post_id = client.post("/blog/", headers=headers, json={"title": "Orphaned", "content": "C"}).json()["id"]
+    with SessionLocal() as db:
+        user = crud.get_user_by_email(db, email)
+        user_id, job_id = user.id, crud.deactivate_user(db, user).id
+    # Still fresh: its background task may be about to run
+    assert job_id not in accounts.resume_account_purges()
+    with SessionLocal() as db:
+        job = db.get(models.AccountPurge, job_id)
+        job.status, job.updated_at = "running", datetime.now(UTC) - timedelta(hours=1)
+        db.commit()
+    assert job_id in accounts.resume_account_purges()
+    job = client.get(f"/accounts/purges/{job_id}").json()
+    assert (job["status"], job["posts_deleted"]) == ("completed", 1)
+    with SessionLocal() as db:
+        assert crud.get_user(db, user_id) is None
+        assert crud.get_post(db, post_id) is None
+    assert job_id not in accounts.resume_account_purges()
+
+
+def test_stats_maintained_incrementally():
+    """user_stats follows posts and likes through every write path and matches a full rebuild"""
+    tokens = []
+    for name in ("StatsA", "StatsB"):
+        email = get_unique_email()
+        client.post("/accounts/", json={"name": name, "email": email, "password": "Valid1!pass"})
+        tokens.append(client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()["access_token"])
+    a, b = ({"Authorization": f"Bearer {token}"} for token in tokens)
+    ids = client.post("/blog/bulk", headers=a, json=[{"title": f"Stats{i}", "content": "C"} for i in range(3)]).json()["ids"]
+    ids.append(client.post("/blog/", headers=a, json={"title": "Stats3", "content": "C"}).json()["id"])
+    for pid in ids[:3]:
+        client.post(f"/like/{pid}", headers=b)
+    client.post(f"/like/{ids[0]}", headers=a)
+    client.delete(f"/blog/{ids[1]}", headers=a)
+    client.delete(f"/like/{ids[2]}", headers=b)
+
+    def stats():
+        return [client.get("/accounts/me/stats", headers=h).json() for h in (a, b)]
+
+    stats_a, stats_b = stats()
+    assert (stats_a["posts_count"], stats_a["likes_count"], stats_a["likes_received"]) == (3, 1, 2)
+    assert (stats_b["posts_count"], stats_b["likes_count"], stats_b["likes_received"]) == (0, 1, 0)
+    with SessionLocal() as db:
+        crud.rebuild_user_stats(db)
+    assert stats() == [stats_a, stats_b]
+    # A missing row is computed on the fly, never inserted by the read
+    with SessionLocal() as db:
+        db.execute(delete(models.UserStats).where(models.UserStats.user_id == stats_a["user_id"]))
+        db.commit()
+    assert stats() == [stats_a, stats_b]
+    with SessionLocal() as db:
+        assert db.get(models.UserStats, stats_a["user_id"]) is None
+        crud.rebuild_user_stats(db)
+
+
+def test_verified_tokens_cached_and_revoked_by_password_change(monkeypatch):
+    """Tokens are decoded once; a password change revokes every token issued before it"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Tokens", "email": email, "password": "Valid1!pass"})
+    token = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    decodes = []
+    decode = auth.jwt.decode
+    monkeypatch.setattr(auth.jwt, "decode", lambda *args, **kwargs: decodes.append(1) or decode(*args, **kwargs))
+    for _ in range(3):
+        assert client.get("/accounts/me", headers=headers).status_code == 200
+    assert len(decodes) == 1
+    assert client.put("/accounts/", headers=headers, json={"password": "Valid2!pass"}).status_code == 200
+    assert client.get("/accounts/me", headers=headers).status_code == 401
+    token = client.post("/accounts/login", data={"username": email, "password": "Valid2!pass"}).json()["access_token"]
+    assert client.get("/accounts/me", headers={"Authorization": f"Bearer {token}"}).json()["name"] == "Tokens"
+    client.delete("/accounts/", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_profile_claims_tokens(monkeypatch, query_budget):
+    """With TOKEN_PROFILE_CLAIMS, /accounts/me is served from the token; profile changes revoke it"""
+    monkeypatch.setattr(auth, "TOKEN_PROFILE_CLAIMS", True)
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Claims", "email": email, "password": "Valid1!pass"})
+    token = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()["access_token"]
+    claims = jwt.get_unverified_claims(token)
+    assert (claims["name"], claims["email"], claims["ver"]) == ("Claims", email, 0)
+    headers = {"Authorization": f"Bearer {token}"}
+    me = client.get("/accounts/me", headers=headers).json()
+    user_cache.clear()
+    with query_budget(0):
+        assert client.get("/accounts/me", headers=headers).json() == me
+    client.put("/accounts/", headers=headers, json={"name": "Renamed"})
+    assert client.get("/accounts/me", headers=headers).status_code == 401
+    token = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/accounts/me", headers=headers).json()["name"] == "Renamed"
+    client.delete("/accounts/", headers=headers)
+    assert client.get("/accounts/me", headers=headers).status_code == 401
+
+
+def test_refresh_tokens_rotate_once():
+    """A refresh token is swapped for a new pair exactly once and is never accepted as an access token"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Refresh", "email": email, "password": "Valid1!pass"})
+    tokens = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()
+    assert client.get("/accounts/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}).status_code == 401
+    renewed = client.post("/accounts/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert renewed.status_code == 200
+    renewed = renewed.json()
+    assert renewed["refresh_token"] != tokens["refresh_token"]
+    assert client.post("/accounts/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert client.post("/accounts/refresh", json={"refresh_token": renewed["access_token"]}).status_code == 401
+    headers = {"Authorization": f"Bearer {renewed['access_token']}"}
+    assert client.get("/accounts/me", headers=headers).json()["email"] == email
+    # A password change also ends the session's refresh tokens
+    client.put("/accounts/", headers=headers, json={"password": "Valid2!pass"})
+    assert client.post("/accounts/refresh", json={"refresh_token": renewed["refresh_token"]}).status_code == 401
+    token = client.post("/accounts/login", data={"username": email, "password": "Valid2!pass"}).json()["access_token"]
+    client.delete("/accounts/", headers={"Authorization": f"Bearer {token}"})
+
+
+def test_logout_revokes_tokens_and_survives_restart():
+    """Logout revokes the access and refresh token; a fresh process rebuilds the revocations from the table"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Logout", "email": email, "password": "Valid1!pass"})
+    tokens = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()
+    other = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.post("/accounts/logout", headers=headers, json={"refresh_token": tokens["refresh_token"]}).status_code == 204
+    assert client.get("/accounts/me", headers=headers).status_code == 401
+    assert client.post("/accounts/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    # Other sessions are unaffected
+    other_headers = {"Authorization": f"Bearer {other['access_token']}"}
+    assert client.get("/accounts/me", headers=other_headers).status_code == 200
+
+    rebuilt = revocation.TokenRevocations()
+    with SessionLocal() as db:
+        rebuilt.sync(db)
+    user_id = client.get("/accounts/me", headers=other_headers).json()["id"]
+    claims = jwt.get_unverified_claims(tokens["access_token"])
+    assert rebuilt.is_revoked(claims["jti"], user_id, claims["ver"])
+    assert not rebuilt.is_revoked(jwt.get_unverified_claims(other["access_token"])["jti"], user_id, claims["ver"])
+    client.delete("/accounts/", headers=other_headers)
+    with SessionLocal() as db:
+        rebuilt.sync(db)
+    # Deleting the account revokes every remaining token of the user
+    assert rebuilt.is_revoked(None, user_id, claims["ver"])
+
+
+def test_revocation_sync_picks_up_late_commits():
+    """A row committed after a higher id was synced is still loaded, once"""
+    store = revocation.TokenRevocations()
+    expires_at = datetime.now() + timedelta(minutes=5)
+    with SessionLocal() as db:
+        store.sync(db)
+        base = (db.scalar(select(func.max(models.TokenRevocation.id))) or 0) + 1
+        late, early = revocation.token_revocation("late-jti", 1, expires_at), revocation.token_revocation("early-jti", 1, expires_at)
+        # `late` got the lower id but its transaction commits after `early` is synced
+        late.id, early.id = base, base + 1
+        db.add(early)
+        db.commit()
+        assert store.sync(db) == 1
+        db.add(late)
+        db.commit()
+        assert store.sync(db) == 1
+        assert store.is_revoked("late-jti", 1, 0)
+        assert store.sync(db) == 0
+        db.delete(late)
+        db.delete(early)
+        db.commit()
+
+
+def test_login_rehashes_after_policy_change(monkeypatch):
+    """A hash made under an older policy is replaced at the next successful login"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Rehash", "email": email, "password": "Valid1!pass"})
+    # Hash in this process so the pool workers' policy does not apply
+    monkeypatch.setattr(password_hasher, "workers", 0)
+    monkeypatch.setattr(password_hasher, "_executor", None)
+    monkeypatch.setattr(crud, "pwd_context", crud.make_pwd_context(bcrypt_rounds=crud.BCRYPT_ROUNDS + 1))
+    with SessionLocal() as db:
+        old_hash = crud.get_user_by_email(db, email).hashed_password
+    assert crud.password_needs_update(old_hash)
+    token = client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).json()["access_token"]
+    with SessionLocal() as db:
+        new_hash = crud.get_user_by_email(db, email).hashed_password
+    assert new_hash != old_hash and not crud.password_needs_update(new_hash)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/accounts/me", headers=headers).status_code == 200
+    assert client.post("/accounts/login", data={"username": email, "password": "Valid1!pass"}).status_code == 200
+    client.delete("/accounts/", headers=headers)
@@ -0,0 +1,125 @@
+"""The DATABASE_ASYNC routes must behave exactly like the sync routes they mirror.
+
+Both apps are assembled here against the test database, so these tests run
+whatever DATABASE_ASYNC is set to.
+"""
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import database
+from app.cache import post_cache, user_cache
+from app.main import app as _main_app  # noqa: F401 -- creates the tables
+from app.routers import accounts, async_blog, async_like, blog, like
+from app.tests.test_accounts import get_unique_email
+
+sync_app = FastAPI()
+async_app = FastAPI()
+for router in (accounts.router, blog.router, like.router):
+    sync_app.include_router(router)
+# Same order as app.main: the async routes take precedence over the ones they mirror
+for router in (async_blog.router, async_like.router, accounts.router, blog.router, like.router):
+    async_app.include_router(router)
+sync_client = TestClient(sync_app)
+async_client = TestClient(async_app)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def async_engine():
+    """An aiosqlite engine on the test database, unless DATABASE_ASYNC already made one"""
+    if database.async_engine is not None:
+        yield database.async_engine
+        return
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    url = database.SQLALCHEMY_ASYNC_DATABASE_URL
+    engine = create_async_engine(url, **database._engine_options(url))
+    event.listen(engine.sync_engine, "connect", database._apply_sqlite_pragmas)
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(database, "async_engine", engine)
+        patch.setattr(database, "AsyncSessionLocal", async_sessionmaker(engine, autoflush=False, expire_on_commit=False))
+        yield engine
+    asyncio.run(engine.dispose())
+
+
+def create_user(name):
+    user = {"name": name, "email": get_unique_email(), "password": "Valid1!pass"}
+    sync_client.post("/accounts/", json=user)
+    token = sync_client.post("/accounts/login", data={"username": user["email"], "password": user["password"]}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def body(response):
+    data = response.json()
+    # Trending scores decay between the two requests
+    if isinstance(data, list):
+        return [{**item, "score": pytest.approx(item["score"], rel=1e-3)} if "score" in item else item for item in data]
+    return data
+
+
+def test_async_routes_mirror_sync_routes():
+    sync_routes = {(route.path, method) for route in blog.router.routes + like.router.routes for method in route.methods}
+    for route in async_blog.router.routes + async_like.router.routes:
+        assert isinstance(route, APIRoute)
+        for method in route.methods:
+            assert (route.path, method) in sync_routes
+
+
+def test_async_reads_match_sync():
+    owner, reader = create_user("AsyncOwner"), create_user("AsyncReader")
+    public_id = sync_client.post("/blog/", json={"title": "Async parity", "content": "parity words"}, headers=owner).json()["id"]
+    private_id = sync_client.post("/blog/", json={"title": "Async private", "content": "parity words", "is_public": False}, headers=owner).json()["id"]
+    for headers in (owner, reader):
+        sync_client.post(f"/like/{public_id}", headers=headers)
+    # Authenticate from the database through get_current_user_async
+    user_cache.clear()
+
+    urls = [
+        f"/blog/?after={public_id - 1}&limit=5",
+        f"/blog/?after={public_id - 1}&fields=id,title,like_count",
+        f"/blog/?after={public_id - 1}&view=summary",
+        f"/blog/{public_id}",
+        f"/blog/{private_id}",
+        "/blog/999999999",
+        f"/blog/{public_id}/likes?limit=1",
+        f"/blog/{private_id}/likes",
+        "/blog/search?q=parity",
+        "/blog/trending",
+        f"/like/status?post_ids={public_id},{private_id}",
+    ]
+    for url in urls:
+        post_cache.clear()
+        expected = sync_client.get(url, headers=reader)
+        post_cache.clear()
+        actual = async_client.get(url, headers=reader)
+        assert (actual.status_code, actual.json()) == (expected.status_code, body(expected)), url
+        assert actual.headers.get("ETag") == expected.headers.get("ETag"), url
+
+    post_cache.clear()
+    etag = async_client.get(f"/blog/{public_id}", headers=reader).headers["ETag"]
+    post_cache.clear()
+    assert async_client.get(f"/blog/{public_id}", headers={**reader, "If-None-Match": etag}).status_code == 304
+    sync_client.delete("/accounts/", headers=owner)
+    sync_client.delete("/accounts/", headers=reader)
+
+
+def test_async_writes():
+    owner, liker = create_user("AsyncWriter"), create_user("AsyncLiker")
+    created = async_client.post("/blog/", json={"title": "Async write", "content": "C"}, headers=owner)
+    assert created.status_code == 200
+    post_id = created.json()["id"]
+    private_id = sync_client.post("/blog/", json={"title": "Hidden", "content": "C", "is_public": False}, headers=owner).json()["id"]
+
+    liked = async_client.post(f"/like/{post_id}", headers=liker)
+    assert liked.status_code == 200
+    assert async_client.post(f"/like/{post_id}", headers=liker).json() == liked.json()
+    assert sync_client.get(f"/blog/{post_id}", headers=liker).json()["like_count"] == 1
+    assert async_client.post(f"/like/{private_id}", headers=liker).status_code == 403
+    assert async_client.post("/like/999999999", headers=liker).status_code == 404
+    assert async_client.delete(f"/like/{post_id}", headers=liker).status_code == 204
+    assert async_client.delete(f"/like/{post_id}", headers=liker).status_code == 404
+    assert sync_client.get(f"/blog/{post_id}", headers=liker).json()["like_count"] == 0
+    sync_client.delete("/accounts/", headers=owner)
+    sync_client.delete("/accounts/", headers=liker)
@@ -1,14 +1,22 @@
+import json
 import pytest
+from datetime import datetime, timedelta
 from fastapi.testclient import TestClient
+from sqlalchemy import update
+from app import async_crud, cache, crud, models, schemas, search, serialization
+from app.database import SessionLocal
+from app.routers import async_blog, blog
 from app.tests.test_accounts import get_unique_email
 from app.main import app
 
 client = TestClient(app)
 
+
 def get_token(email, password):
     response = client.post("/accounts/login", data={"username": email, "password": password})
     return response.json()["access_token"]
 
+
 def test_blog_visibility():
     # Create two users
     user1 = {"name": "User1", "email": "user1@example.com", "password": "Valid1!pass"}
@@ -40,6 +48,7 @@ def test_blog_visibility():
     client.delete(f"/blog/{pub_id}", headers=headers1)
     client.delete(f"/blog/{priv_id}", headers=headers1)
 
+
 def test_blog_crud():
     user = {"name": "BlogUser", "email": "bloguser@example.com", "password": "Valid3!pass"}
     client.post("/accounts/", json=user)
@@ -58,6 +67,7 @@ def test_blog_crud():
     resp = client.delete(f"/blog/{post_id}", headers=headers)
     assert resp.status_code == 204
 
+
 def test_update_delete_another_users_post_forbidden():
     # User1 creates a post
     user1 = {"name": "U1", "email": "u1@example.com", "password": "Valid1!pass"}
@@ -78,6 +88,7 @@ def test_update_delete_another_users_post_forbidden():
     # Clean up
     client.delete(f"/blog/{post_id}", headers=headers1)
 
+
 def test_view_private_post_access():
     # User1 creates private post
     user1 = {"name": "U3", "email": "u3@example.com", "password": "Valid3!pass"}
@@ -99,6 +110,7 @@ def test_view_private_post_access():
     # Clean up
     client.delete(f"/blog/{post_id}", headers=headers1)
 
+
 def test_unauthenticated_access_forbidden():
     resp = client.get("/blog/")
     assert resp.status_code == 401
@@ -109,6 +121,7 @@ def test_unauthenticated_access_forbidden():
     resp = client.delete("/blog/1")
     assert resp.status_code == 401
 
+
 def test_blog_pagination():
     user = {"name": "Paginate", "email": "paginate@example.com", "password": "Valid5!pass"}
     client.post("/accounts/", json=user)
@@ -137,19 +150,20 @@ def test_blog_pagination():
     for pid in ids:
         client.delete(f"/blog/{pid}", headers=headers)
 
+
 def test_post_deletion_cascade():
     """Test that deleting a post also deletes all its likes"""
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Create a post
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token}"},
@@ -162,42 +176,43 @@ def test_post_deletion_cascade():
     )
     assert post_response.status_code == 200
     post_id = post_response.json()["id"]
-    
+
     # Like the post
     like_response = client.post(f"/like/{post_id}", 
         headers={"Authorization": f"Bearer {token}"}
     )
     assert like_response.status_code == 200
-    
+
     # Delete the post
     delete_response = client.delete(f"/blog/{post_id}", 
         headers={"Authorization": f"Bearer {token}"}
     )
     assert delete_response.status_code == 204
-    
+
     # Try to get the deleted post
     get_response = client.get(f"/blog/{post_id}", headers={"Authorization": f"Bearer {token}"})
     assert get_response.status_code == 404
-    
+
     # Try to like the deleted post
     like_deleted_response = client.post(f"/like/{post_id}", 
         headers={"Authorization": f"Bearer {token}"}
     )
     assert like_deleted_response.status_code == 404
 
+
 def test_access_own_private_post():
     """Test that users can access their own private posts"""
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Create a private post
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token}"},
@@ -210,7 +225,7 @@ def test_access_own_private_post():
     )
     assert post_response.status_code == 200
     post_id = post_response.json()["id"]
-    
+
     # Access own private post
     get_response = client.get(f"/blog/{post_id}", 
         headers={"Authorization": f"Bearer {token}"}
@@ -220,19 +235,20 @@ def test_access_own_private_post():
     assert data["title"] == "Private Post"
     assert data["is_public"] == False
 
+
 def test_like_own_post():
     """Test that users can like their own posts"""
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Create a post
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token}"},
@@ -245,26 +261,27 @@ def test_like_own_post():
     )
     assert post_response.status_code == 200
     post_id = post_response.json()["id"]
-    
+
     # Like own post
     like_response = client.post(f"/like/{post_id}", 
         headers={"Authorization": f"Bearer {token}"}
     )
     assert like_response.status_code == 200
 
+
 def test_data_validation_empty_title():
     """Test that empty title is rejected"""
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Try to create post with empty title
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token}"},
@@ -277,19 +294,20 @@ def test_data_validation_empty_title():
     )
     assert post_response.status_code == 422
 
+
 def test_data_validation_empty_content():
     """Test that empty content is rejected"""
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Try to create post with empty content
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token}"},
@@ -302,40 +320,43 @@ def test_data_validation_empty_content():
     )
     assert post_response.status_code == 422
 
+
 def test_pagination_invalid_skip():
     """Test pagination with invalid skip value"""
     # Create and login user for authentication
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
     headers = {"Authorization": f"Bearer {token}"}
-    
+
     response = client.get("/blog/?skip=-1&limit=5", headers=headers)
     assert response.status_code == 422
 
+
 def test_pagination_invalid_limit():
     """Test pagination with invalid limit value"""
     # Create and login user for authentication
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
     headers = {"Authorization": f"Bearer {token}"}
-    
+
     response = client.get("/blog/?skip=0&limit=0", headers=headers)
     assert response.status_code == 422
 
+
 def test_invalid_token():
     """Test behavior with invalid token"""
     response = client.get("/accounts/me", 
@@ -343,7 +364,402 @@ def test_invalid_token():
     )
     assert response.status_code == 401
 
+
 def test_missing_token():
     """Test behavior with missing token"""
     response = client.get("/accounts/me")
-    assert response.status_code == 401 
\ No newline at end of file
+    assert response.status_code == 401 
+
+
+def test_blog_keyset_pagination_full_pages():
+    """Keyset pages skip other users' private posts in SQL, so every page is full"""
+    owner = {"name": "KeysetOwner", "email": get_unique_email(), "password": "Valid1!pass"}
+    viewer = {"name": "KeysetViewer", "email": get_unique_email(), "password": "Valid1!pass"}
+    client.post("/accounts/", json=owner)
+    client.post("/accounts/", json=viewer)
+    owner_headers = {"Authorization": f"Bearer {get_token(owner['email'], owner['password'])}"}
+    viewer_headers = {"Authorization": f"Bearer {get_token(viewer['email'], viewer['password'])}"}
+    public_ids, private_ids = [], []
+    for i in range(6):
+        is_public = i % 2 == 0
+        resp = client.post("/blog/", json={"title": f"Keyset{i}", "content": "C", "is_public": is_public}, headers=owner_headers)
+        (public_ids if is_public else private_ids).append(resp.json()["id"])
+    start = min(public_ids + private_ids) - 1
+    # Viewer walks public posts only, two per page, following the cursor header
+    resp = client.get(f"/blog/?after={start}&limit=2", headers=viewer_headers)
+    assert resp.status_code == 200
+    page = [p["id"] for p in resp.json()]
+    assert page == public_ids[:2]
+    assert resp.headers["X-Next-Cursor"] == str(page[-1])
+    resp = client.get(f"/blog/?after={resp.headers['X-Next-Cursor']}&limit=2", headers=viewer_headers)
+    page = [p["id"] for p in resp.json()]
+    assert page[0] == public_ids[2]
+    assert not set(page) & set(private_ids)
+    # The owner sees their private posts in the same walk
+    resp = client.get(f"/blog/?after={start}&limit=3", headers=owner_headers)
+    assert [p["id"] for p in resp.json()] == sorted(public_ids + private_ids)[:3]
+    for pid in public_ids + private_ids:
+        client.delete(f"/blog/{pid}", headers=owner_headers)
+
+
+def test_post_likes_are_paginated(monkeypatch):
+    """The detail embeds a bounded first page of likes; the rest come from /likes"""
+    users = []
+    for i in range(3):
+        email = get_unique_email()
+        client.post("/accounts/", json={"name": f"Liker{i}", "email": email, "password": "Valid1!pass"})
+        users.append({"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"})
+    post_id = client.post("/blog/", json={"title": "Popular", "content": "C", "is_public": True}, headers=users[0]).json()["id"]
+    like_ids = [client.post(f"/like/{post_id}", headers=headers).json()["id"] for headers in users]
+    monkeypatch.setattr(blog, "DETAIL_LIKES_LIMIT", 2)
+    detail = client.get(f"/blog/{post_id}", headers=users[1]).json()
+    assert [like["id"] for like in detail["likes"]] == like_ids[:2]
+    assert detail["likes_next_cursor"] == like_ids[1]
+    page = client.get(f"/blog/{post_id}/likes?after={detail['likes_next_cursor']}&limit=2", headers=users[1]).json()
+    assert [like["id"] for like in page["items"]] == like_ids[2:]
+    assert page["next_cursor"] is None
+    # Same visibility rule as the detail endpoint
+    client.put(f"/blog/{post_id}", json={"is_public": False}, headers=users[0])
+    assert client.get(f"/blog/{post_id}/likes", headers=users[1]).status_code == 403
+    client.delete(f"/blog/{post_id}", headers=users[0])
+
+
+def test_bulk_create_posts():
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Bulk", "email": email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"}
+    posts = [{"title": f"Bulk{i}", "content": "C", "is_public": i % 2 == 0} for i in range(5)]
+    resp = client.post("/blog/bulk", json=posts, headers=headers)
+    assert resp.status_code == 200
+    ids = resp.json()["ids"]
+    assert len(ids) == 5
+    assert [client.get(f"/blog/{pid}", headers=headers).json()["title"] for pid in ids] == [p["title"] for p in posts]
+    # One invalid item rejects the whole batch before anything is written
+    before = client.get(f"/blog/?after={ids[-1]}", headers=headers).json()
+    resp = client.post("/blog/bulk", json=[{"title": "Ok", "content": "C"}, {"title": "", "content": "C"}], headers=headers)
+    assert resp.status_code == 422
+    assert client.get(f"/blog/?after={ids[-1]}", headers=headers).json() == before
+    assert client.post("/blog/bulk", json=[], headers=headers).status_code == 422
+    for pid in ids:
+        client.delete(f"/blog/{pid}", headers=headers)
+
+
+def test_conditional_get_post_and_list():
+    """ETag / Last-Modified round-trip to 304 until the post is edited or liked"""
+    owner_email, liker_email = get_unique_email(), get_unique_email()
+    client.post("/accounts/", json={"name": "Etag", "email": owner_email, "password": "Valid1!pass"})
+    client.post("/accounts/", json={"name": "EtagLiker", "email": liker_email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {get_token(owner_email, 'Valid1!pass')}"}
+    liker = {"Authorization": f"Bearer {get_token(liker_email, 'Valid1!pass')}"}
+    post_id = client.post("/blog/", json={"title": "Cached", "content": "C", "is_public": True}, headers=headers).json()["id"]
+    resp = client.get(f"/blog/{post_id}", headers=headers)
+    etag, last_modified = resp.headers["ETag"], resp.headers["Last-Modified"]
+    resp = client.get(f"/blog/{post_id}", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["ETag"] == etag
+    assert client.get(f"/blog/{post_id}", headers={**headers, "If-Modified-Since": last_modified}).status_code == 304
+    # A like bumps the version, so the old validator no longer matches
+    client.post(f"/like/{post_id}", headers=liker)
+    resp = client.get(f"/blog/{post_id}", headers={**headers, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.json()["like_count"] == 1
+    assert resp.headers["ETag"] != etag
+    # Lists validate on the ids and versions of the page
+    url = f"/blog/?after={post_id - 1}&limit=1"
+    resp = client.get(url, headers=headers)
+    list_etag = resp.headers["ETag"]
+    resp = client.get(url, headers={**headers, "If-None-Match": list_etag})
+    assert resp.status_code == 304
+    assert resp.headers["X-Next-Cursor"] == str(post_id)
+    client.put(f"/blog/{post_id}", json={"title": "Edited"}, headers=headers)
+    resp = client.get(url, headers={**headers, "If-None-Match": list_etag})
+    assert resp.status_code == 200
+    assert resp.json()[0]["title"] == "Edited"
+    client.delete(f"/blog/{post_id}", headers=headers)
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the subset of the redis client used by RedisCache"""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None):
+        self.data[name] = value
+
+    def delete(self, *names):
+        for name in names:
+            self.data.pop(name, None)
+
+    def mget(self, *names):
+        return [self.data.get(name) for name in names]
+
+    def incr(self, name):
+        self.data[name] = str(int(self.data.get(name, 0)) + 1).encode()
+
+    def expire(self, name, seconds):
+        pass
+
+    def scan_iter(self, match):
+        return [name for name in self.data if name.startswith(match.rstrip("*"))]
+
+    def pipeline(self):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """Single-threaded WATCH/MULTI: nothing else can run between watch() and execute()"""
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def watch(self, *names):
+        pass
+
+    def mget(self, *names):
+        return self.redis.mget(*names)
+
+    def multi(self):
+        pass
+
+    def set(self, name, value, ex=None):
+        self.queued.append((name, value))
+
+    def execute(self):
+        for name, value in self.queued:
+            self.redis.set(name, value)
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_public_post_response_cache(monkeypatch, backend):
+    """Public post bodies are served from cache until a write invalidates them; private ones never are"""
+    post_cache = cache.TTLCache(maxsize=16, ttl=60) if backend == "memory" else cache.RedisCache(FakeRedis(), ttl=60)
+    for module in (crud, async_crud, blog, async_blog):
+        monkeypatch.setattr(module, "post_cache", post_cache)
+    owner_email, other_email = get_unique_email(), get_unique_email()
+    client.post("/accounts/", json={"name": "Cache", "email": owner_email, "password": "Valid1!pass"})
+    client.post("/accounts/", json={"name": "CacheOther", "email": other_email, "password": "Valid1!pass"})
+    owner = {"Authorization": f"Bearer {get_token(owner_email, 'Valid1!pass')}"}
+    other = {"Authorization": f"Bearer {get_token(other_email, 'Valid1!pass')}"}
+    public_id = client.post("/blog/", json={"title": "Hot", "content": "C", "is_public": True}, headers=owner).json()["id"]
+    private_id = client.post("/blog/", json={"title": "Secret", "content": "C", "is_public": False}, headers=owner).json()["id"]
+    first = client.get(f"/blog/{public_id}", headers=other)
+    second = client.get(f"/blog/{public_id}", headers=other)
+    assert second.json() == first.json()
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert post_cache.stats()["hits"] == 1
+    assert client.get(f"/blog/{public_id}", headers={**other, "If-None-Match": first.headers["ETag"]}).status_code == 304
+    # Writes invalidate
+    client.post(f"/like/{public_id}", headers=other)
+    assert client.get(f"/blog/{public_id}", headers=other).json()["like_count"] == 1
+    client.put(f"/blog/{public_id}", json={"title": "Edited", "is_public": False}, headers=owner)
+    assert client.get(f"/blog/{public_id}", headers=other).status_code == 403
+    # Private posts are never stored, so another user can't be served one
+    assert client.get(f"/blog/{private_id}", headers=owner).status_code == 200
+    assert post_cache.get(cache.post_key(private_id)) is None
+    assert client.get(f"/blog/{private_id}", headers=other).status_code == 403
+    client.delete(f"/blog/{public_id}", headers=owner)
+    client.delete(f"/blog/{private_id}", headers=owner)
+
+
+@pytest.mark.parametrize("backend", ["memory", "redis"])
+def test_post_cache_skips_fill_after_concurrent_write(monkeypatch, backend):
+    """A post made private between the read and the cache fill must not reach the cache"""
+    post_cache = cache.TTLCache(maxsize=16, ttl=60) if backend == "memory" else cache.RedisCache(FakeRedis(), ttl=60)
+    for module in (crud, async_crud, blog, async_blog):
+        monkeypatch.setattr(module, "post_cache", post_cache)
+    owner_email, other_email = get_unique_email(), get_unique_email()
+    client.post("/accounts/", json={"name": "Racer", "email": owner_email, "password": "Valid1!pass"})
+    client.post("/accounts/", json={"name": "RaceReader", "email": other_email, "password": "Valid1!pass"})
+    owner = {"Authorization": f"Bearer {get_token(owner_email, 'Valid1!pass')}"}
+    other = {"Authorization": f"Bearer {get_token(other_email, 'Valid1!pass')}"}
+    post_id = client.post("/blog/", json={"title": "Racy", "content": "C", "is_public": True}, headers=owner).json()["id"]
+
+    def hide_post():
+        # The owner's update commits and invalidates right after the reader's SELECT
+        with SessionLocal() as db:
+            crud.update_post(db, crud.get_post(db, post_id), schemas.PostUpdate(is_public=False))
+
+    get_post, get_post_async = crud.get_post, async_crud.get_post
+
+    def racing_get_post(db, requested_id, **kwargs):
+        post = get_post(db, requested_id, **kwargs)
+        monkeypatch.setattr(crud, "get_post", get_post)
+        hide_post()
+        return post
+
+    async def racing_get_post_async(db, requested_id, **kwargs):
+        post = await get_post_async(db, requested_id, **kwargs)
+        monkeypatch.setattr(async_crud, "get_post", get_post_async)
+        hide_post()
+        return post
+
+    monkeypatch.setattr(crud, "get_post", racing_get_post)
+    monkeypatch.setattr(async_crud, "get_post", racing_get_post_async)
+
+    # The reader still gets the body it read, but it is not cached for anyone else
+    assert client.get(f"/blog/{post_id}", headers=other).status_code == 200
+    assert post_cache.get(cache.post_key(post_id)) is None
+    assert client.get(f"/blog/{post_id}", headers=other).status_code == 403
+    client.delete(f"/blog/{post_id}", headers=owner)
+
+
+def test_cache_generation_outlives_eviction():
+    """A generation taken before an invalidation never matches again, even once the key's counter is evicted"""
+    post_cache = cache.TTLCache(maxsize=2, ttl=60)
+    generation = post_cache.generation("a")
+    post_cache.invalidate("a")
+    post_cache.invalidate("b")
+    post_cache.invalidate("c")
+    post_cache.set("a", b"stale", generation=generation)
+    assert post_cache.get("a") is None
+    generation = post_cache.generation("a")
+    post_cache.clear()
+    post_cache.set("a", b"stale", generation=generation)
+    assert post_cache.get("a") is None
+    post_cache.set("a", b"fresh", generation=post_cache.generation("a"))
+    assert post_cache.get("a") == b"fresh"
+
+
+def test_search_posts():
+    """BM25-ranked search honours visibility, tracks edits/deletes and pages with a cursor"""
+    owner_email, other_email = get_unique_email(), get_unique_email()
+    client.post("/accounts/", json={"name": "Searcher", "email": owner_email, "password": "Valid1!pass"})
+    client.post("/accounts/", json={"name": "SearchOther", "email": other_email, "password": "Valid1!pass"})
+    owner = {"Authorization": f"Bearer {get_token(owner_email, 'Valid1!pass')}"}
+    other = {"Authorization": f"Bearer {get_token(other_email, 'Valid1!pass')}"}
+    word = f"zebra{get_unique_email().split('@')[0].replace('_', '')}"
+    title_hit = client.post("/blog/", json={"title": f"All about {word}", "content": "Stripes", "is_public": True}, headers=owner).json()["id"]
+    body_hits = [
+        client.post("/blog/", json={"title": f"Note {i}", "content": f"Saw a {word} today", "is_public": True}, headers=owner).json()["id"]
+        for i in range(2)
+    ]
+    private = client.post("/blog/", json={"title": word, "content": word, "is_public": False}, headers=owner).json()["id"]
+    resp = client.get(f"/blog/search?q={word}&limit=2", headers=other)
+    assert resp.status_code == 200
+    page = resp.json()
+    # Title matches rank first; the other user never sees the private post
+    assert [p["id"] for p in page["items"]] == [title_hit, body_hits[0]]
+    page = client.get(f"/blog/search?q={word}&limit=2&after={page['next_cursor']}", headers=other).json()
+    assert [p["id"] for p in page["items"]] == [body_hits[1]]
+    assert page["next_cursor"] is None
+    assert private in [p["id"] for p in client.get(f"/blog/search?q={word}", headers=owner).json()["items"]]
+    # Edits and deletes are reflected through the triggers; query syntax is treated as plain words
+    client.put(f"/blog/{title_hit}", json={"title": "Renamed", "content": "Nothing here"}, headers=owner)
+    client.delete(f"/blog/{body_hits[0]}", headers=owner)
+    items = client.get(f'/blog/search?q={word} OR "NEAR(', headers=other).json()["items"]
+    assert items == []
+    assert [p["id"] for p in client.get(f"/blog/search?q={word}", headers=other).json()["items"]] == [body_hits[1]]
+    assert client.get("/blog/search?q=%20!!", headers=other).status_code == 422
+    assert client.get(f"/blog/search?q={word}&after=bogus", headers=other).status_code == 422
+    for pid in (title_hit, body_hits[1], private):
+        client.delete(f"/blog/{pid}", headers=owner)
+
+
+def test_search_ranks_newest_candidates_only(monkeypatch):
+    """A common term ranks only the newest MAX_SEARCH_CANDIDATES visible matches"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Capped", "email": email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"}
+    word = f"quokka{email.split('@')[0].replace('_', '')}"
+    # The oldest post would rank first; the hidden one does not use up a candidate slot
+    ids = [client.post("/blog/", json={"title": word, "content": word, "is_public": True}, headers=headers).json()["id"]]
+    ids += [client.post("/blog/", json={"title": f"Note {i}", "content": word, "is_public": True}, headers=headers).json()["id"] for i in range(2)]
+    ids.append(client.post("/blog/", json={"title": word, "content": word, "is_public": False}, headers=headers).json()["id"])
+    monkeypatch.setattr(search, "MAX_SEARCH_CANDIDATES", 2)
+    other_email = get_unique_email()
+    client.post("/accounts/", json={"name": "CappedReader", "email": other_email, "password": "Valid1!pass"})
+    other = {"Authorization": f"Bearer {get_token(other_email, 'Valid1!pass')}"}
+    page = client.get(f"/blog/search?q={word}&limit=1", headers=other).json()
+    assert [p["id"] for p in page["items"]] == [ids[1]]
+    page = client.get(f"/blog/search?q={word}&limit=1&after={page['next_cursor']}", headers=other).json()
+    assert [p["id"] for p in page["items"]] == [ids[2]]
+    assert page["next_cursor"] is None
+    for pid in ids:
+        client.delete(f"/blog/{pid}", headers=headers)
+
+
+def test_fast_json_responses_match_default_serialization(monkeypatch):
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Json", "email": email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"}
+    post_id = client.post("/blog/", json={"title": "Jsön ✓", "content": "C", "is_public": False}, headers=headers).json()["id"]
+    client.post(f"/like/{post_id}", headers=headers)
+    urls = [f"/blog/?after={post_id - 1}&limit=1", f"/blog/{post_id}", f"/blog/{post_id}/likes", "/accounts/me"]
+    fast = [client.get(url, headers=headers) for url in urls]
+    monkeypatch.setattr(serialization, "FAST_JSON_RESPONSES", False)
+    default = [client.get(url, headers=headers) for url in urls]
+    for fast_resp, default_resp in zip(fast, default):
+        assert fast_resp.content == default_resp.content
+        assert fast_resp.headers["content-type"] == default_resp.headers["content-type"]
+    assert fast[0].headers["X-Next-Cursor"] == str(post_id)
+    client.delete(f"/blog/{post_id}", headers=headers)
+
+
+def test_post_list_sparse_fields_and_summary():
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Sparse", "email": email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"}
+    post_id = client.post("/blog/", json={"title": "Long", "description": "D", "content": "x" * 5000, "is_public": True}, headers=headers).json()["id"]
+    base = f"/blog/?after={post_id - 1}&limit=1"
+    full = client.get(base, headers=headers)
+    resp = client.get(f"{base}&fields=title,id", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json() == [{"id": post_id, "title": "Long"}]
+    assert resp.headers["X-Next-Cursor"] == str(post_id)
+    # Each representation validates separately
+    assert resp.headers["ETag"] != full.headers["ETag"]
+    summary = client.get(f"{base}&view=summary", headers=headers).json()[0]
+    assert "content" not in summary
+    assert summary["content_preview"] == "x" * 200
+    assert summary["description"] == "D"
+    assert client.get(f"{base}&fields=id,content_preview", headers=headers).json() == [{"id": post_id, "content_preview": "x" * 200}]
+    assert client.get(f"{base}&fields=id,password", headers=headers).status_code == 422
+    client.delete(f"/blog/{post_id}", headers=headers)
+
+
+def test_export_posts_ndjson(monkeypatch):
+    owner_email, other_email = get_unique_email(), get_unique_email()
+    client.post("/accounts/", json={"name": "Exporter", "email": owner_email, "password": "Valid1!pass"})
+    client.post("/accounts/", json={"name": "ExportOther", "email": other_email, "password": "Valid1!pass"})
+    owner = {"Authorization": f"Bearer {get_token(owner_email, 'Valid1!pass')}"}
+    other = {"Authorization": f"Bearer {get_token(other_email, 'Valid1!pass')}"}
+    public_id, private_id = [
+        client.post("/blog/", json={"title": title, "content": "C", "is_public": is_public}, headers=owner).json()["id"]
+        for title, is_public in (("Exported", True), ("Hidden", False))
+    ]
+    resp = client.get("/blog/export", headers=other)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    ids = [row["id"] for row in rows]
+    assert ids == sorted(ids)
+    assert public_id in ids and private_id not in ids
+    assert next(row for row in rows if row["id"] == public_id)["title"] == "Exported"
+    # Incremental: only posts changed since the previous export started
+    checkpoint = resp.headers["X-Export-Started-At"]
+    client.put(f"/blog/{public_id}", json={"title": "Changed"}, headers=owner)
+    monkeypatch.setattr(crud, "EXPORT_SINCE_OVERLAP_SECONDS", 0)
+    resp = client.get("/blog/export", params={"since": checkpoint}, headers=owner)
+    assert [json.loads(line)["title"] for line in resp.text.splitlines()] == ["Changed"]
+    # A write stamped before that export started but committed after it is picked up by the next one
+    checkpoint = resp.headers["X-Export-Started-At"]
+    started_at = datetime.fromisoformat(checkpoint.rstrip("Z"))
+    with SessionLocal() as db:
+        db.execute(update(models.Post).where(models.Post.id == private_id).values(title="Late", updated_at=started_at - timedelta(seconds=1)))
+        db.commit()
+    assert client.get("/blog/export", params={"since": checkpoint}, headers=owner).text == ""
+    monkeypatch.setattr(crud, "EXPORT_SINCE_OVERLAP_SECONDS", 60)
+    resp = client.get("/blog/export", params={"since": checkpoint}, headers=owner)
+    assert "Late" in [json.loads(line)["title"] for line in resp.text.splitlines()]
+    for post_id in (public_id, private_id):
+        client.delete(f"/blog/{post_id}", headers=owner)
@@ -0,0 +1,59 @@
+import re
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import database, instrumentation
+from app.cache import post_cache, user_cache
+from app.tests.test_accounts import get_unique_email
+from app.main import app as _main_app  # noqa: F401 -- creates the tables
+from app.routers import accounts, blog, like
+
+# A separate app with the middleware installed exactly once, whether or not
+# INSTRUMENTATION_ENABLED also put it on app.main; the engine hooks stay inert
+# for requests that do not pass through the middleware
+request_metrics = instrumentation.RequestMetrics()
+instrumentation.instrument_engine(database.engine)
+if database.async_engine is not None:
+    instrumentation.instrument_engine(database.async_engine.sync_engine)
+instrumented_app = FastAPI()
+if database.DATABASE_ASYNC:
+    from app.routers import async_blog, async_like
+
+    instrumented_app.include_router(async_blog.router)
+    instrumented_app.include_router(async_like.router)
+for router in (accounts.router, blog.router, like.router):
+    instrumented_app.include_router(router)
+instrumented_app.add_middleware(instrumentation.InstrumentationMiddleware, request_metrics=request_metrics)
+client = TestClient(instrumented_app)
+
+
+def server_timing(response):
+    return {
+        match.group(1): (float(match.group(2)), match.group(3))
+        for match in re.finditer(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response.headers["server-timing"])
+    }
+
+
+def test_server_timing_and_metrics():
+    user = {"name": "Timed", "email": get_unique_email(), "password": "Valid1!pass"}
+    client.post("/accounts/", json=user)
+    login = client.post("/accounts/login", data={"username": user["email"], "password": user["password"]})
+    assert "hash" in server_timing(login)
+    headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+    post_id = client.post("/blog/", json={"title": "Timed", "content": "content"}, headers=headers).json()["id"]
+    post_cache.clear()
+    resp = client.get(f"/blog/{post_id}", headers=headers)
+    assert resp.status_code == 200
+    timing = server_timing(resp)
+    statements = int(timing["db"][1].split()[0])
+    assert statements >= 2
+    assert "serialize" in timing
+    assert timing["app"][0] >= timing["db"][0]
+    # Rejected paths are still labelled with the route template, not the raw path
+    client.get("/blog/does-not-exist", headers=headers)
+    body = request_metrics.render({"users": user_cache, "posts": post_cache})
+    assert f'http_request_sql_statements_count{{method="GET",route="/blog/{{post_id}}"}} 2' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/blog/{post_id}",le="+Inf"} 2' in body
+    assert 'http_responses_total{method="GET",route="/blog/{post_id}",status="422"} 1' in body
+    assert 'http_request_password_hash_seconds_count{method="POST",route="/accounts/login"} 1' in body
+    assert 'cache_hits_total{cache="users"}' in body
+    client.delete("/accounts/", headers=headers)
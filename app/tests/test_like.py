@@ -1,15 +1,19 @@
 import pytest
 from fastapi.testclient import TestClient
+from app import async_crud, crud, database, models, trending
+from app.database import SessionLocal
 from app.tests.test_accounts import get_unique_email
 from app.main import app
 import uuid
 
 client = TestClient(app)
 
+
 def get_token(email, password):
     response = client.post("/accounts/login", data={"username": email, "password": password})
     return response.json()["access_token"]
 
+
 def test_like_unlike():
     # Create two users
     user1 = {"name": "LikeUser1", "email": "likeuser1@example.com", "password": "Valid1!pass"}
@@ -43,6 +47,7 @@ def test_like_unlike():
     client.delete(f"/blog/{pub_id}", headers=headers1)
     client.delete(f"/blog/{priv_id}", headers=headers1)
 
+
 def test_like_same_post_twice():
     user = {"name": "LikeTwice", "email": "liketwice@example.com", "password": "Valid3!pass"}
     client.post("/accounts/", json=user)
@@ -52,13 +57,17 @@ def test_like_same_post_twice():
     post_id = client.post("/blog/", json=post, headers=headers).json()["id"]
     resp = client.post(f"/like/{post_id}", headers=headers)
     assert resp.status_code == 200
+    first = resp.json()
+    # Liking again returns the existing like and does not count twice
     resp = client.post(f"/like/{post_id}", headers=headers)
-    assert resp.status_code == 400
-    assert "Already liked" in resp.json()["detail"]
+    assert resp.status_code == 200
+    assert resp.json() == first
+    assert client.get(f"/blog/{post_id}", headers=headers).json()["like_count"] == 1
     # Clean up
     client.delete(f"/like/{post_id}", headers=headers)
     client.delete(f"/blog/{post_id}", headers=headers)
 
+
 def test_unlike_not_liked():
     user = {"name": "UnlikeNotLiked", "email": "unlikenotliked@example.com", "password": "Valid4!pass"}
     client.post("/accounts/", json=user)
@@ -72,6 +81,7 @@ def test_unlike_not_liked():
     # Clean up
     client.delete(f"/blog/{post_id}", headers=headers)
 
+
 def test_unauthenticated_like_unlike():
     user = {"name": "UnauthLike", "email": "unauthlike@example.com", "password": "Valid5!pass"}
     client.post("/accounts/", json=user)
@@ -86,6 +96,7 @@ def test_unauthenticated_like_unlike():
     # Clean up
     client.delete(f"/blog/{post_id}", headers=headers)
 
+
 def test_like_nonexistent_post():
     user = {"name": "Like404", "email": "like404@example.com", "password": "Valid6!pass"}
     client.post("/accounts/", json=user)
@@ -94,19 +105,20 @@ def test_like_nonexistent_post():
     resp = client.post(f"/like/999999", headers=headers)
     assert resp.status_code == 404
 
+
 def test_like_private_post_owner():
     """Test that post owner can like their own private post"""
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Create a private post
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token}"},
@@ -119,26 +131,27 @@ def test_like_private_post_owner():
     )
     assert post_response.status_code == 200
     post_id = post_response.json()["id"]
-    
+
     # Like own private post
     like_response = client.post(f"/like/{post_id}", 
         headers={"Authorization": f"Bearer {token}"}
     )
     assert like_response.status_code == 200
 
+
 def test_like_private_post_non_owner():
     """Test that non-owner cannot like private post"""
     # Create first user
     email1 = get_unique_email()
     user1 = {"name": "Test User 1", "email": email1, "password": "Valid1!pass"}
     client.post("/accounts/", json=user1)
-    
+
     login1_response = client.post("/accounts/login", data={
         "username": email1,
         "password": "Valid1!pass"
     })
     token1 = login1_response.json()["access_token"]
-    
+
     # Create a private post
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token1}"},
@@ -151,37 +164,38 @@ def test_like_private_post_non_owner():
     )
     assert post_response.status_code == 200
     post_id = post_response.json()["id"]
-    
+
     # Create second user
     email2 = get_unique_email()
     user2 = {"name": "Test User 2", "email": email2, "password": "Valid2!pass"}
     client.post("/accounts/", json=user2)
-    
+
     login2_response = client.post("/accounts/login", data={
         "username": email2,
         "password": "Valid2!pass"
     })
     token2 = login2_response.json()["access_token"]
-    
+
     # Try to like private post as non-owner
     like_response = client.post(f"/like/{post_id}", 
         headers={"Authorization": f"Bearer {token2}"}
     )
     assert like_response.status_code == 403
 
+
 def test_unlike_others_like():
     """Test that users cannot unlike others' likes"""
     # Create first user
     email1 = get_unique_email()
     user1 = {"name": "Test User 1", "email": email1, "password": "Valid1!pass"}
     client.post("/accounts/", json=user1)
-    
+
     login1_response = client.post("/accounts/login", data={
         "username": email1,
         "password": "Valid1!pass"
     })
     token1 = login1_response.json()["access_token"]
-    
+
     # Create a public post
     post_response = client.post("/blog/", 
         headers={"Authorization": f"Bearer {token1}"},
@@ -194,55 +208,196 @@ def test_unlike_others_like():
     )
     assert post_response.status_code == 200
     post_id = post_response.json()["id"]
-    
+
     # Create second user
     email2 = get_unique_email()
     user2 = {"name": "Test User 2", "email": email2, "password": "Valid2!pass"}
     client.post("/accounts/", json=user2)
-    
+
     login2_response = client.post("/accounts/login", data={
         "username": email2,
         "password": "Valid2!pass"
     })
     token2 = login2_response.json()["access_token"]
-    
+
     # User 1 likes the post
     like1_response = client.post(f"/like/{post_id}", 
         headers={"Authorization": f"Bearer {token1}"}
     )
     assert like1_response.status_code == 200
-    
+
     # User 2 tries to unlike user 1's like
     unlike_response = client.delete(f"/like/{post_id}", 
         headers={"Authorization": f"Bearer {token2}"}
     )
     assert unlike_response.status_code == 404
 
+
 def test_unlike_nonexistent_post():
     """Test that unliking a nonexistent post returns 404"""
     # Create and login user
     email = get_unique_email()
     user = {"name": "Test User", "email": email, "password": "Valid1!pass"}
     client.post("/accounts/", json=user)
-    
+
     login_response = client.post("/accounts/login", data={
         "username": email,
         "password": "Valid1!pass"
     })
     token = login_response.json()["access_token"]
-    
+
     # Try to unlike nonexistent post
     unlike_response = client.delete("/like/99999", 
         headers={"Authorization": f"Bearer {token}"}
     )
     assert unlike_response.status_code == 404
 
+
 def test_like_without_authentication():
     """Test that liking without authentication returns 401"""
     response = client.post("/like/1")
     assert response.status_code == 401
 
+
 def test_unlike_without_authentication():
     """Test that unliking without authentication returns 401"""
     response = client.delete("/like/1")
-    assert response.status_code == 401 
\ No newline at end of file
+    assert response.status_code == 401 
+
+
+def test_like_count_tracks_likes():
+    """like_count is maintained by like/unlike and repaired by the rebuild command"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Counter", "email": email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"}
+    post_id = client.post("/blog/", json={"title": "Counted", "content": "C", "is_public": True}, headers=headers).json()["id"]
+    assert client.post(f"/like/{post_id}", headers=headers).status_code == 200
+    assert client.get(f"/blog/{post_id}", headers=headers).json()["like_count"] == 1
+    listed = client.get(f"/blog/?after={post_id - 1}&limit=1", headers=headers).json()
+    assert listed[0]["like_count"] == 1
+    # Corrupt the counter, then repair it from the likes table
+    with SessionLocal() as db:
+        db.query(models.Post).filter(models.Post.id == post_id).update({"like_count": 42})
+        db.commit()
+        assert crud.rebuild_like_counts(db) >= 1
+    assert client.get(f"/blog/{post_id}", headers=headers).json()["like_count"] == 1
+    assert client.delete(f"/like/{post_id}", headers=headers).status_code == 204
+    assert client.get(f"/blog/{post_id}", headers=headers).json()["like_count"] == 0
+    client.delete(f"/blog/{post_id}", headers=headers)
+
+
+def test_duplicate_like_is_ignored():
+    """A repeated like is a no-op at the database level and leaves the counter alone"""
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "DoubleTap", "email": email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"}
+    post_id = client.post("/blog/", json={"title": "DoubleTap", "content": "C", "is_public": True}, headers=headers).json()["id"]
+    user_id = client.get("/accounts/me", headers=headers).json()["id"]
+    with SessionLocal() as db:
+        assert crud.create_like(db, user_id, post_id) is not None
+        assert crud.create_like(db, user_id, post_id) is None
+        assert db.query(models.Like).filter(models.Like.post_id == post_id).count() == 1
+        assert crud.get_post(db, post_id).like_count == 1
+        assert crud.delete_like(db, user_id, post_id) is True
+        assert crud.delete_like(db, user_id, post_id) is False
+        db.expire_all()
+        assert crud.get_post(db, post_id).like_count == 0
+    client.delete(f"/blog/{post_id}", headers=headers)
+
+
+def test_like_status_batch():
+    email = get_unique_email()
+    client.post("/accounts/", json={"name": "Status", "email": email, "password": "Valid1!pass"})
+    headers = {"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"}
+    ids = client.post("/blog/bulk", json=[{"title": f"Status{i}", "content": "C"} for i in range(3)], headers=headers).json()["ids"]
+    client.post(f"/like/{ids[1]}", headers=headers)
+    resp = client.get(f"/like/status?post_ids={','.join(map(str, ids))}", headers=headers)
+    assert resp.status_code == 200
+    assert resp.json()["liked"] == {str(ids[0]): False, str(ids[1]): True, str(ids[2]): False}
+    assert client.get("/like/status?post_ids=1,abc", headers=headers).status_code == 422
+    too_many = ",".join(str(i) for i in range(1, 502))
+    assert client.get(f"/like/status?post_ids={too_many}", headers=headers).status_code == 422
+    for pid in ids:
+        client.delete(f"/blog/{pid}", headers=headers)
+
+
+def test_trending_feed(monkeypatch, tmp_path):
+    """Likes and unlikes move posts in the trending ranking; recompute and snapshots agree"""
+    tracker = trending.TrendingTracker(half_life_hours=6, top_k=10, window_hours=72)
+    for module in (crud, async_crud, trending):
+        monkeypatch.setattr(module, "trending_tracker", tracker)
+    users = []
+    for i in range(3):
+        email = get_unique_email()
+        client.post("/accounts/", json={"name": f"Trend{i}", "email": email, "password": "Valid1!pass"})
+        users.append({"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"})
+    owner = users[0]
+    hot, warm, private = [
+        client.post("/blog/", json={"title": title, "content": "C", "is_public": is_public}, headers=owner).json()["id"]
+        for title, is_public in (("Hot", True), ("Warm", True), ("Private", False))
+    ]
+    for headers in users:
+        client.post(f"/like/{hot}", headers=headers)
+    client.post(f"/like/{warm}", headers=users[1])
+    client.post(f"/like/{private}", headers=owner)
+    resp = client.get("/blog/trending", headers=users[1])
+    assert resp.status_code == 200
+    # The private post is ranked but only its owner gets it back
+    assert [p["id"] for p in resp.json()] == [hot, warm]
+    assert resp.json()[0]["score"] == pytest.approx(3, rel=1e-3)
+    assert private in [p["id"] for p in client.get("/blog/trending", headers=owner).json()]
+    for headers in users[:2]:
+        client.delete(f"/like/{hot}", headers=headers)
+    client.post(f"/like/{warm}", headers=users[2])
+    assert [p["id"] for p in client.get("/blog/trending", headers=users[1]).json()] == [warm, hot]
+    # A full recompute from the likes table reproduces the incremental scores
+    incremental = dict(tracker.top())
+    with SessionLocal() as db:
+        tracker.recompute(db)
+    recomputed = dict(tracker.top())
+    for post_id in (hot, warm, private):
+        assert recomputed[post_id] == pytest.approx(incremental[post_id], rel=1e-6)
+    snapshot = tmp_path / "trending.json"
+    tracker.save(str(snapshot))
+    restored = trending.TrendingTracker(half_life_hours=6, top_k=10, window_hours=72)
+    assert restored.load(str(snapshot))
+    assert [post_id for post_id, _ in restored.top()] == [post_id for post_id, _ in tracker.top()]
+    for post_id in (hot, warm, private):
+        client.delete(f"/blog/{post_id}", headers=owner)
+    remaining = {p["id"] for p in client.get("/blog/trending", headers=owner).json()}
+    assert not remaining & {hot, warm, private}
+
+
+def test_trending_forgets_deleted_accounts(monkeypatch):
+    """Posts of a deleted or purged account leave the ranking at once, not at the next recompute"""
+    tracker = trending.TrendingTracker(half_life_hours=6, top_k=2, window_hours=72)
+    for module in (crud, async_crud, trending):
+        monkeypatch.setattr(module, "trending_tracker", tracker)
+    users = []
+    for i in range(4):
+        email = get_unique_email()
+        client.post("/accounts/", json={"name": f"Gone{i}", "email": email, "password": "Valid1!pass"})
+        users.append({"Authorization": f"Bearer {get_token(email, 'Valid1!pass')}"})
+    deleted, purged, owner, reader = users
+    posts = {}
+    for headers, likes in ((deleted, 3), (purged, 2), (owner, 1)):
+        post_id = client.post("/blog/", json={"title": "Trend", "content": "C"}, headers=headers).json()["id"]
+        for liker in users[:likes]:
+            client.post(f"/like/{post_id}", headers=liker)
+        posts[post_id] = headers
+    ids = list(posts)
+    assert [p["id"] for p in client.get("/blog/trending", headers=reader).json()] == ids[:2]
+    client.delete("/accounts/", headers=deleted)
+    assert [p["id"] for p in client.get("/blog/trending", headers=reader).json()] == ids[1:]
+    assert client.delete("/accounts/?background=true", headers=purged).status_code == 202
+    assert [p["id"] for p in client.get("/blog/trending", headers=reader).json()] == ids[2:]
+    client.delete("/accounts/", headers=owner)
+    client.delete("/accounts/", headers=reader)
+
+
+def test_sqlite_version_checked():
+    """Likes rely on RETURNING, so an older SQLite library is refused up front"""
+    with pytest.raises(RuntimeError, match="3.35.0 or newer"):
+        database.check_sqlite_version("3.34.1")
+    database.check_sqlite_version("3.35.0")
+    database.check_sqlite_version("3.45.1")
@@ -0,0 +1,38 @@
+from sqlalchemy import create_engine, inspect, text
+from app import migrations
+from app.database import Base
+
+# Schema and data as the first release created them
+BASELINE = """
+CREATE TABLE users (id INTEGER NOT NULL, name VARCHAR NOT NULL, email VARCHAR NOT NULL, hashed_password VARCHAR NOT NULL, is_active BOOLEAN, created_at DATETIME, PRIMARY KEY (id));
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE TABLE posts (id INTEGER NOT NULL, title VARCHAR NOT NULL, description VARCHAR, content TEXT NOT NULL, created_at DATETIME, is_public BOOLEAN, owner_id INTEGER, PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES users (id));
+CREATE TABLE likes (id INTEGER NOT NULL, post_id INTEGER, user_id INTEGER, created_at DATETIME, PRIMARY KEY (id), FOREIGN KEY(post_id) REFERENCES posts (id), FOREIGN KEY(user_id) REFERENCES users (id));
+INSERT INTO users VALUES (1, 'a', 'a@example.com', 'x', 1, '2024-01-01 00:00:00'), (2, 'b', 'b@example.com', 'x', 1, '2024-01-01 00:00:00');
+INSERT INTO posts VALUES (1, 'Title', NULL, 'Content', '2024-01-02 00:00:00', 1, 1);
+INSERT INTO likes VALUES (1, 1, 2, '2024-01-03 00:00:00'), (2, 1, 2, '2024-01-03 00:00:00'), (3, 1, 1, '2024-01-03 00:00:00'), (4, 99, 1, '2024-01-03 00:00:00');
+"""
+
+def test_upgrade_baseline_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/old.db")
+    with engine.begin() as conn:
+        for statement in BASELINE.strip().split(";\n"):
+            conn.exec_driver_sql(statement)
+    Base.metadata.create_all(bind=engine)
+    assert migrations.upgrade(engine)
+    assert migrations.upgrade(engine) == []
+
+    with engine.begin() as conn:
+        # The duplicate like and the like of a missing post are gone, and the counters match
+        assert conn.execute(text("SELECT id FROM likes ORDER BY id")).scalars().all() == [1, 3]
+        assert conn.execute(text("SELECT like_count, updated_at IS NOT NULL FROM posts")).one() == (2, 1)
+        stats = conn.execute(text("SELECT user_id, posts_count, likes_given, likes_received FROM user_stats ORDER BY user_id")).all()
+        assert stats == [(1, 1, 1, 2), (2, 0, 1, 0)]
+        assert conn.execute(text("SELECT token_version FROM users WHERE id = 1")).scalar() == 0
+        indexes = {index["name"] for index in inspect(conn).get_indexes("posts")}
+        assert {"ix_posts_is_public_id", "ix_posts_owner_id_id", "ix_posts_updated_at_id"} <= indexes
+        conn.exec_driver_sql("PRAGMA foreign_keys=ON")
+        conn.execute(text("DELETE FROM users WHERE id = 1"))
+        assert conn.execute(text("SELECT count(*) FROM posts")).scalar() == 0
+        assert conn.execute(text("SELECT count(*) FROM likes")).scalar() == 0
+    engine.dispose()
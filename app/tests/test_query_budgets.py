@@ -0,0 +1,157 @@
+from fastapi.testclient import TestClient
+from app.cache import post_cache
+from app.tests.test_accounts import get_unique_email
+from app.main import app
+
+client = TestClient(app)
+
+# SQL statements allowed per request, with the caller already in the user cache
+# (a cold cache adds one lookup). Reads must not grow with page size or row counts.
+BUDGETS = {
+    "POST /accounts/": 4,
+    "POST /accounts/login": 1,
+    "GET /accounts/me": 0,
+    "GET /accounts/me/stats": 1,
+    "POST /accounts/refresh": 2,
+    "POST /accounts/logout": 2,
+    "PUT /accounts/": 4,
+    "DELETE /accounts/": 11,
+    # Deactivation plus the background purge, which TestClient runs before returning
+    "DELETE /accounts/?background=true": 22,
+    "GET /accounts/purges/{job_id}": 1,
+    "POST /blog/": 3,
+    "POST /blog/bulk": 3,
+    "GET /blog/": 1,
+    "GET /blog/ (304)": 1,
+    # Validators are checked first, then the page is loaded
+    "GET /blog/ (conditional, changed)": 2,
+    "GET /blog/export": 1,
+    "GET /blog/search": 1,
+    "GET /blog/trending": 1,
+    "GET /blog/{post_id}": 2,
+    "GET /blog/{post_id} (cached)": 0,
+    "GET /blog/{post_id} (304)": 1,
+    "GET /blog/{post_id}/likes": 2,
+    "PUT /blog/{post_id}": 4,
+    "DELETE /blog/{post_id}": 6,
+    "GET /like/status": 1,
+    "POST /like/{post_id}": 4,
+    "POST /like/{post_id} (already liked)": 2,
+    "DELETE /like/{post_id}": 4,
+    "DELETE /like/{post_id} (not liked)": 1,
+}
+
+def create_user():
+    user = {"name": "Budget", "email": get_unique_email(), "password": "Valid1!pass"}
+    client.post("/accounts/", json=user)
+    token = client.post("/accounts/login", data={"username": user["email"], "password": user["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    # Warm the user cache so budgets measure the route itself
+    client.get("/accounts/me", headers=headers)
+    return user, headers
+
+def test_account_query_budgets(query_budget):
+    user = {"name": "Budget", "email": get_unique_email(), "password": "Valid1!pass"}
+    with query_budget(BUDGETS["POST /accounts/"]):
+        assert client.post("/accounts/", json=user).status_code == 200
+    with query_budget(BUDGETS["POST /accounts/login"]):
+        tokens = client.post("/accounts/login", data={"username": user["email"], "password": user["password"]}).json()
+    with query_budget(BUDGETS["POST /accounts/refresh"]):
+        tokens = client.post("/accounts/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+    client.get("/accounts/me", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    with query_budget(BUDGETS["POST /accounts/logout"]):
+        resp = client.post("/accounts/logout", json={"refresh_token": tokens["refresh_token"]}, headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert resp.status_code == 204
+    token = client.post("/accounts/login", data={"username": user["email"], "password": user["password"]}).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    client.get("/accounts/me", headers=headers)
+    with query_budget(BUDGETS["GET /accounts/me"]):
+        assert client.get("/accounts/me", headers=headers).status_code == 200
+    with query_budget(BUDGETS["GET /accounts/me/stats"]):
+        assert client.get("/accounts/me/stats", headers=headers).status_code == 200
+    with query_budget(BUDGETS["PUT /accounts/"]):
+        assert client.put("/accounts/", json={"name": "Renamed"}, headers=headers).status_code == 200
+
+    # Deleting an account costs the same however much it owns
+    _, other = create_user()
+    post_ids = client.post("/blog/bulk", json=[{"title": f"Budget {i}", "content": "C"} for i in range(20)], headers=headers).json()["ids"]
+    for post_id in post_ids:
+        client.post(f"/like/{post_id}", headers=other)
+        client.post(f"/like/{post_id}", headers=headers)
+    client.get("/accounts/me", headers=headers)
+    with query_budget(BUDGETS["DELETE /accounts/"]):
+        assert client.delete("/accounts/", headers=headers).status_code == 200
+
+    client.post("/blog/bulk", json=[{"title": f"Budget {i}", "content": "C"} for i in range(20)], headers=other)
+    client.get("/accounts/me", headers=other)
+    with query_budget(BUDGETS["DELETE /accounts/?background=true"]):
+        job_id = client.delete("/accounts/?background=true", headers=other).json()["job_id"]
+    with query_budget(BUDGETS["GET /accounts/purges/{job_id}"]):
+        assert client.get(f"/accounts/purges/{job_id}").json()["status"] == "completed"
+
+def test_post_query_budgets(query_budget):
+    _, owner = create_user()
+    _, reader = create_user()
+    with query_budget(BUDGETS["POST /blog/"]):
+        post_id = client.post("/blog/", json={"title": "Budget", "content": "budgeted words"}, headers=owner).json()["id"]
+    with query_budget(BUDGETS["POST /blog/bulk"]):
+        post_ids = client.post("/blog/bulk", json=[{"title": f"Budget {i}", "content": "budgeted words"} for i in range(100)], headers=owner).json()["ids"]
+    for liked_id in post_ids[:30]:
+        client.post(f"/like/{liked_id}", headers=reader)
+    client.get("/accounts/me", headers=owner)
+    client.get("/accounts/me", headers=reader)
+
+    for params in ("limit=1", "limit=100", f"after={post_id - 1}&limit=100", "limit=100&view=summary", "limit=100&fields=id,title,like_count"):
+        with query_budget(BUDGETS["GET /blog/"]):
+            resp = client.get(f"/blog/?{params}", headers=reader)
+        assert resp.status_code == 200
+    page = f"/blog/?after={post_id - 1}&limit=100"
+    etag = client.get(page, headers=reader).headers["ETag"]
+    with query_budget(BUDGETS["GET /blog/ (304)"]):
+        assert client.get(page, headers={**reader, "If-None-Match": etag}).status_code == 304
+    client.put(f"/blog/{post_id}", json={"content": "budgeted words, edited"}, headers=owner)
+    with query_budget(BUDGETS["GET /blog/ (conditional, changed)"]):
+        assert client.get(page, headers={**reader, "If-None-Match": etag}).status_code == 200
+    with query_budget(BUDGETS["GET /blog/export"]):
+        assert client.get("/blog/export", headers=reader).status_code == 200
+    with query_budget(BUDGETS["GET /blog/search"]):
+        assert client.get("/blog/search?q=budgeted&limit=100", headers=reader).status_code == 200
+    with query_budget(BUDGETS["GET /blog/trending"]):
+        assert client.get("/blog/trending?limit=100", headers=reader).status_code == 200
+
+    post_cache.clear()
+    with query_budget(BUDGETS["GET /blog/{post_id}"]):
+        resp = client.get(f"/blog/{post_ids[0]}", headers=reader)
+    assert resp.status_code == 200
+    with query_budget(BUDGETS["GET /blog/{post_id} (cached)"]):
+        assert client.get(f"/blog/{post_ids[0]}", headers=reader).status_code == 200
+    post_cache.clear()
+    with query_budget(BUDGETS["GET /blog/{post_id} (304)"]):
+        assert client.get(f"/blog/{post_ids[0]}", headers={**reader, "If-None-Match": resp.headers["ETag"]}).status_code == 304
+    with query_budget(BUDGETS["GET /blog/{post_id}/likes"]):
+        assert client.get(f"/blog/{post_ids[0]}/likes?limit=500", headers=reader).status_code == 200
+
+    with query_budget(BUDGETS["PUT /blog/{post_id}"]):
+        assert client.put(f"/blog/{post_ids[0]}", json={"title": "Edited"}, headers=owner).status_code == 200
+    with query_budget(BUDGETS["DELETE /blog/{post_id}"]):
+        assert client.delete(f"/blog/{post_ids[0]}", headers=owner).status_code == 204
+    client.delete("/accounts/", headers=owner)
+    client.delete("/accounts/", headers=reader)
+
+def test_like_query_budgets(query_budget):
+    _, owner = create_user()
+    _, liker = create_user()
+    post_ids = client.post("/blog/bulk", json=[{"title": f"Budget {i}", "content": "C"} for i in range(100)], headers=owner).json()["ids"]
+    client.get("/accounts/me", headers=owner)
+    with query_budget(BUDGETS["GET /like/status"]):
+        assert client.get(f"/like/status?post_ids={','.join(map(str, post_ids))}", headers=liker).status_code == 200
+    with query_budget(BUDGETS["POST /like/{post_id}"]):
+        assert client.post(f"/like/{post_ids[0]}", headers=liker).status_code == 200
+    with query_budget(BUDGETS["POST /like/{post_id} (already liked)"]):
+        assert client.post(f"/like/{post_ids[0]}", headers=liker).status_code == 200
+    with query_budget(BUDGETS["DELETE /like/{post_id}"]):
+        assert client.delete(f"/like/{post_ids[0]}", headers=liker).status_code == 204
+    with query_budget(BUDGETS["DELETE /like/{post_id} (not liked)"]):
+        assert client.delete(f"/like/{post_ids[0]}", headers=liker).status_code == 404
+    client.delete("/accounts/", headers=owner)
+    client.delete("/accounts/", headers=liker)
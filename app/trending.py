@@ -0,0 +1,166 @@
+"""In-memory "hot posts" ranking with exponentially time-decayed like scores.
+
+A like at time t contributes exp(-(now - t) / tau) to its post's score. Scores
+are stored in log space relative to a fixed epoch, log(sum(exp((t_i - epoch) / tau))),
+so they never need aging: decay is the same for every post, which keeps the
+ordering stable, and the current score is recovered with one subtraction.
+Likes and unlikes adjust scores incrementally; `recompute` rebuilds them from
+the likes table to correct drift (missed events, account purges, other workers).
+"""
+import asyncio
+import heapq
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, UTC
+from dotenv import load_dotenv
+from sqlalchemy import select
+from typing import Optional
+from . import models
+
+load_dotenv()
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", 6))
+# Likes older than this are ignored by recompute; their weight is negligible anyway
+TRENDING_WINDOW_HOURS = float(os.getenv("TRENDING_WINDOW_HOURS", 72))
+TRENDING_TOP_K = int(os.getenv("TRENDING_TOP_K", 100))
+TRENDING_RECOMPUTE_SECONDS = float(os.getenv("TRENDING_RECOMPUTE_SECONDS", 300))
+# Optional JSON file the ranking is saved to on shutdown and loaded from at startup
+TRENDING_SNAPSHOT_PATH = os.getenv("TRENDING_SNAPSHOT_PATH", "")
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value: datetime) -> float:
+    # SQLite returns naive datetimes; they are always written in UTC
+    return (value.replace(tzinfo=UTC) if value.tzinfo is None else value).timestamp()
+
+
+def _log_add(a: float, b: float) -> float:
+    """log(exp(a) + exp(b)) without overflow"""
+    return max(a, b) + math.log1p(math.exp(-abs(a - b)))
+
+
+def _log_sub(a: float, b: float) -> float:
+    """log(exp(a) - exp(b)), or -inf when that is zero up to rounding"""
+    if a - b < 1e-9:
+        return -math.inf
+    return a + math.log1p(-math.exp(b - a))
+
+
+class TrendingTracker:
+    """Thread-safe decayed like scores per post plus a cached top-K ranking"""
+
+    def __init__(self, half_life_hours: float, top_k: int, window_hours: float):
+        self.tau = half_life_hours * 3600 / math.log(2)
+        self.top_k = top_k
+        self.window = timedelta(hours=window_hours)
+        self.epoch = time.time()
+        self._scores = {}
+        self._top = []
+        self._lock = threading.Lock()
+        self.recomputed_at = None
+
+    def _weight(self, at: datetime) -> float:
+        return (_timestamp(at) - self.epoch) / self.tau
+
+    def _refresh_top(self):
+        self._top = heapq.nlargest(self.top_k, self._scores.items(), key=lambda item: item[1])
+
+    def record_like(self, post_id: int, liked_at: datetime):
+        weight = self._weight(liked_at)
+        with self._lock:
+            current = self._scores.get(post_id)
+            score = self._scores[post_id] = weight if current is None else _log_add(current, weight)
+            # A rising score can only enter or move up within the top-K
+            if len(self._top) < self.top_k or score > self._top[-1][1] or any(pid == post_id for pid, _ in self._top):
+                entries = [item for item in self._top if item[0] != post_id] + [(post_id, score)]
+                self._top = heapq.nlargest(self.top_k, entries, key=lambda item: item[1])
+
+    def record_unlike(self, post_id: int, liked_at: datetime):
+        with self._lock:
+            if post_id not in self._scores:
+                return
+            score = _log_sub(self._scores[post_id], self._weight(liked_at))
+            if score == -math.inf:
+                del self._scores[post_id]
+            else:
+                self._scores[post_id] = score
+            # A falling top entry may be overtaken by a post outside the list
+            if any(pid == post_id for pid, _ in self._top):
+                self._refresh_top()
+
+    def forget(self, *post_ids: int):
+        """Drop deleted posts from the ranking"""
+        with self._lock:
+            removed = {post_id for post_id in post_ids if self._scores.pop(post_id, None) is not None}
+            if removed and any(pid in removed for pid, _ in self._top):
+                self._refresh_top()
+
+    def top(self, limit: Optional[int] = None) -> list:
+        """[(post_id, decayed score now)] best first"""
+        offset = (time.time() - self.epoch) / self.tau
+        with self._lock:
+            top = self._top[:limit]
+        return [(post_id, math.exp(score - offset)) for post_id, score in top]
+
+    def recompute(self, db):
+        """Rebuild every score from likes inside the window, streaming rows instead of loading them"""
+        cutoff = datetime.now(UTC) - self.window
+        scores = {}
+        rows = db.execute(
+            select(models.Like.post_id, models.Like.created_at)
+            .where(models.Like.created_at >= cutoff)
+            .execution_options(yield_per=5000)
+        )
+        for post_id, created_at in rows:
+            weight = self._weight(created_at)
+            current = scores.get(post_id)
+            scores[post_id] = weight if current is None else _log_add(current, weight)
+        with self._lock:
+            self._scores = scores
+            self._refresh_top()
+            self.recomputed_at = datetime.now(UTC)
+
+    def save(self, path: str):
+        with self._lock:
+            snapshot = {"epoch": self.epoch, "tau": self.tau, "scores": self._scores}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w") as file:
+            json.dump(snapshot, file)
+        os.replace(tmp, path)
+
+    def load(self, path: str) -> bool:
+        """Restore a snapshot written with the same half-life; returns False if there is none to use"""
+        try:
+            with open(path) as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            return False
+        if not math.isclose(snapshot.get("tau", 0), self.tau):
+            return False
+        with self._lock:
+            self.epoch = snapshot["epoch"]
+            self._scores = {int(post_id): score for post_id, score in snapshot["scores"].items()}
+            self._refresh_top()
+        return True
+
+
+trending_tracker = TrendingTracker(TRENDING_HALF_LIFE_HOURS, TRENDING_TOP_K, TRENDING_WINDOW_HOURS)
+
+
+async def run_periodic_recompute(session_factory, tracker: TrendingTracker = trending_tracker, interval: float = TRENDING_RECOMPUTE_SECONDS, delay: float = 0):
+    """Recompute the ranking every `interval` seconds on a worker thread until cancelled"""
+    def recompute():
+        with session_factory() as db:
+            tracker.recompute(db)
+
+    await asyncio.sleep(delay)
+    while True:
+        try:
+            await asyncio.to_thread(recompute)
+        except Exception:
+            logger.exception("Trending recompute failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,326 @@
+"""Load and latency benchmark for the API on a seeded dataset.
+
+Seeds USERS users, POSTS posts and LIKES likes with bulk inserts into a
+throwaway SQLite database, then replays a reproducible mix of login, list,
+detail, like/unlike and create requests, either in-process over ASGI or
+against a local uvicorn worker. Reports throughput, p50/p95/p99 latency and
+SQL statements per request for every endpoint and writes them as JSON, so
+runs from different commits can be compared:
+
+    python benchmarks/bench_api.py --mix browse --target inprocess --output before.json
+    python benchmarks/bench_api.py --mix browse --target inprocess --output after.json --compare before.json
+
+The database mode follows the environment (DATABASE_ASYNC=true for AsyncSession).
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import math
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, UTC
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PASSWORD = "Bench-pass1!"
+SQL_HEADER = "x-bench-sql-statements"
+
+# Relative weights of each scenario step; like_unlike is a POST and a DELETE
+MIXES = {
+    "browse": {"list": 45, "detail": 40, "like_unlike": 10, "create": 4, "login": 1},
+    "social": {"list": 25, "detail": 25, "like_unlike": 40, "create": 8, "login": 2},
+    "write": {"list": 10, "detail": 10, "like_unlike": 30, "create": 50},
+    "login": {"login": 1},
+}
+
+_statements = contextvars.ContextVar("bench_sql_statements", default=None)
+
+
+def _count_statement(*args):
+    counter = _statements.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class SQLCountingApp:
+    """ASGI wrapper reporting the statements each request executed in a response header.
+
+    Sync routes run on the threadpool with a copy of the request's context, so
+    they share the counter list set here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        counter = [0]
+        _statements.set(counter)
+
+        async def counted_send(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (SQL_HEADER.encode(), str(counter[0]).encode())]}
+            await send(message)
+
+        await self.app(scope, receive, counted_send)
+
+
+def counting_app():
+    """uvicorn --factory entry point: the app with statement counting installed"""
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import event
+    from app import database
+    from app.main import app
+
+    event.listen(database.engine, "before_cursor_execute", _count_statement)
+    if database.async_engine is not None:
+        event.listen(database.async_engine.sync_engine, "before_cursor_execute", _count_statement)
+    return SQLCountingApp(app)
+
+
+def seed(users, posts, likes, content_bytes, rng):
+    """Bulk-insert the dataset; returns the ids of public posts"""
+    from sqlalchemy import insert
+    from app import crud, models
+    from app.database import SessionLocal
+
+    now = datetime.now(UTC)
+    # One bcrypt hash shared by every account keeps seeding fast; logins still verify it
+    hashed_password = crud.get_password_hash(PASSWORD)
+    public_ids = [post_id for post_id in range(1, posts + 1) if post_id % 5]
+    with SessionLocal() as db:
+        db.execute(insert(models.User), [
+            {"id": i, "name": f"User {i}", "email": f"user{i}@bench.example", "hashed_password": hashed_password,
+             "is_active": True, "created_at": now}
+            for i in range(1, users + 1)
+        ])
+        for offset in range(0, posts, 10000):
+            db.execute(insert(models.Post), [
+                {"id": i, "title": f"Post {i}", "description": f"Description {i}", "content": "lorem ipsum " * (content_bytes // 12),
+                 "is_public": bool(i % 5), "owner_id": rng.randint(1, users), "created_at": now, "updated_at": now}
+                for i in range(offset + 1, min(posts, offset + 10000) + 1)
+            ])
+        pairs = set()
+        while len(pairs) < min(likes, users * len(public_ids)):
+            pairs.add((rng.randint(1, users), rng.choice(public_ids)))
+        rows = [{"user_id": user_id, "post_id": post_id, "created_at": now} for user_id, post_id in sorted(pairs)]
+        for offset in range(0, len(rows), 10000):
+            db.execute(insert(models.Like), rows[offset:offset + 10000])
+        db.commit()
+        # Bring the denormalized counters in line with the raw rows
+        crud.rebuild_like_counts(db)
+        crud.rebuild_user_stats(db)
+    return public_ids
+
+
+def plan(mix, steps, rng, users, public_ids):
+    """The scenario steps to run, fixed by the seed"""
+    names, weights = zip(*MIXES[mix].items())
+    return [(name, rng.randint(1, users), rng.choice(public_ids)) for name in rng.choices(names, weights, k=steps)]
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of sorted samples"""
+    return samples[max(0, math.ceil(q * len(samples)) - 1)]
+
+
+async def drive(client, steps, tokens, concurrency):
+    """Run the steps with `concurrency` workers; returns elapsed seconds and per-endpoint samples"""
+    import httpx
+
+    samples = {}
+    queue = asyncio.Queue()
+    for step in steps:
+        queue.put_nowait(step)
+
+    async def timed(endpoint, method, url, **kwargs):
+        latencies, statements, statuses = samples.setdefault(endpoint, ([], [], {}))
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            # Recorded as status 0 rather than aborting the whole run
+            statuses[0] = statuses.get(0, 0) + 1
+            return
+        latencies.append(time.perf_counter() - started)
+        sql = response.headers.get(SQL_HEADER)
+        if sql is not None:
+            statements.append(int(sql))
+        # 4xx are part of the mix (concurrent unlikes of the same post); only 5xx count as errors
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def worker():
+        while True:
+            try:
+                name, user_id, post_id = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            headers = {"Authorization": f"Bearer {tokens[user_id]}"}
+            if name == "list":
+                await timed("GET /blog/", "GET", f"/blog/?limit=20&after={max(0, post_id - 20)}", headers=headers)
+            elif name == "detail":
+                await timed("GET /blog/{id}", "GET", f"/blog/{post_id}", headers=headers)
+            elif name == "like_unlike":
+                await timed("POST /like/{id}", "POST", f"/like/{post_id}", headers=headers)
+                await timed("DELETE /like/{id}", "DELETE", f"/like/{post_id}", headers=headers)
+            elif name == "create":
+                post = {"title": f"Bench {post_id}", "description": "bench", "content": "lorem ipsum " * 40}
+                await timed("POST /blog/", "POST", "/blog/", headers=headers, json=post)
+            elif name == "login":
+                await timed("POST /accounts/login", "POST", "/accounts/login",
+                            data={"username": f"user{user_id}@bench.example", "password": PASSWORD})
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return time.perf_counter() - started, samples
+
+
+def summarize(elapsed, samples):
+    endpoints = {}
+    for endpoint, (latencies, statements, statuses) in sorted(samples.items()):
+        latencies.sort()
+        endpoints[endpoint] = {
+            "requests": sum(statuses.values()),
+            "errors": sum(count for status, count in statuses.items() if status >= 500 or status == 0),
+            "statuses": {str(status): count for status, count in sorted(statuses.items())},
+            **{f"p{round(q * 100)}_ms": round(percentile(latencies, q) * 1000, 3) if latencies else None for q in (0.50, 0.95, 0.99)},
+            "sql_per_request": round(sum(statements) / len(statements), 2) if statements else None,
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {"elapsed_s": round(elapsed, 3), "requests": total, "throughput_rps": round(total / elapsed, 1), "endpoints": endpoints}
+
+
+async def run_inprocess(steps, tokens, args):
+    import httpx
+    from app import database
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=counting_app()), base_url="http://bench") as client:
+        await drive(client, steps[:args.warmup], tokens, args.concurrency)
+        result = await drive(client, steps[args.warmup:], tokens, args.concurrency)
+    # ASGITransport does not run the lifespan, so release the async engine here
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    return result
+
+
+async def run_uvicorn(steps, tokens, args):
+    import httpx
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "bench_api:counting_app", "--factory", "--app-dir", BENCH_DIR,
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=os.environ.copy(),
+    )
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            for _ in range(200):
+                try:
+                    await client.get("/openapi.json")
+                    break
+                except httpx.TransportError:
+                    if server.poll() is not None:
+                        raise RuntimeError("uvicorn exited during startup")
+                    await asyncio.sleep(0.1)
+            await drive(client, steps[:args.warmup], tokens, args.concurrency)
+            return await drive(client, steps[args.warmup:], tokens, args.concurrency)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def git_revision():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT, capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def print_report(result, baseline=None):
+    print(f"{result['target']}: {result['requests']} requests in {result['elapsed_s']:.1f}s, {result['throughput_rps']:.1f} req/s")
+    print(f"{'endpoint':<22}{'count':>7}{'errors':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'sql/req':>9}")
+    for endpoint, stats in result["endpoints"].items():
+        columns = [stats["p50_ms"], stats["p95_ms"], stats["p99_ms"], stats["sql_per_request"]]
+        print(f"{endpoint:<22}{stats['requests']:>7}{stats['errors']:>7}" + "".join("{:>9}".format("-" if value is None else f"{value:.2f}") for value in columns))
+    if baseline is None:
+        return
+    print(f"\nvs. {baseline['meta']['commit'] or 'baseline'} ({baseline['target']}): throughput {change(baseline['throughput_rps'], result['throughput_rps'])}")
+    for endpoint, stats in result["endpoints"].items():
+        before = baseline["endpoints"].get(endpoint)
+        if before:
+            print(f"{endpoint:<22}p50 {change(before['p50_ms'], stats['p50_ms']):>8}  p95 {change(before['p95_ms'], stats['p95_ms']):>8}  "
+                  f"p99 {change(before['p99_ms'], stats['p99_ms']):>8}  sql/req {before['sql_per_request']} -> {stats['sql_per_request']}")
+
+
+def change(before, after):
+    return f"{(after - before) / before * 100:+.1f}%" if before and after is not None else "n/a"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--posts", type=int, default=20000)
+    parser.add_argument("--likes", type=int, default=100000)
+    parser.add_argument("--content-bytes", type=int, default=1000)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="browse")
+    parser.add_argument("--steps", type=int, default=2000, help="Scenario steps to time, after the warmup")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--target", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the result as JSON to this file")
+    parser.add_argument("--compare", help="A previous --output file to print changes against")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ.pop("SQLALCHEMY_ASYNC_DATABASE_URL", None)
+    sys.path.insert(0, ROOT)
+    from app import auth, cache, database
+    from app.main import app  # noqa: F401  creates the schema and search index
+
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    public_ids = seed(args.users, args.posts, args.likes, args.content_bytes, rng)
+    print(f"Seeded {args.users} users, {args.posts} posts, {args.likes} likes in {time.perf_counter() - started:.1f}s")
+    tokens = {user_id: auth.create_access_token({"sub": str(user_id)}) for user_id in range(1, args.users + 1)}
+    steps = plan(args.mix, args.warmup + args.steps, rng, args.users, public_ids)
+
+    runner = run_inprocess if args.target == "inprocess" else run_uvicorn
+    elapsed, samples = asyncio.run(runner(steps, tokens, args))
+    commit, dirty = git_revision()
+    result = {
+        "meta": {
+            "commit": commit, "dirty": dirty, "timestamp": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(), "database_async": database.DATABASE_ASYNC,
+            "response_cache": cache.RESPONSE_CACHE_BACKEND, "args": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        },
+        "target": args.target,
+        **summarize(elapsed, samples),
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(result, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
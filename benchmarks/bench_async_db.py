@@ -0,0 +1,120 @@
+"""Compare the sync (threadpool) and async (AsyncSession) database modes.
+
+Each mode runs in its own interpreter against a fresh SQLite file, because
+the mode is fixed when app.database is imported:
+
+    python benchmarks/bench_async_db.py --requests 2000 --concurrency 64
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def drive(app, token, post_ids, total, concurrency):
+    import httpx
+    from app import database
+
+    headers = {"Authorization": f"Bearer {token}"}
+    latencies = {"list": [], "like_unlike": []}
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(client):
+        while True:
+            try:
+                i = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            if i % 2:
+                response = await client.get("/blog/?limit=20", headers=headers)
+                response.raise_for_status()
+                latencies["list"].append(time.perf_counter() - start)
+            else:
+                post_id = post_ids[i % len(post_ids)]
+                await client.post(f"/like/{post_id}", headers=headers)
+                await client.delete(f"/like/{post_id}", headers=headers)
+                latencies["like_unlike"].append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    # ASGITransport does not run the lifespan, so release aiosqlite's threads here
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+    return elapsed, latencies
+
+
+def run_mode(args):
+    """Executed in the child process: seed, then drive the in-process app"""
+    sys.path.insert(0, ROOT)
+    from app import auth, models
+    from app.database import SessionLocal
+    from app.main import app
+
+    with SessionLocal() as db:
+        user = models.User(name="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.flush()
+        db.add_all(
+            models.Post(title=f"Post {i}", content="x" * 500, is_public=i % 4 != 0, owner_id=user.id)
+            for i in range(args.posts)
+        )
+        db.commit()
+        user_id = user.id
+        post_ids = [post_id for (post_id,) in db.query(models.Post.id).filter(models.Post.is_public == True)]
+    token = auth.create_access_token({"sub": str(user_id)})
+
+    elapsed, latencies = asyncio.run(drive(app, token, post_ids, args.requests, args.concurrency))
+    result = {"throughput_rps": args.requests / elapsed}
+    for name, samples in latencies.items():
+        samples.sort()
+        result[f"{name}_p50_ms"] = statistics.median(samples) * 1000
+        result[f"{name}_p95_ms"] = samples[int(len(samples) * 0.95) - 1] * 1000
+    print(json.dumps(result))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_mode(args)
+        return
+
+    results = {}
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                SQLALCHEMY_DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                DATABASE_ASYNC="true" if mode == "async" else "false",
+            )
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", "--requests", str(args.requests),
+                 "--concurrency", str(args.concurrency), "--posts", str(args.posts)],
+                env=env, cwd=ROOT, check=True, capture_output=True, text=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{'metric':<22}{'sync':>12}{'async':>12}")
+    for metric in results["sync"]:
+        print(f"{metric:<22}{results['sync'][metric]:>12.2f}{results['async'][metric]:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Compare creating posts one request at a time with POST /blog/bulk.
+
+    python benchmarks/bench_bulk_create.py --posts 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    sys.path.insert(0, ROOT)
+    from fastapi.testclient import TestClient
+    from app import auth, models, schemas
+    from app.database import SessionLocal
+    from app.main import app
+
+    with SessionLocal() as db:
+        user = models.User(name="bench", email="bench@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': str(user.id)})}"}
+    client = TestClient(app)
+    posts = [{"title": f"Post {i}", "content": "x" * 500, "is_public": True} for i in range(args.posts)]
+
+    started = time.perf_counter()
+    for post in posts:
+        client.post("/blog/", json=post, headers=headers).raise_for_status()
+    single = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for offset in range(0, len(posts), schemas.MAX_BULK_POSTS):
+        client.post("/blog/bulk", json=posts[offset:offset + schemas.MAX_BULK_POSTS], headers=headers).raise_for_status()
+    bulk = time.perf_counter() - started
+
+    print(f"POST /blog/     {args.posts / single:>10.0f} posts/s")
+    print(f"POST /blog/bulk {args.posts / bulk:>10.0f} posts/s  ({single / bulk:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Throughput and memory of GET /blog/export against paging through GET /blog/.
+
+The app is driven directly over ASGI (TestClient would buffer whole bodies),
+so the tracemalloc high-water mark is what the server holds while responding.
+
+    python benchmarks/bench_export.py --posts 200000
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(engine, posts, content_bytes, batch=20000):
+    now = time.strftime("%Y-%m-%d %H:%M:%S.000000", time.gmtime())
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(
+            "INSERT INTO users (id, name, email, hashed_password, is_active, created_at) VALUES (1, 'bench', 'bench@example.com', 'x', 1, ?)",
+            (now,),
+        )
+        for offset in range(0, posts, batch):
+            cursor.executemany(
+                "INSERT INTO posts (title, content, is_public, like_count, owner_id, created_at, updated_at) VALUES (?, ?, 1, 0, 1, ?, ?)",
+                [(f"Post {i}", "x" * content_bytes, now, now) for i in range(offset, min(posts, offset + batch))],
+            )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def asgi_get(app, path, token):
+    """Run one GET through the ASGI app; NDJSON bodies are only counted, others are kept"""
+    url, _, query = path.partition("?")
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": url, "raw_path": url.encode(), "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"bench"), (b"authorization", f"Bearer {token}".encode())],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+    state = {"status": None, "headers": {}, "size": 0, "rows": 0, "body": []}
+    done = asyncio.Event()
+
+    async def receive():
+        if not state.get("sent_request"):
+            state["sent_request"] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            state["status"] = message["status"]
+            state["headers"] = {k.decode().lower(): v.decode() for k, v in message["headers"]}
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            state["size"] += len(chunk)
+            if state["headers"].get("content-type") == "application/x-ndjson":
+                state["rows"] += chunk.count(b"\n")
+            else:
+                state["body"].append(chunk)
+            if not message.get("more_body"):
+                done.set()
+
+    async def run():
+        await app(scope, receive, send)
+        done.set()
+
+    asyncio.run(run())
+    return state
+
+
+def measure(label, run, posts):
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows, size = run()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert rows == posts, (label, rows)
+    print(f"{label:<28}{rows / elapsed:>12.0f} rows/s{size / elapsed / 2**20:>10.1f} MB/s{peak / 2**20:>12.1f} MB peak")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=200_000)
+    parser.add_argument("--content-bytes", type=int, default=500)
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    os.environ["RESPONSE_CACHE_BACKEND"] = "none"
+    sys.path.insert(0, ROOT)
+    from app import auth
+    from app.database import engine
+    from app.main import app
+
+    seed(engine, args.posts, args.content_bytes)
+    token = auth.create_access_token({"sub": "1"})
+
+    def export():
+        state = asgi_get(app, "/blog/export", token)
+        assert state["status"] == 200, state["status"]
+        return state["rows"], state["size"]
+
+    def paged():
+        rows = size = 0
+        cursor = 0
+        while True:
+            state = asgi_get(app, f"/blog/?after={cursor}&limit={args.page_size}", token)
+            assert state["status"] == 200, state["status"]
+            size += state["size"]
+            rows += len(json.loads(b"".join(state["body"])))
+            if "x-next-cursor" not in state["headers"]:
+                return rows, size
+            cursor = state["headers"]["x-next-cursor"]
+
+    print(f"{args.posts} posts, {args.content_bytes}-byte bodies")
+    measure("GET /blog/export", export, args.posts)
+    measure(f"GET /blog/ pages of {args.page_size}", paged, args.posts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Login latency and throughput per password hashing cost.
+
+Each policy runs in its own interpreter against a fresh SQLite file, because
+the policy is read when app.crud is imported. A policy is a scheme and its
+cost settings: bcrypt:<rounds> or argon2:<time_cost>:<memory_cost KiB>:<parallelism>
+(argon2 needs the argon2-cffi package).
+
+    python benchmarks/bench_login.py --logins 200 --concurrency 8
+    python benchmarks/bench_login.py --policy bcrypt:12 --policy argon2:3:65536:4
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = "Valid1!pass"
+
+
+def policy_env(policy: str) -> dict:
+    scheme, *costs = policy.split(":")
+    if scheme == "bcrypt":
+        return {"PASSWORD_SCHEMES": "bcrypt", "BCRYPT_ROUNDS": costs[0]}
+    if scheme == "argon2":
+        time_cost, memory_cost, parallelism = costs
+        return {
+            "PASSWORD_SCHEMES": "argon2",
+            "ARGON2_TIME_COST": time_cost,
+            "ARGON2_MEMORY_COST": memory_cost,
+            "ARGON2_PARALLELISM": parallelism,
+        }
+    raise argparse.ArgumentTypeError(f"unknown scheme in policy {policy!r}")
+
+
+async def drive(app, total, concurrency):
+    import httpx
+
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    async def worker(client):
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            start = time.perf_counter()
+            response = await client.post("/accounts/login", data={"username": "bench@example.com", "password": PASSWORD})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - start)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return elapsed, latencies
+
+
+def run_policy(args):
+    """Executed in the child process: seed one user, then log in repeatedly"""
+    sys.path.insert(0, ROOT)
+    from app import crud, models
+    from app.database import SessionLocal
+    from app.hashing import password_hasher
+    from app.main import app
+
+    crud.get_password_hash(PASSWORD)  # loads the hashing backend
+    started = time.perf_counter()
+    hashed_password = crud.get_password_hash(PASSWORD)
+    hash_ms = (time.perf_counter() - started) * 1000
+    with SessionLocal() as db:
+        db.add(models.User(name="bench", email="bench@example.com", hashed_password=hashed_password))
+        db.commit()
+
+    # Warm up the hashing pool so worker start-up is not measured
+    asyncio.run(drive(app, min(args.concurrency, args.logins), args.concurrency))
+    elapsed, latencies = asyncio.run(drive(app, args.logins, args.concurrency))
+    # ASGITransport does not run the lifespan, so stop the pool here
+    password_hasher.shutdown()
+    latencies.sort()
+    print(json.dumps({
+        "hash_ms": hash_ms,
+        "login_p50_ms": statistics.median(latencies) * 1000,
+        "login_p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "logins_per_s": args.logins / elapsed,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--policy", action="append", help="repeatable; default bcrypt:4, :8, :10 and :12")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_policy(args)
+        return
+
+    policies = args.policy or ["bcrypt:4", "bcrypt:8", "bcrypt:10", "bcrypt:12"]
+    print(f"{'policy':<24}{'hash ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'logins/s':>10}")
+    for policy in policies:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, SQLALCHEMY_DATABASE_URL=f"sqlite:///{tmp}/bench.db", **policy_env(policy))
+            output = subprocess.run(
+                [sys.executable, __file__, "--child", "--logins", str(args.logins), "--concurrency", str(args.concurrency)],
+                env=env, cwd=ROOT, check=True, capture_output=True, text=True,
+            ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{policy:<24}{result['hash_ms']:>10.1f}{result['login_p50_ms']:>10.1f}"
+              f"{result['login_p95_ms']:>10.1f}{result['logins_per_s']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Compare GET /blog/search (FTS5 + BM25) with a LIKE '%term%' scan.
+
+Seeds a temporary SQLite database with synthetic posts, builds the full-text
+index once, then times a set of rare, medium and common terms both ways.
+
+    python benchmarks/bench_search.py --posts 1000000
+"""
+import argparse
+import itertools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, UTC
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VOCABULARY = [f"word{i}" for i in range(20000)]
+
+
+def seed(engine, posts, words_per_post, batch=20000):
+    """Insert posts straight through the DBAPI; Zipf-ish word choice gives rare and common terms"""
+    rng = random.Random(42)
+    cum_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY))))
+    now = datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S.%f")
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        cursor.execute(
+            "INSERT INTO users (id, name, email, hashed_password, is_active, created_at) VALUES (1, 'bench', 'bench@example.com', 'x', 1, ?)",
+            (now,),
+        )
+        for offset in range(0, posts, batch):
+            rows = []
+            for i in range(offset, min(posts, offset + batch)):
+                words = rng.choices(VOCABULARY, cum_weights=cum_weights, k=words_per_post)
+                rows.append((" ".join(words[:6]), " ".join(words), i % 10 != 0, now, now))
+            cursor.executemany(
+                "INSERT INTO posts (title, content, is_public, like_count, owner_id, created_at, updated_at) VALUES (?, ?, ?, 0, 1, ?, ?)",
+                rows,
+            )
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1_000_000)
+    parser.add_argument("--words", type=int, default=40, help="Words per post body")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import text
+    from fastapi.testclient import TestClient
+    from app import auth, search
+    from app.database import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    started = time.perf_counter()
+    seed(engine, args.posts, args.words)
+    print(f"Seeded {args.posts} posts in {time.perf_counter() - started:.1f}s")
+    started = time.perf_counter()
+    search.install(engine)
+    print(f"Built posts_fts in {time.perf_counter() - started:.1f}s")
+
+    from app.main import app
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': '1'})}"}
+
+    print(f"{'term':<12}{'matches':>10}{'FTS5 ms':>10}{'LIKE ms':>10}")
+    for term in ("word19999", "word2000", "word20", "word1"):
+        fts_ms, resp = timed(lambda: client.get(f"/blog/search?q={term}&limit=20", headers=headers), args.repeat)
+        resp.raise_for_status()
+        with engine.connect() as conn:
+            matches = conn.execute(text("SELECT count(*) FROM posts_fts WHERE posts_fts MATCH :q"), {"q": f'"{term}"'}).scalar()
+            like_ms, _ = timed(
+                lambda: conn.execute(
+                    text("SELECT id FROM posts WHERE title LIKE :p OR content LIKE :p ORDER BY id LIMIT 20"),
+                    {"p": f"%{term} %"},
+                ).all(),
+                max(1, args.repeat // 2),
+            )
+        print(f"{term:<12}{matches:>10}{fts_ms:>10.1f}{like_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Compare FastAPI's default response serialization with FAST_JSON_RESPONSES on large post lists.
+
+    python benchmarks/bench_serialization.py --posts 1000 --requests 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=1000, help="Posts per list page")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--content-bytes", type=int, default=1000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["SQLALCHEMY_DATABASE_URL"] = f"sqlite:///{tmp}/bench.db"
+    sys.path.insert(0, ROOT)
+    from fastapi.testclient import TestClient
+    from app import auth, crud, schemas, serialization
+    from app.database import SessionLocal
+    from app.main import app
+
+    with SessionLocal() as db:
+        user = crud.create_user(db, schemas.UserCreate(name="bench", email="bench@example.com", password="x"), "x")
+        posts = [schemas.PostCreate(title=f"Post {i}", content="x" * args.content_bytes) for i in range(args.posts)]
+        for offset in range(0, len(posts), schemas.MAX_BULK_POSTS):
+            crud.create_posts_bulk(db, posts[offset:offset + schemas.MAX_BULK_POSTS], user.id)
+        headers = {"Authorization": f"Bearer {auth.create_access_token({'sub': str(user.id)})}"}
+    client = TestClient(app)
+    url = f"/blog/?limit={args.posts}"
+
+    bodies = {}
+    print(f"GET {url} ({args.posts} posts, {args.requests} requests)")
+    for fast in (False, True):
+        serialization.FAST_JSON_RESPONSES = fast
+        client.get(url, headers=headers).raise_for_status()
+        samples = []
+        for _ in range(args.requests):
+            started = time.perf_counter()
+            resp = client.get(url, headers=headers)
+            samples.append(time.perf_counter() - started)
+        bodies[fast] = resp.content
+        label = "FAST_JSON_RESPONSES=true " if fast else "FAST_JSON_RESPONSES=false"
+        print(f"{label} median {statistics.median(samples) * 1000:8.1f} ms")
+    print("identical bodies:", bodies[False] == bodies[True])
+
+
+if __name__ == "__main__":
+    main()